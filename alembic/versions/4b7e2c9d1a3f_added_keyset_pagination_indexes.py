@@ -0,0 +1,34 @@
+"""added keyset pagination indexes
+
+Revision ID: 4b7e2c9d1a3f
+Revises: 1d1996df6812
+Create Date: 2026-10-16 23:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b7e2c9d1a3f'
+down_revision: Union[str, None] = '1d1996df6812'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'], unique=False)
+    op.create_index('ix_available_time_slots_created_at_id', 'available_time_slots', ['created_at', 'id'], unique=False)
+    op.create_index('ix_appointments_created_at_id', 'appointments', ['created_at', 'id'], unique=False)
+    op.create_index('ix_appointments_doctor_id_created_at_id', 'appointments', ['doctor_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_appointments_patient_id_created_at_id', 'appointments', ['patient_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_appointments_patient_id_created_at_id', table_name='appointments')
+    op.drop_index('ix_appointments_doctor_id_created_at_id', table_name='appointments')
+    op.drop_index('ix_appointments_created_at_id', table_name='appointments')
+    op.drop_index('ix_available_time_slots_created_at_id', table_name='available_time_slots')
+    op.drop_index('ix_users_created_at_id', table_name='users')
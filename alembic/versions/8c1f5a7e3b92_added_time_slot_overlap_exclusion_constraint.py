@@ -0,0 +1,46 @@
+"""added time slot overlap exclusion constraint
+
+Revision ID: 8c1f5a7e3b92
+Revises: 4b7e2c9d1a3f
+Create Date: 2026-10-16 23:40:00.000000
+
+Existing overlapping slots of the same doctor must be resolved before this
+runs, otherwise adding the constraint fails.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c1f5a7e3b92'
+down_revision: Union[str, None] = '4b7e2c9d1a3f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    op.add_column(
+        'available_time_slots',
+        sa.Column(
+            'during',
+            postgresql.TSRANGE(),
+            sa.Computed('tsrange(start_time, end_time)', persisted=True),
+            nullable=True,
+        ),
+    )
+    op.create_exclude_constraint(
+        'excl_available_time_slots_doctor_overlap',
+        'available_time_slots',
+        ('doctor_id', '='),
+        ('during', '&&'),
+        using='gist',
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('excl_available_time_slots_doctor_overlap', 'available_time_slots')
+    op.drop_column('available_time_slots', 'during')
@@ -0,0 +1,119 @@
+"""added appointment status enum and hot path indexes
+
+Revision ID: a1e6c3f9d2b7
+Revises: f4c1d8e2a6b9
+Create Date: 2026-10-17 03:10:00.000000
+
+Appointments with a status other than scheduled, completed or canceled must
+be fixed before this runs, otherwise converting the column fails.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1e6c3f9d2b7'
+down_revision: Union[str, None] = 'f4c1d8e2a6b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+appointment_status = postgresql.ENUM('scheduled', 'completed', 'canceled', name='appointment_status')
+
+# The stats functions pass the status on as text, which works for both the
+# enum and the varchar column, so downgrading keeps these bodies.
+DAILY_STATS_FUNCTIONS = """
+CREATE OR REPLACE FUNCTION appointments_maintain_daily_stats() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+        AND NEW.doctor_id IS NOT DISTINCT FROM OLD.doctor_id
+        AND NEW.available_time_slot_id IS NOT DISTINCT FROM OLD.available_time_slot_id
+        AND NEW.status IS NOT DISTINCT FROM OLD.status THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM bump_appointment_daily_stat(OLD.doctor_id, OLD.available_time_slot_id, OLD.status::text, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM bump_appointment_daily_stat(NEW.doctor_id, NEW.available_time_slot_id, NEW.status::text, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION available_time_slots_maintain_daily_stats() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' OR OLD.start_time::date IS DISTINCT FROM NEW.start_time::date THEN
+        INSERT INTO appointment_daily_stats AS stats (doctor_id, day, status, count)
+        SELECT appointments.doctor_id, moves.day, appointments.status::text, sum(moves.delta)
+        FROM appointments
+        CROSS JOIN (
+            VALUES
+                (OLD.start_time::date, -1),
+                (CASE WHEN TG_OP = 'UPDATE' THEN NEW.start_time::date END, 1)
+        ) AS moves (day, delta)
+        WHERE appointments.available_time_slot_id = OLD.id
+            AND appointments.doctor_id IS NOT NULL
+            AND appointments.status IS NOT NULL
+            AND moves.day IS NOT NULL
+        GROUP BY appointments.doctor_id, moves.day, appointments.status::text
+        ON CONFLICT (doctor_id, day, status) DO UPDATE SET count = stats.count + EXCLUDED.count;
+    END IF;
+    IF TG_OP = 'DELETE' THEN
+        RETURN OLD;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+CREATE_APPOINTMENTS_TRIGGER = """
+CREATE TRIGGER trg_appointments_daily_stats
+AFTER INSERT OR DELETE OR UPDATE OF doctor_id, available_time_slot_id, status ON appointments
+FOR EACH ROW EXECUTE FUNCTION appointments_maintain_daily_stats()
+"""
+
+
+def _convert_status(type_, existing_type, using: str) -> None:
+    # The trigger and the partial index depend on the column's type.
+    op.execute('DROP TRIGGER trg_appointments_daily_stats ON appointments')
+    op.drop_index('uq_appointments_scheduled_time_slot', table_name='appointments')
+    op.alter_column(
+        'appointments',
+        'status',
+        type_=type_,
+        existing_type=existing_type,
+        existing_nullable=True,
+        postgresql_using=using,
+    )
+    op.create_index(
+        'uq_appointments_scheduled_time_slot',
+        'appointments',
+        ['available_time_slot_id'],
+        unique=True,
+        postgresql_where=sa.text("status = 'scheduled'"),
+    )
+    op.execute(CREATE_APPOINTMENTS_TRIGGER)
+
+
+def upgrade() -> None:
+    appointment_status.create(op.get_bind())
+    op.execute(DAILY_STATS_FUNCTIONS)
+    _convert_status(appointment_status, sa.String(), 'status::appointment_status')
+    op.create_index(
+        'ix_appointments_scheduled_doctor_id',
+        'appointments',
+        ['doctor_id'],
+        unique=False,
+        postgresql_where=sa.text("status = 'scheduled'"),
+    )
+    op.create_index('ix_doctor_profiles_experience_user_id', 'doctor_profiles', [sa.text('experience_years DESC'), 'user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_doctor_profiles_experience_user_id', table_name='doctor_profiles')
+    op.drop_index('ix_appointments_scheduled_doctor_id', table_name='appointments')
+    _convert_status(sa.String(), appointment_status, 'status::text')
+    appointment_status.drop(op.get_bind())
@@ -0,0 +1,34 @@
+"""added scheduled time slot unique index
+
+Revision ID: b3d9e6f2c4a1
+Revises: 8c1f5a7e3b92
+Create Date: 2026-10-17 00:05:00.000000
+
+Slots that already have more than one scheduled appointment must be cleaned
+up before this runs, otherwise creating the index fails.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d9e6f2c4a1'
+down_revision: Union[str, None] = '8c1f5a7e3b92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'uq_appointments_scheduled_time_slot',
+        'appointments',
+        ['available_time_slot_id'],
+        unique=True,
+        postgresql_where=sa.text("status = 'scheduled'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_appointments_scheduled_time_slot', table_name='appointments')
@@ -0,0 +1,28 @@
+"""added time slot start time indexes
+
+Revision ID: c5a2f8d4e6b7
+Revises: b3d9e6f2c4a1
+Create Date: 2026-10-17 00:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a2f8d4e6b7'
+down_revision: Union[str, None] = 'b3d9e6f2c4a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_available_time_slots_doctor_id_start_time', 'available_time_slots', ['doctor_id', 'start_time'], unique=False)
+    op.create_index('ix_available_time_slots_start_time', 'available_time_slots', ['start_time'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_available_time_slots_start_time', table_name='available_time_slots')
+    op.drop_index('ix_available_time_slots_doctor_id_start_time', table_name='available_time_slots')
@@ -0,0 +1,43 @@
+"""added doctor directory indexes
+
+Revision ID: e2b8c4f6a0d3
+Revises: d7e3a9b1f5c8
+Create Date: 2026-10-17 01:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b8c4f6a0d3'
+down_revision: Union[str, None] = 'd7e3a9b1f5c8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        'doctor_profiles',
+        'academic_history',
+        type_=postgresql.JSONB(),
+        existing_type=sa.JSON(),
+        postgresql_using='academic_history::jsonb',
+    )
+    op.create_index('ix_doctor_profiles_academic_history', 'doctor_profiles', ['academic_history'], unique=False, postgresql_using='gin')
+    op.create_index('ix_doctor_profiles_lower_specialization_experience', 'doctor_profiles', [sa.text('lower(specialization)'), 'experience_years'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_doctor_profiles_lower_specialization_experience', table_name='doctor_profiles')
+    op.drop_index('ix_doctor_profiles_academic_history', table_name='doctor_profiles')
+    op.alter_column(
+        'doctor_profiles',
+        'academic_history',
+        type_=sa.JSON(),
+        existing_type=postgresql.JSONB(),
+        postgresql_using='academic_history::json',
+    )
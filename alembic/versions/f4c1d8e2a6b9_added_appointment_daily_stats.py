@@ -0,0 +1,122 @@
+"""added appointment daily stats
+
+Revision ID: f4c1d8e2a6b9
+Revises: e2b8c4f6a0d3
+Create Date: 2026-10-17 02:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c1d8e2a6b9'
+down_revision: Union[str, None] = 'e2b8c4f6a0d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'appointment_daily_stats',
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.PrimaryKeyConstraint('doctor_id', 'day', 'status'),
+    )
+    op.create_index('ix_appointment_daily_stats_day', 'appointment_daily_stats', ['day'], unique=False)
+    op.execute("""
+CREATE OR REPLACE FUNCTION bump_appointment_daily_stat(
+    p_doctor_id integer, p_time_slot_id integer, p_status varchar, p_delta integer
+) RETURNS void AS $$
+DECLARE
+    slot_day date;
+BEGIN
+    IF p_doctor_id IS NULL OR p_time_slot_id IS NULL OR p_status IS NULL THEN
+        RETURN;
+    END IF;
+    SELECT start_time::date INTO slot_day FROM available_time_slots WHERE id = p_time_slot_id;
+    -- A slot being deleted has already taken its appointments off the stats.
+    IF slot_day IS NULL THEN
+        RETURN;
+    END IF;
+    INSERT INTO appointment_daily_stats AS stats (doctor_id, day, status, count)
+    VALUES (p_doctor_id, slot_day, p_status, p_delta)
+    ON CONFLICT (doctor_id, day, status) DO UPDATE SET count = stats.count + EXCLUDED.count;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION appointments_maintain_daily_stats() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+        AND NEW.doctor_id IS NOT DISTINCT FROM OLD.doctor_id
+        AND NEW.available_time_slot_id IS NOT DISTINCT FROM OLD.available_time_slot_id
+        AND NEW.status IS NOT DISTINCT FROM OLD.status THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM bump_appointment_daily_stat(OLD.doctor_id, OLD.available_time_slot_id, OLD.status, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM bump_appointment_daily_stat(NEW.doctor_id, NEW.available_time_slot_id, NEW.status, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION available_time_slots_maintain_daily_stats() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' OR OLD.start_time::date IS DISTINCT FROM NEW.start_time::date THEN
+        INSERT INTO appointment_daily_stats AS stats (doctor_id, day, status, count)
+        SELECT appointments.doctor_id, moves.day, appointments.status, sum(moves.delta)
+        FROM appointments
+        CROSS JOIN (
+            VALUES
+                (OLD.start_time::date, -1),
+                (CASE WHEN TG_OP = 'UPDATE' THEN NEW.start_time::date END, 1)
+        ) AS moves (day, delta)
+        WHERE appointments.available_time_slot_id = OLD.id
+            AND appointments.doctor_id IS NOT NULL
+            AND appointments.status IS NOT NULL
+            AND moves.day IS NOT NULL
+        GROUP BY appointments.doctor_id, moves.day, appointments.status
+        ON CONFLICT (doctor_id, day, status) DO UPDATE SET count = stats.count + EXCLUDED.count;
+    END IF;
+    IF TG_OP = 'DELETE' THEN
+        RETURN OLD;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_appointments_daily_stats
+AFTER INSERT OR DELETE OR UPDATE OF doctor_id, available_time_slot_id, status ON appointments
+FOR EACH ROW EXECUTE FUNCTION appointments_maintain_daily_stats();
+
+-- BEFORE DELETE, so the slot's appointments are counted off while the slot
+-- still tells their day, ahead of the ON DELETE SET NULL on appointments.
+CREATE TRIGGER trg_available_time_slots_daily_stats
+BEFORE DELETE OR UPDATE OF start_time ON available_time_slots
+FOR EACH ROW EXECUTE FUNCTION available_time_slots_maintain_daily_stats();
+""")
+    op.execute("""
+INSERT INTO appointment_daily_stats (doctor_id, day, status, count)
+SELECT appointments.doctor_id, available_time_slots.start_time::date, appointments.status, count(*)
+FROM appointments
+JOIN available_time_slots ON available_time_slots.id = appointments.available_time_slot_id
+WHERE appointments.doctor_id IS NOT NULL AND appointments.status IS NOT NULL
+GROUP BY 1, 2, 3
+""")
+
+
+def downgrade() -> None:
+    op.execute('DROP TRIGGER trg_available_time_slots_daily_stats ON available_time_slots')
+    op.execute('DROP TRIGGER trg_appointments_daily_stats ON appointments')
+    op.execute('DROP FUNCTION available_time_slots_maintain_daily_stats()')
+    op.execute('DROP FUNCTION appointments_maintain_daily_stats()')
+    op.execute('DROP FUNCTION bump_appointment_daily_stat(integer, integer, varchar, integer)')
+    op.drop_index('ix_appointment_daily_stats_day', table_name='appointment_daily_stats')
+    op.drop_table('appointment_daily_stats')
@@ -0,0 +1,355 @@
+import asyncio
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Generic, Optional, TypeVar
+
+from pydantic import BaseModel
+
+# "memory" keeps a cache per worker process, "redis" shares one between every
+# worker that points at the same CACHE_URL.
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory")
+CACHE_URL = os.environ.get("CACHE_URL", "redis://localhost:6379/0")
+CACHE_PREFIX = os.environ.get("CACHE_PREFIX", "dpas")
+CACHE_SIZE = int(os.environ.get("CACHE_SIZE", 4096))
+CACHE_TTL = float(os.environ.get("CACHE_TTL", 30))
+CACHE_LOCK_TIMEOUT = float(os.environ.get("CACHE_LOCK_TIMEOUT", 2))
+
+CACHE_BACKENDS = ("memory", "redis")
+
+# How often a request that lost the load lock checks for the winner's value.
+_LOCK_POLL_SECONDS = 0.02
+# Generations outlive the entries tagged with them many times over, so an
+# expired generation never brings back an entry written before it.
+_GENERATION_TTL_FACTOR = 10
+
+Model = TypeVar("Model", bound=BaseModel)
+
+
+class CacheBackendError(Exception):
+    """The backend could not be reached; callers fall back to loading."""
+
+
+class MemoryBackend:
+    """Bounded LRU of byte values with per-entry expiry, local to the process."""
+
+    name = "memory"
+
+    def __init__(self, maxsize: int = CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _live_entry(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        return entry[1]
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._live_entry(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def _store(self, key: str, value: bytes, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    async def add(self, key: str, value: bytes, ttl: float) -> bool:
+        with self._lock:
+            if self._live_entry(key) is not None:
+                return False
+            self._store(key, value, ttl)
+            return True
+
+    async def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    async def clear(self, prefix: str):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "maxsize": self.maxsize, "evictions": self.evictions}
+
+
+class RedisBackend:
+    """Shared backend for any client speaking the Redis protocol.
+
+    ``client`` is a ``redis.asyncio.Redis`` or a compatible stand-in such as
+    ``fakeredis.FakeAsyncRedis``.
+    """
+
+    name = "redis"
+
+    def __init__(self, client):
+        from redis.exceptions import RedisError
+
+        self.client = client
+        self._errors = (RedisError, OSError)
+
+    @classmethod
+    def from_url(cls, url: str = CACHE_URL) -> "RedisBackend":
+        import redis.asyncio as redis
+
+        return cls(redis.Redis.from_url(url))
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            return await self.client.get(key)
+        except self._errors as e:
+            raise CacheBackendError(str(e)) from e
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        try:
+            await self.client.set(key, value, px=max(int(ttl * 1000), 1))
+        except self._errors as e:
+            raise CacheBackendError(str(e)) from e
+
+    async def add(self, key: str, value: bytes, ttl: float) -> bool:
+        try:
+            return bool(await self.client.set(key, value, px=max(int(ttl * 1000), 1), nx=True))
+        except self._errors as e:
+            raise CacheBackendError(str(e)) from e
+
+    async def delete(self, *keys: str):
+        try:
+            await self.client.delete(*keys)
+        except self._errors as e:
+            raise CacheBackendError(str(e)) from e
+
+    async def clear(self, prefix: str):
+        try:
+            keys = [key async for key in self.client.scan_iter(match=f"{prefix}*")]
+            if keys:
+                await self.client.delete(*keys)
+        except self._errors as e:
+            raise CacheBackendError(str(e)) from e
+
+    def stats(self) -> dict:
+        return {"size": None, "maxsize": None, "evictions": None}
+
+
+class Cache:
+    """Read-through cache of serialized values over a pluggable backend.
+
+    Concurrent misses for the same key are collapsed: within a worker they
+    share one in-flight load, and across workers a short-lived lock key lets
+    one of them load while the others wait for its value. Backend failures
+    are counted and treated as misses, so the cache never fails a request.
+    """
+
+    def __init__(
+        self,
+        backend,
+        prefix: str = CACHE_PREFIX,
+        ttl: float = CACHE_TTL,
+        lock_timeout: float = CACHE_LOCK_TIMEOUT,
+    ):
+        self.backend = backend
+        self.prefix = prefix
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.coalesced = 0
+        self.lock_waits = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def namespace(
+        self, name: str, model: type[Model], ttl: Optional[float] = None
+    ) -> "CacheNamespace[Model]":
+        return CacheNamespace(self, name, model, self.ttl if ttl is None else ttl)
+
+    def _increment(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    async def _call(self, operation, *args, default=None):
+        try:
+            return await operation(*args)
+        except CacheBackendError:
+            self._increment("errors")
+            return default
+
+    async def _get_current(self, key: str, tag: bytes) -> Optional[bytes]:
+        cached = await self._call(self.backend.get, key)
+        if cached is None:
+            return None
+        cached_tag, _, payload = cached.partition(b"\n")
+        return payload if cached_tag == tag else None
+
+    async def get_or_load(
+        self,
+        key: str,
+        load: Callable[[], Awaitable[bytes]],
+        ttl: float,
+        version: Optional[str] = None,
+    ) -> bytes:
+        """Return the value cached under ``key`` or store what ``load`` returns.
+
+        A ``version`` is stored next to the value; an entry written for
+        another version counts as a miss.
+        """
+        if ttl <= 0:
+            return await load()
+
+        tag = b"" if version is None else str(version).encode()
+        payload = await self._get_current(key, tag)
+        if payload is not None:
+            self._increment("hits")
+            return payload
+        self._increment("misses")
+
+        flight_key = f"{key}\n{version}"
+        inflight = self._inflight.get(flight_key)
+        if inflight is not None:
+            self._increment("coalesced")
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[flight_key] = future
+        try:
+            payload = await self._load_once(key, load, ttl, tag)
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # waiters re-raise it; nobody else has to
+            raise
+        else:
+            future.set_result(payload)
+            return payload
+        finally:
+            del self._inflight[flight_key]
+
+    async def _load_once(self, key: str, load, ttl: float, tag: bytes) -> bytes:
+        # Per version, so a load for a newer version never waits on an older one.
+        lock_key = f"{key}:lock:{tag.decode()}" if tag else f"{key}:lock"
+        owns_lock = await self._call(
+            self.backend.add, lock_key, b"1", self.lock_timeout, default=True
+        )
+        if not owns_lock:
+            # Another worker is loading the key; give it a moment to finish.
+            self._increment("lock_waits")
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(_LOCK_POLL_SECONDS)
+                payload = await self._get_current(key, tag)
+                if payload is not None:
+                    self._increment("hits")
+                    return payload
+
+        try:
+            payload = await load()
+            self._increment("loads")
+            await self._call(self.backend.set, key, tag + b"\n" + payload, ttl)
+            return payload
+        finally:
+            if owns_lock:
+                await self._call(self.backend.delete, lock_key)
+
+    async def invalidate(self, *keys: str):
+        self._increment("invalidations")
+        await self._call(self.backend.delete, *keys)
+
+    async def generation(self, key: str) -> str:
+        """The token ``new_generation`` last stored under ``key``, or ""."""
+        value = await self._call(self.backend.get, key)
+        return value.decode() if value else ""
+
+    async def new_generation(self, key: str, ttl: float):
+        await self._call(self.backend.set, key, uuid.uuid4().hex.encode(), ttl)
+
+    async def clear(self):
+        await self._call(self.backend.clear, f"{self.prefix}:")
+
+    def stats(self) -> dict:
+        with self._lock:
+            data = {
+                "backend": self.backend.name,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "loads": self.loads,
+                "coalesced": self.coalesced,
+                "lock_waits": self.lock_waits,
+                "invalidations": self.invalidations,
+                "errors": self.errors,
+            }
+        data.update(self.backend.stats())
+        return data
+
+
+class CacheNamespace(Generic[Model]):
+    """Keys of one kind of pydantic model, e.g. ``"user"`` responses by id."""
+
+    def __init__(self, cache: Cache, name: str, model: type[Model], ttl: float):
+        self.cache = cache
+        self.name = name
+        self.model = model
+        self.ttl = ttl
+
+    def key(self, key) -> str:
+        return f"{self.cache.prefix}:{self.name}:{key}"
+
+    async def get_or_load(
+        self, key, load: Callable[[], Awaitable[Model]], version: Optional[str] = None
+    ) -> Model:
+        async def load_json() -> bytes:
+            return (await load()).model_dump_json().encode()
+
+        payload = await self.cache.get_or_load(self.key(key), load_json, self.ttl, version)
+        return self.model.model_validate_json(payload)
+
+    async def invalidate(self, key):
+        await self.cache.invalidate(self.key(key))
+
+    def generation_key(self, group) -> str:
+        return f"{self.cache.prefix}:{self.name}:generation:{group}"
+
+    async def generation(self, group) -> str:
+        """Version for the keys of ``group`` that no table column can provide.
+
+        Passed as ``version`` to ``get_or_load``, it makes an entry that a
+        load in flight stores after ``new_generation`` a miss, which deleting
+        the key alone cannot.
+        """
+        return await self.cache.generation(self.generation_key(group))
+
+    async def new_generation(self, group):
+        await self.cache.new_generation(
+            self.generation_key(group), self.ttl * _GENERATION_TTL_FACTOR
+        )
+
+
+def create_backend():
+    if CACHE_BACKEND not in CACHE_BACKENDS:
+        raise ValueError(f"CACHE_BACKEND must be one of {', '.join(CACHE_BACKENDS)}")
+    if CACHE_BACKEND == "redis":
+        return RedisBackend.from_url(CACHE_URL)
+    return MemoryBackend(CACHE_SIZE)
+
+
+cache = Cache(create_backend())
@@ -1,12 +1,45 @@
+from typing import Optional
+
 from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 
+from app.core.pool import PoolStats, engine_options, instrument_engine
+from app.core.query_stats import instrument_queries
+
 DATABASE_URL = os.environ.get("DATABASE_URL")
-engine = create_engine(DATABASE_URL)
+sync_pool_stats = PoolStats()
+engine = create_engine(DATABASE_URL, **engine_options(False, sync_pool_stats))
+instrument_engine(engine, sync_pool_stats)
+instrument_queries(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def get_async_database_url(url: str) -> str:
+    """Rewrite a ``postgresql://`` URL so it uses the asyncpg driver."""
+    return (
+        make_url(url)
+        .set(drivername="postgresql+asyncpg")
+        .render_as_string(hide_password=False)
+    )
+
+
+# The routers run on the event loop, so they use the async engine. The sync
+# engine above is kept for migrations, table creation and scripts.
+async_pool_stats = PoolStats()
+async_engine = create_async_engine(
+    get_async_database_url(DATABASE_URL), **engine_options(True, async_pool_stats)
+)
+instrument_engine(async_engine.sync_engine, async_pool_stats)
+instrument_queries(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
@@ -16,3 +49,23 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def violated_constraint(error: IntegrityError) -> Optional[str]:
+    """Name of the constraint that raised ``error``, for asyncpg and psycopg2."""
+    name = getattr(error.orig.__cause__, "constraint_name", None)
+    if name is None:
+        name = getattr(getattr(error.orig, "diag", None), "constraint_name", None)
+    return name
+
+
+def get_pool_status() -> dict:
+    return {
+        "async_engine": async_pool_stats.snapshot(async_engine.sync_engine.pool),
+        "sync_engine": sync_pool_stats.snapshot(engine.pool),
+    }
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+# "queue" keeps a pool per worker, "null" opens a connection per checkout and
+# "pgbouncer" is "null" with asyncpg's prepared statement caches turned off,
+# which transaction-mode PgBouncer requires.
+DB_POOL_MODE = os.environ.get("DB_POOL_MODE", "queue")
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", -1))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+
+POOL_MODES = ("queue", "null", "pgbouncer")
+
+
+class PoolStats:
+    """Counters for one engine's pool, shared by every pool it recreates."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checked_out = 0
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def increment(self, name: str, amount: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            data = {
+                "mode": DB_POOL_MODE,
+                "checked_out": self.checked_out,
+                "checkouts": self.checkouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": self.wait_seconds_total,
+                "wait_seconds_max": self.wait_seconds_max,
+                "wait_seconds_avg": (
+                    self.wait_seconds_total / self.checkouts if self.checkouts else 0.0
+                ),
+            }
+        if isinstance(pool, QueuePool):
+            data.update(size=pool.size(), idle=pool.checkedin(), overflow=max(pool.overflow(), 0))
+        else:
+            data.update(size=None, idle=0, overflow=0)
+        return data
+
+
+class _TimedCheckoutMixin:
+    """Times how long each ``connect()`` waits for a connection."""
+
+    stats: PoolStats
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record_wait(time.perf_counter() - start)
+        return connection
+
+
+def engine_options(is_async: bool, stats: PoolStats) -> dict:
+    """Build the pool keyword arguments for ``create_engine``."""
+    if DB_POOL_MODE not in POOL_MODES:
+        raise ValueError(f"DB_POOL_MODE must be one of {', '.join(POOL_MODES)}")
+
+    if DB_POOL_MODE == "queue":
+        base = AsyncAdaptedQueuePool if is_async else QueuePool
+        options = {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+        }
+    else:
+        base = NullPool
+        options = {}
+        if DB_POOL_MODE == "pgbouncer" and is_async:
+            options["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+            }
+
+    # Pools are recreated with ``self.__class__`` on dispose, so the stats live
+    # on a per-engine subclass rather than on the pool instance.
+    options["poolclass"] = type(
+        f"Instrumented{base.__name__}", (_TimedCheckoutMixin, base), {"stats": stats}
+    )
+    options["pool_pre_ping"] = DB_POOL_PRE_PING
+    return options
+
+
+def instrument_engine(engine: Engine, stats: PoolStats):
+    """Keep ``stats`` in step with the engine's pool events."""
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        stats.increment("connects")
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.increment("checkouts")
+        stats.increment("checked_out")
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        stats.increment("checked_out", -1)
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        stats.increment("invalidations")
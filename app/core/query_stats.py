@@ -0,0 +1,119 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# DEBUG=true returns every response's statement count and database time as
+# headers.
+DEBUG = os.environ.get("DEBUG", "false").lower() == "true"
+# The same statement run this many times in one request, each time with
+# different parameters, is reported as an N+1 query: logged, or raised as
+# NPlusOneError with N_PLUS_ONE_RAISE=true (the test suite does this).
+N_PLUS_ONE_THRESHOLD = int(os.environ.get("N_PLUS_ONE_THRESHOLD", 5))
+N_PLUS_ONE_RAISE = os.environ.get("N_PLUS_ONE_RAISE", "false").lower() == "true"
+
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+QUERY_TIME_HEADER = "X-DB-Query-Time-Ms"
+
+logger = logging.getLogger(__name__)
+
+
+class NPlusOneError(Exception):
+    """A request ran the same statement over and over for different rows."""
+
+
+class QueryStats:
+    """Statements one request (or ``track_queries`` block) sent to the database."""
+
+    def __init__(self, threshold: Optional[int] = None, raise_on_n_plus_one: Optional[bool] = None):
+        self.threshold = N_PLUS_ONE_THRESHOLD if threshold is None else threshold
+        self.raise_on_n_plus_one = (
+            N_PLUS_ONE_RAISE if raise_on_n_plus_one is None else raise_on_n_plus_one
+        )
+        self.count = 0
+        self.seconds = 0.0
+        self.n_plus_one: list[str] = []
+        self._parameters: dict[str, set[str]] = {}
+
+    def record(self, statement: str, parameters):
+        self.count += 1
+        if not parameters:
+            return
+        seen = self._parameters.setdefault(statement, set())
+        seen.add(repr(parameters))
+        if len(seen) != self.threshold:
+            return
+        self.n_plus_one.append(statement)
+        message = f"N+1 query: ran {self.threshold} times with different parameters: {statement}"
+        if self.raise_on_n_plus_one:
+            raise NPlusOneError(message)
+        logger.warning(message)
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def track_queries(**options):
+    """Attribute the statements run inside the block to a new ``QueryStats``."""
+    stats = QueryStats(**options)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def instrument_queries(engine: Engine):
+    """Count and time ``engine``'s statements against the current ``QueryStats``.
+
+    SQLAlchemy runs these hooks in the caller's context, also for the async
+    engine, so the work is attributed to whichever request issued it.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _current.get()
+        if stats is None:
+            return
+        # One executemany is a batch, not a statement per row.
+        stats.record(statement, None if executemany else parameters)
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _current.get()
+        started = getattr(context, "_query_started", None)
+        if stats is not None and started is not None:
+            stats.seconds += time.perf_counter() - started
+
+
+class QueryStatsMiddleware:
+    """Track every request's statements, and in debug mode report them as
+    ``X-DB-Query-Count`` and ``X-DB-Query-Time-Ms`` response headers."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+
+            async def send_with_headers(message):
+                if message["type"] == "http.response.start" and DEBUG:
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (QUERY_COUNT_HEADER.lower().encode(), str(stats.count).encode()),
+                        (QUERY_TIME_HEADER.lower().encode(), f"{stats.seconds * 1000:.2f}".encode()),
+                    ]
+                await send(message)
+
+            await self.app(scope, receive, send_with_headers)
@@ -1,10 +1,12 @@
 from typing import Annotated
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends, HTTPException, Header, status
 from jose import JWTError, jwt
-from app.core.database import get_db
+from app.core.database import get_async_db
+from app.core.principal_cache import principal_cache
 import os
 from app.models.users import User
+from app.schemas.user import AuthenticatedUser
 SECRET_KEY = os.environ.get("SECRET_KEY")
 ALGORITHM = os.environ.get("ALGORITHM")
 
@@ -20,8 +22,8 @@ async def get_token(credentials: HTTPAuthorizationCredentials = Depends(security
 
 
 async def get_auth_user(
-    token: str = Depends(get_token), db: Session = Depends(get_db)
-) -> User:
+    token: str = Depends(get_token), db: AsyncSession = Depends(get_async_db)
+) -> AuthenticatedUser:
 
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -37,10 +39,16 @@ async def get_auth_user(
             detail=f"Invalid authentication credentials: {str(e)}",
         )
 
-    user = db.query(User).get(user_id)
+    cached_user = principal_cache.get(int(user_id))
+    if cached_user is not None:
+        return cached_user
+
+    user = await db.get(User, int(user_id))
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
         )
-    return user
+    auth_user = AuthenticatedUser.model_validate(user)
+    principal_cache.set(auth_user)
+    return auth_user
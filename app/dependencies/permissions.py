@@ -1,9 +1,9 @@
 from fastapi import HTTPException,status, Depends
 from app.dependencies.auth import get_auth_user
-from app.models.users import User
+from app.schemas.user import AuthenticatedUser
 
 
-async def is_admin(user: User = Depends(get_auth_user)):
+async def is_admin(user: AuthenticatedUser = Depends(get_auth_user)):
     if user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -12,7 +12,7 @@ async def is_admin(user: User = Depends(get_auth_user)):
     return user
 
 
-async def is_doctor(user: User = Depends(get_auth_user)):
+async def is_doctor(user: AuthenticatedUser = Depends(get_auth_user)):
     if user.role != "doctor":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -21,7 +21,7 @@ async def is_doctor(user: User = Depends(get_auth_user)):
     return user
 
 
-async def is_patient(user: User = Depends(get_auth_user)):
+async def is_patient(user: AuthenticatedUser = Depends(get_auth_user)):
     if user.role != "patient":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -30,7 +30,7 @@ async def is_patient(user: User = Depends(get_auth_user)):
     return user
 
 
-async def is_admin_or_doctor(user: User = Depends(get_auth_user)):
+async def is_admin_or_doctor(user: AuthenticatedUser = Depends(get_auth_user)):
     if user.role not in ["admin", "doctor"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -41,7 +41,7 @@ async def is_admin_or_doctor(user: User = Depends(get_auth_user)):
 
 #is_patient or doctor
 
-async def is_patient_or_doctor(user: User = Depends(get_auth_user)):
+async def is_patient_or_doctor(user: AuthenticatedUser = Depends(get_auth_user)):
     if user.role not in ["patient", "doctor"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -2,7 +2,11 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.database import engine, Base
-from app.routers import users, appointments
+from app.core.metrics import MetricsMiddleware
+from app.core.query_stats import QueryStatsMiddleware
+from app.routers import users, appointments, monitoring
+from app.utils.pagination import NEXT_CURSOR_HEADER
+from app.utils.profiling import PROFILE_ARTIFACT_HEADER, ProfilingMiddleware
 
 app = FastAPI(
     title="La Hospital",
@@ -17,6 +21,11 @@ app = FastAPI(
         "email": "sanusiabubakr343@gmail.com",
     },
 )
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
+# Outside the app's own layers, so a profiled request is profiled through all
+# of them, but inside CORS, so preflights and refusals still get CORS headers.
+app.add_middleware(ProfilingMiddleware)
 # Set up CORS
 app.add_middleware(
     CORSMiddleware,
@@ -24,12 +33,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, PROFILE_ARTIFACT_HEADER],
 )
 
 
 # Include routers
 app.include_router(users.router)
 app.include_router(appointments.router)
+app.include_router(monitoring.router)
+app.include_router(monitoring.metrics_router)
 
 
 @app.get("/")
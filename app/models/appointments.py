@@ -1,8 +1,32 @@
 import datetime
-from sqlalchemy import TIMESTAMP, Column, ForeignKey, Integer, String, DateTime, text
+from sqlalchemy import (
+    DDL,
+    TIMESTAMP,
+    Column,
+    Computed,
+    Date,
+    Enum,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    DateTime,
+    event,
+    text,
+)
+from sqlalchemy.dialects.postgresql import TSRANGE, ExcludeConstraint
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
+SLOT_OVERLAP_CONSTRAINT = "excl_available_time_slots_doctor_overlap"
+SCHEDULED_SLOT_INDEX = "uq_appointments_scheduled_time_slot"
+APPOINTMENT_STATUSES = ("scheduled", "completed", "canceled")
+
+# GiST needs btree_gist to index the plain equality on doctor_id.
+event.listen(
+    Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS btree_gist")
+)
+
 
 class Appointment(Base):
     __tablename__ = "appointments"
@@ -15,7 +39,7 @@ class Appointment(Base):
     available_time_slot_id = Column(
         Integer, ForeignKey("available_time_slots.id", ondelete="SET NULL"), index=True
     )
-    status = Column(String)  # e.g., 'scheduled', 'completed', 'canceled'
+    status = Column(Enum(*APPOINTMENT_STATUSES, name="appointment_status"))
     created_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"))
     updated_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"), onupdate=datetime.datetime.utcnow)
 
@@ -26,6 +50,27 @@ class Appointment(Base):
         "AvailableTimeSlot", back_populates="appointments", passive_deletes=True
     )
 
+    # Keyset pagination walks (created_at, id), optionally per participant.
+    __table_args__ = (
+        Index("ix_appointments_created_at_id", "created_at", "id"),
+        Index("ix_appointments_doctor_id_created_at_id", "doctor_id", "created_at", "id"),
+        Index("ix_appointments_patient_id_created_at_id", "patient_id", "created_at", "id"),
+        # A slot can only have one scheduled appointment at a time.
+        Index(
+            SCHEDULED_SLOT_INDEX,
+            "available_time_slot_id",
+            unique=True,
+            postgresql_where=text("status = 'scheduled'"),
+        ),
+        # Bulk operations pick a doctor's scheduled appointments, which stay
+        # few while their completed and canceled history keeps growing.
+        Index(
+            "ix_appointments_scheduled_doctor_id",
+            "doctor_id",
+            postgresql_where=text("status = 'scheduled'"),
+        ),
+    )
+
 
 class AvailableTimeSlot(Base):
     __tablename__ = "available_time_slots"
@@ -34,6 +79,9 @@ class AvailableTimeSlot(Base):
     doctor_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
     start_time = Column(DateTime)
     end_time = Column(DateTime)
+    # Half-open [start, end) range kept in sync by Postgres, so back-to-back
+    # slots do not count as overlapping.
+    during = Column(TSRANGE, Computed("tsrange(start_time, end_time)", persisted=True))
     created_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"))
     updated_at = Column(
         TIMESTAMP(timezone=True), server_default=text("now()"), onupdate=datetime.datetime.utcnow
@@ -42,3 +90,109 @@ class AvailableTimeSlot(Base):
     appointments = relationship(
         "Appointment", back_populates="available_time_slot", passive_deletes=True
     )
+
+    __table_args__ = (
+        Index("ix_available_time_slots_created_at_id", "created_at", "id"),
+        # Availability search scans slots by start time, per doctor or overall.
+        Index("ix_available_time_slots_doctor_id_start_time", "doctor_id", "start_time"),
+        Index("ix_available_time_slots_start_time", "start_time"),
+        ExcludeConstraint(
+            (doctor_id, "="), (during, "&&"), name=SLOT_OVERLAP_CONSTRAINT, using="gist"
+        ),
+    )
+
+
+class AppointmentDailyStat(Base):
+    """Appointments per doctor, slot day and status.
+
+    Maintained by the triggers below rather than by the services, so bulk
+    statements and foreign key actions (deleted slots or doctors) keep it in
+    step with the appointments table too.
+    """
+
+    __tablename__ = "appointment_daily_stats"
+
+    doctor_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+    status = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, server_default=text("0"))
+
+    __table_args__ = (Index("ix_appointment_daily_stats_day", "day"),)
+
+
+APPOINTMENT_DAILY_STATS_DDL = """
+CREATE OR REPLACE FUNCTION bump_appointment_daily_stat(
+    p_doctor_id integer, p_time_slot_id integer, p_status varchar, p_delta integer
+) RETURNS void AS $$
+DECLARE
+    slot_day date;
+BEGIN
+    IF p_doctor_id IS NULL OR p_time_slot_id IS NULL OR p_status IS NULL THEN
+        RETURN;
+    END IF;
+    SELECT start_time::date INTO slot_day FROM available_time_slots WHERE id = p_time_slot_id;
+    -- A slot being deleted has already taken its appointments off the stats.
+    IF slot_day IS NULL THEN
+        RETURN;
+    END IF;
+    INSERT INTO appointment_daily_stats AS stats (doctor_id, day, status, count)
+    VALUES (p_doctor_id, slot_day, p_status, p_delta)
+    ON CONFLICT (doctor_id, day, status) DO UPDATE SET count = stats.count + EXCLUDED.count;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION appointments_maintain_daily_stats() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+        AND NEW.doctor_id IS NOT DISTINCT FROM OLD.doctor_id
+        AND NEW.available_time_slot_id IS NOT DISTINCT FROM OLD.available_time_slot_id
+        AND NEW.status IS NOT DISTINCT FROM OLD.status THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM bump_appointment_daily_stat(OLD.doctor_id, OLD.available_time_slot_id, OLD.status::text, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM bump_appointment_daily_stat(NEW.doctor_id, NEW.available_time_slot_id, NEW.status::text, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION available_time_slots_maintain_daily_stats() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' OR OLD.start_time::date IS DISTINCT FROM NEW.start_time::date THEN
+        INSERT INTO appointment_daily_stats AS stats (doctor_id, day, status, count)
+        SELECT appointments.doctor_id, moves.day, appointments.status::text, sum(moves.delta)
+        FROM appointments
+        CROSS JOIN (
+            VALUES
+                (OLD.start_time::date, -1),
+                (CASE WHEN TG_OP = 'UPDATE' THEN NEW.start_time::date END, 1)
+        ) AS moves (day, delta)
+        WHERE appointments.available_time_slot_id = OLD.id
+            AND appointments.doctor_id IS NOT NULL
+            AND appointments.status IS NOT NULL
+            AND moves.day IS NOT NULL
+        GROUP BY appointments.doctor_id, moves.day, appointments.status::text
+        ON CONFLICT (doctor_id, day, status) DO UPDATE SET count = stats.count + EXCLUDED.count;
+    END IF;
+    IF TG_OP = 'DELETE' THEN
+        RETURN OLD;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_appointments_daily_stats
+AFTER INSERT OR DELETE OR UPDATE OF doctor_id, available_time_slot_id, status ON appointments
+FOR EACH ROW EXECUTE FUNCTION appointments_maintain_daily_stats();
+
+-- BEFORE DELETE, so the slot's appointments are counted off while the slot
+-- still tells their day, ahead of the ON DELETE SET NULL on appointments.
+CREATE TRIGGER trg_available_time_slots_daily_stats
+BEFORE DELETE OR UPDATE OF start_time ON available_time_slots
+FOR EACH ROW EXECUTE FUNCTION available_time_slots_maintain_daily_stats();
+"""
+
+event.listen(Base.metadata, "after_create", DDL(APPOINTMENT_DAILY_STATS_DDL))
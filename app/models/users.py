@@ -1,9 +1,15 @@
 import datetime
-from sqlalchemy import JSON, TIMESTAMP, Column, Integer, String, DateTime, ForeignKey, text
+from sqlalchemy import DDL, TIMESTAMP, Column, Index, Integer, String, DateTime, ForeignKey, event, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 
 from app.core.database import Base
 
+# Trigram indexes back the substring and fuzzy user search.
+event.listen(
+    Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+)
+
 
 class User(Base):
     __tablename__ = "users"
@@ -19,6 +25,25 @@ class User(Base):
     doctor_profile = relationship("DoctorProfile", back_populates="user", uselist=False)
     available_time_slots = relationship("AvailableTimeSlot", back_populates="doctor")
 
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+        Index(
+            "ix_users_full_name_trgm",
+            "full_name",
+            postgresql_using="gin",
+            postgresql_ops={"full_name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_users_email_trgm",
+            "email",
+            postgresql_using="gin",
+            postgresql_ops={"email": "gin_trgm_ops"},
+        ),
+        # text_pattern_ops lets a left-anchored LIKE use the btree whatever the
+        # database collation is.
+        Index("ix_users_lower_email_pattern", text("lower(email) text_pattern_ops")),
+    )
+
 class DoctorProfile(Base):
     __tablename__ = "doctor_profiles"
 
@@ -26,7 +51,20 @@ class DoctorProfile(Base):
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), unique=True, index=True)
     specialization = Column(String)
     experience_years = Column(Integer)
-    academic_history = Column(JSON)  
+    academic_history = Column(JSONB)
     bio = Column(String)
 
     user = relationship("User", back_populates="doctor_profile", passive_deletes=True)
+
+    __table_args__ = (
+        Index(
+            "ix_doctor_profiles_lower_specialization_experience",
+            text("lower(specialization)"),
+            "experience_years",
+        ),
+        Index("ix_doctor_profiles_academic_history", "academic_history", postgresql_using="gin"),
+        # The directory lists the most experienced doctors first.
+        Index(
+            "ix_doctor_profiles_experience_user_id", text("experience_years DESC"), "user_id"
+        ),
+    )
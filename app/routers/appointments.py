@@ -1,22 +1,44 @@
 # app/routers/appointments.py
 
+from datetime import date, datetime, timedelta
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db
 from app.dependencies.auth import get_auth_user
-from app.dependencies.permissions import is_doctor, is_patient, is_patient_or_doctor
-from app.models.users import User
+from app.dependencies.permissions import (
+    is_admin,
+    is_admin_or_doctor,
+    is_doctor,
+    is_patient,
+    is_patient_or_doctor,
+)
 from app.schemas.appointment import (
     ApointmentDetail,
     AppointmentResponse,
+    AppointmentStats,
     AvailableTimeSlotCreate,
     AvailableTimeSlotResponse,
+    BulkBookAppointments,
+    BulkCancelAppointments,
+    BulkOperationSummary,
+    BulkReassignAppointments,
     CreateAppointment,
+    DoctorCalendar,
+    MAX_CALENDAR_DAYS,
+    MAX_STATS_DAYS,
+    RecurringTimeSlotCreate,
+    RecurringTimeSlotResult,
+    naive_utc,
 )
+from app.schemas.user import AuthenticatedUser
 from fastapi import status
 
-from app.services.appointments import AppointmentService
+from app.services.appointments import APPOINTMENT_EXPORT_FIELDS, AppointmentService
+from app.utils.etag import etag_matches, make_etag, not_modified, set_etag
+from app.utils.export import EXPORT_FORMATS, csv_lines, ndjson_lines
+from app.utils.pagination import NEXT_CURSOR_HEADER, next_cursor
 
 router = APIRouter(
     prefix="/appointments",
@@ -31,10 +53,23 @@ router = APIRouter(
 )
 async def create_time_slot(
     time_slot: AvailableTimeSlotCreate,
-    current_user: User = Depends(is_doctor),
-    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(is_doctor),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await AppointmentService.create_time_slot(db, current_user.id, time_slot)
+
+
+@router.post(
+    "/create-recurring-time-slots",
+    response_model=RecurringTimeSlotResult,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_recurring_time_slots(
+    schedule: RecurringTimeSlotCreate,
+    current_user: AuthenticatedUser = Depends(is_doctor),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    return AppointmentService.create_time_slot(db, current_user.id, time_slot)
+    return await AppointmentService.create_recurring_time_slots(db, current_user.id, schedule)
 
 
 @router.get(
@@ -44,39 +79,108 @@ async def create_time_slot(
 )
 async def get_time_slot(
     time_slot_id: int,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    if_none_match: Optional[str] = Header(None),
 ):
-    return AppointmentService.get_time_slot(db, time_slot_id)
+    version = await AppointmentService.get_time_slot_version(db, time_slot_id)
+    etag = make_etag("time-slot", time_slot_id, version.isoformat())
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    return await AppointmentService.get_time_slot(db, time_slot_id, version)
 
 
 @router.delete("/delete-time-slot/{time_slot_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_time_slot(
     time_slot_id: int,
-    current_user: User = Depends(is_doctor),
-    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(is_doctor),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    AppointmentService.delete_time_slot(db, time_slot_id, current_user.id)
+    await AppointmentService.delete_time_slot(db, time_slot_id, current_user.id)
 
 
 @router.put("/update-time-slot/{time_slot_id}", response_model=AvailableTimeSlotResponse, status_code=status.HTTP_200_OK)
 async def update_time_slot(
     time_slot_id: int,
     time_slot: AvailableTimeSlotCreate,
-    current_user: User = Depends(is_doctor),
-    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(is_doctor),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    return AppointmentService.update_time_slot(db, time_slot_id, current_user.id, time_slot)
+    return await AppointmentService.update_time_slot(db, time_slot_id, current_user.id, time_slot)
 
 
 @router.get("/get-all-time-slots", response_model=list[AvailableTimeSlotResponse], status_code=status.HTTP_200_OK)
 async def get_all_time_slots(
-    auth_user: User = Depends(get_auth_user),
-    db: Session = Depends(get_db),
+    response: Response,
+    auth_user: AuthenticatedUser = Depends(get_auth_user),
+    db: AsyncSession = Depends(get_async_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1),
     sort_order: Optional[str] = Query("asc", regex="^(asc|desc)$"),
+    cursor: Optional[str] = None,
+):
+    time_slots = await AppointmentService.get_all_time_slots(
+        db, skip=skip, limit=limit, sort_order=sort_order, cursor=cursor
+    )
+    if cursor_for_next_page := next_cursor(time_slots, limit):
+        response.headers[NEXT_CURSOR_HEADER] = cursor_for_next_page
+    return time_slots
+
+
+@router.get(
+    "/search-available-time-slots",
+    response_model=list[AvailableTimeSlotResponse],
+    status_code=status.HTTP_200_OK,
+)
+async def search_available_time_slots(
+    auth_user: AuthenticatedUser = Depends(get_auth_user),
+    db: AsyncSession = Depends(get_async_db),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    doctor_id: Optional[int] = None,
+    specialization: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+):
+    # Without a window, search from now over the next 30 days.
+    start = naive_utc(start) if start else datetime.utcnow()
+    end = naive_utc(end) if end else start + timedelta(days=30)
+    if end <= start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end must be greater than start",
+        )
+    return await AppointmentService.search_available_time_slots(
+        db,
+        start,
+        end,
+        doctor_id=doctor_id,
+        specialization=specialization,
+        skip=skip,
+        limit=limit,
+    )
+
+
+@router.get(
+    "/doctor-calendar/{doctor_id}",
+    response_model=DoctorCalendar,
+    status_code=status.HTTP_200_OK,
+)
+async def get_doctor_calendar(
+    doctor_id: int,
+    current_user: AuthenticatedUser = Depends(is_admin_or_doctor),
+    db: AsyncSession = Depends(get_async_db),
+    start: Optional[date] = None,
+    days: int = Query(7, ge=1, le=MAX_CALENDAR_DAYS),
 ):
-    return AppointmentService.get_all_time_slots(db, skip=skip, limit=limit, sort_order=sort_order)
+    if current_user.role == "doctor" and current_user.id != doctor_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Doctors can only view their own calendar",
+        )
+    start = start or datetime.utcnow().date()
+    return await AppointmentService.get_doctor_calendar(db, doctor_id, start, days)
 
 
 @router.post(
@@ -84,10 +188,10 @@ async def get_all_time_slots(
 )
 async def create_appointment(
     appointment: CreateAppointment,
-    current_user: User = Depends(is_patient),
-    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(is_patient),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    return AppointmentService.create_appointment(db, current_user.id, appointment)
+    return await AppointmentService.create_appointment(db, current_user.id, appointment)
 
 
 @router.post(
@@ -97,10 +201,10 @@ async def create_appointment(
 )
 async def complete_appointment(
     appointment_id: int,
-    current_user: User = Depends(is_doctor),
-    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(is_doctor),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    return AppointmentService.complete_appointment(db, appointment_id, current_user.id)
+    return await AppointmentService.complete_appointment(db, appointment_id, current_user.id)
 
 
 @router.post(
@@ -110,29 +214,118 @@ async def complete_appointment(
 )
 async def cancel_appointment(
     appointment_id: int,
-    current_user: User = Depends(is_patient_or_doctor),
-    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(is_patient_or_doctor),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    return AppointmentService.cancel_appointment(
+    return await AppointmentService.cancel_appointment(
         db, appointment_id, current_user.id, current_user.role
     )
 
 
+@router.post(
+    "/bulk-cancel-appointments",
+    response_model=BulkOperationSummary,
+    status_code=status.HTTP_200_OK,
+)
+async def bulk_cancel_appointments(
+    selection: BulkCancelAppointments,
+    current_user: AuthenticatedUser = Depends(is_admin),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await AppointmentService.bulk_cancel_appointments(db, selection)
+
+
+@router.post(
+    "/bulk-reassign-appointments",
+    response_model=BulkOperationSummary,
+    status_code=status.HTTP_200_OK,
+)
+async def bulk_reassign_appointments(
+    selection: BulkReassignAppointments,
+    current_user: AuthenticatedUser = Depends(is_admin),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await AppointmentService.bulk_reassign_appointments(db, selection)
+
+
+@router.post(
+    "/bulk-book-appointments",
+    response_model=BulkOperationSummary,
+    status_code=status.HTTP_200_OK,
+)
+async def bulk_book_appointments(
+    bookings: BulkBookAppointments,
+    current_user: AuthenticatedUser = Depends(is_admin),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await AppointmentService.bulk_book_appointments(db, bookings)
+
+
 @router.get(
     "/get-all-appointments",
     response_model=list[AppointmentResponse],
     status_code=status.HTTP_200_OK,
 )
 async def get_all_appointments(
-    auth_user: User = Depends(get_auth_user),
-    db: Session = Depends(get_db),
+    response: Response,
+    auth_user: AuthenticatedUser = Depends(get_auth_user),
+    db: AsyncSession = Depends(get_async_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1),
     sort_order: Optional[str] = Query("asc", regex="^(asc|desc)$"),
+    cursor: Optional[str] = None,
 ):
-    return AppointmentService.get_all_appointments(
-        db, auth_user.id, auth_user.role, skip, limit, sort_order
+    appointments = await AppointmentService.get_all_appointments(
+        db, auth_user.id, auth_user.role, skip, limit, sort_order, cursor
     )
+    if cursor_for_next_page := next_cursor(appointments, limit):
+        response.headers[NEXT_CURSOR_HEADER] = cursor_for_next_page
+    return appointments
+
+
+@router.get("/export-appointments", status_code=status.HTTP_200_OK)
+async def export_appointments(
+    current_user: AuthenticatedUser = Depends(is_admin),
+    db: AsyncSession = Depends(get_async_db),
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    appointment_status: Optional[str] = Query(
+        None, alias="status", regex="^(scheduled|completed|canceled)$"
+    ),
+    doctor_id: Optional[int] = None,
+):
+    rows = AppointmentService.stream_appointments(db, appointment_status, doctor_id)
+    if format == "csv":
+        body = csv_lines(rows, APPOINTMENT_EXPORT_FIELDS)
+    else:
+        body = ndjson_lines(rows)
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="appointments.{format}"'},
+    )
+
+
+@router.get("/appointment-stats", response_model=AppointmentStats, status_code=status.HTTP_200_OK)
+async def get_appointment_stats(
+    current_user: AuthenticatedUser = Depends(is_admin),
+    db: AsyncSession = Depends(get_async_db),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    doctor_id: Optional[int] = None,
+):
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=30)
+    if end < start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end must not be before start",
+        )
+    if (end - start).days >= MAX_STATS_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The window may span at most {MAX_STATS_DAYS} days",
+        )
+    return await AppointmentService.get_appointment_stats(db, start, end, doctor_id)
 
 
 @router.get(
@@ -142,7 +335,14 @@ async def get_all_appointments(
 )
 async def get_appointment(
     appointment_id: int,
-    auth_user: User = Depends(get_auth_user),
-    db: Session = Depends(get_db),
+    response: Response,
+    auth_user: AuthenticatedUser = Depends(get_auth_user),
+    db: AsyncSession = Depends(get_async_db),
+    if_none_match: Optional[str] = Header(None),
 ):
-    return AppointmentService.get_appointment(db, appointment_id)
+    version = await AppointmentService.get_appointment_version(db, appointment_id)
+    etag = make_etag("appointment", appointment_id, version.isoformat())
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    return await AppointmentService.get_appointment(db, appointment_id)
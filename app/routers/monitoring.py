@@ -0,0 +1,67 @@
+# app/routers/monitoring.py
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.responses import FileResponse
+
+from app.core.cache import cache
+from app.core.database import get_pool_status
+from app.core.metrics import render_metrics
+from app.core.principal_cache import principal_cache
+from app.dependencies.permissions import is_admin
+from app.schemas.monitoring import (
+    AuthCacheStatus,
+    CacheStatus,
+    DatabasePoolStatus,
+    PasswordHashingStatus,
+)
+from app.schemas.user import AuthenticatedUser
+from app.utils.auth import password_hasher
+from app.utils.profiling import profile_path
+
+router = APIRouter(
+    prefix="/monitoring",
+    tags=["monitoring"],
+)
+
+# Scraped by Prometheus, which cannot log in, so it sits outside /monitoring.
+metrics_router = APIRouter(tags=["monitoring"])
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def metrics():
+    content, media_type = render_metrics()
+    return Response(content=content, media_type=media_type)
+
+
+@router.get("/db-pool", response_model=DatabasePoolStatus, status_code=status.HTTP_200_OK)
+async def db_pool_status(current_user: AuthenticatedUser = Depends(is_admin)):
+    return get_pool_status()
+
+
+@router.get("/auth-cache", response_model=AuthCacheStatus, status_code=status.HTTP_200_OK)
+async def auth_cache_status(current_user: AuthenticatedUser = Depends(is_admin)):
+    return principal_cache.stats()
+
+
+@router.get("/cache", response_model=CacheStatus, status_code=status.HTTP_200_OK)
+async def cache_status(current_user: AuthenticatedUser = Depends(is_admin)):
+    return cache.stats()
+
+
+@router.get(
+    "/password-hashing", response_model=PasswordHashingStatus, status_code=status.HTTP_200_OK
+)
+async def password_hashing_status(current_user: AuthenticatedUser = Depends(is_admin)):
+    return password_hasher.stats()
+
+
+@router.get("/profiles/{name}", response_class=FileResponse, status_code=status.HTTP_200_OK)
+async def download_profile(name: str, current_user: AuthenticatedUser = Depends(is_admin)):
+    """An artifact written for a request sent with ``X-Profile`` or ``?profile=``."""
+    path = profile_path(name)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found",
+        )
+    return FileResponse(path, filename=name)
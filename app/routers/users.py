@@ -1,13 +1,13 @@
 # app/routers/users.py
 
 import enum
-from fastapi import APIRouter, Body, Depends, Form, HTTPException, status
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from fastapi import APIRouter, Body, Depends, Form, Header, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db
 from app.dependencies.auth import get_auth_user
 from app.dependencies.permissions import is_doctor
-from app.models.users import User
 from app.schemas.user import (
+    AuthenticatedUser,
     CreateDoctorProfile,
     LoginUser,
     Token,
@@ -15,11 +15,14 @@ from app.schemas.user import (
     UpdateDoctorProfile,
     CreateUser,
     DoctorProfileResponse,
+    DoctorCard,
     UserRole,
 )
 from typing import Annotated, Optional
 from fastapi import Query
 from app.services.users import UserService
+from app.utils.etag import etag_matches, make_etag, not_modified, set_etag
+from app.utils.pagination import NEXT_CURSOR_HEADER, next_cursor
 
 router = APIRouter(
     prefix="/users",
@@ -28,13 +31,13 @@ router = APIRouter(
 
 
 @router.post("/login", response_model=Token, status_code=status.HTTP_200_OK)
-async def login(form_data: LoginUser, db: Session = Depends(get_db)):
-    return UserService.login(db, form_data)
+async def login(form_data: LoginUser, db: AsyncSession = Depends(get_async_db)):
+    return await UserService.login(db, form_data)
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register_user(user: Annotated[CreateUser, Form()], db: Session = Depends(get_db)):
-    return UserService.register_user(db, user)
+async def register_user(user: Annotated[CreateUser, Form()], db: AsyncSession = Depends(get_async_db)):
+    return await UserService.register_user(db, user)
 
 
 @router.post(
@@ -42,43 +45,76 @@ async def register_user(user: Annotated[CreateUser, Form()], db: Session = Depen
 )
 async def create_doctor_profile(
     profile: CreateDoctorProfile,
-    current_user: User = Depends(is_doctor),
-    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(is_doctor),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    return UserService.create_doctor_profile(db, current_user.id, profile)
+    return await UserService.create_doctor_profile(db, current_user.id, profile)
 
 
 @router.put("/doctor_profile", response_model=DoctorProfileResponse, status_code=status.HTTP_200_OK)
 async def update_doctor_profile(
     profile: UpdateDoctorProfile,
-    current_user: User = Depends(is_doctor),
-    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(is_doctor),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    return UserService.update_doctor_profile(db, current_user.id, profile)
+    return await UserService.update_doctor_profile(db, current_user.id, profile)
+
+
+@router.get("/doctor-directory", response_model=list[DoctorCard], status_code=status.HTTP_200_OK)
+async def get_doctor_directory(
+    db: AsyncSession = Depends(get_async_db),
+    is_authenticated: AuthenticatedUser = Depends(get_auth_user),
+    specialization: Optional[str] = None,
+    min_experience_years: Optional[int] = Query(None, ge=0),
+    academic_history: Optional[list[str]] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1),
+):
+    return await UserService.get_doctor_directory(
+        db,
+        specialization=specialization,
+        min_experience_years=min_experience_years,
+        academic_history=academic_history,
+        skip=skip,
+        limit=limit,
+    )
 
 
 @router.get("/{user_id}", response_model=UserResponse, status_code=status.HTTP_200_OK)
-async def get_user(user_id: int, db: Session = Depends(get_db)):
-    return UserService.get_user(db, user_id)
+async def get_user(
+    user_id: int,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    if_none_match: Optional[str] = Header(None),
+):
+    version = await UserService.get_user_version(db, user_id)
+    etag = make_etag("user", user_id, version.isoformat())
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    return await UserService.get_user(db, user_id, version)
 
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_user(user_id: int, db: Session = Depends(get_db)):
-    UserService.delete_user(db, user_id)
+async def delete_user(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    await UserService.delete_user(db, user_id)
 
 
 @router.get("/", response_model=list[UserResponse], status_code=status.HTTP_200_OK)
 async def get_all_users(
-    db: Session = Depends(get_db),
-    is_authenticated: User = Depends(get_auth_user),
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    is_authenticated: AuthenticatedUser = Depends(get_auth_user),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1),
     search: Optional[str] = None,
+    search_mode: str = Query("contains", regex="^(contains|fuzzy|prefix)$"),
     role: Optional[str] = None,
     sort_by: Optional[str] = Query("created_at", regex="^(name|email|created_at|updated_at)$"),
     sort_order: Optional[str] = Query("asc", regex="^(asc|desc)$"),
+    cursor: Optional[str] = None,
 ):
-    return UserService.get_all_users(
+    users = await UserService.get_all_users(
         db,
         skip=skip,
         limit=limit,
@@ -86,4 +122,11 @@ async def get_all_users(
         role=role,
         sort_by=sort_by,
         sort_order=sort_order,
+        cursor=cursor,
+        search_mode=search_mode,
     )
+    # Fuzzy results are ranked by similarity, which a created_at cursor cannot resume.
+    keyset_ordered = sort_by == "created_at" and not (search and search_mode == "fuzzy")
+    if keyset_ordered and (cursor_for_next_page := next_cursor(users, limit)):
+        response.headers[NEXT_CURSOR_HEADER] = cursor_for_next_page
+    return users
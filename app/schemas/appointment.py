@@ -1,14 +1,33 @@
-from datetime import datetime
+from datetime import date, datetime, time, timedelta, timezone
 import enum
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 from app.schemas.user import UserResponse
 
 
+def naive_utc(value: datetime) -> datetime:
+    """Convert an aware datetime to naive UTC, the form slot times are stored in."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+MAX_RECURRING_TIME_SLOTS = 5000
+MAX_CALENDAR_DAYS = 31
+MAX_STATS_DAYS = 366
+
+
 class AvailableTimeSlotBase(BaseModel):
     start_time: datetime
     end_time: datetime
 
+    @field_validator("start_time", "end_time")
+    @classmethod
+    def to_naive_utc(cls, value: datetime) -> datetime:
+        # Slot times live in ``timestamp without time zone`` columns, which
+        # asyncpg only accepts naive datetimes for.
+        return naive_utc(value)
+
     @model_validator(mode="after")
     @classmethod
     def check_time_order(cls, model):
@@ -25,20 +44,71 @@ class AvailableTimeSlotUpdate(AvailableTimeSlotBase):
     pass
 
 
+class RecurringTimeSlotCreate(BaseModel):
+    """A weekly schedule, e.g. Mon-Fri 09:00-17:00 in 30 minute slots for 12 weeks.
+
+    Days and times are in UTC, like the slots they generate.
+    """
+
+    start_date: date
+    weeks: int = Field(ge=1, le=52)
+    weekdays: list[int] = Field(min_length=1, description="0 is Monday, 6 is Sunday")
+    day_start: time
+    day_end: time
+    slot_minutes: int = Field(ge=5, le=24 * 60)
+
+    @field_validator("weekdays")
+    @classmethod
+    def check_weekdays(cls, weekdays: list[int]) -> list[int]:
+        if any(weekday < 0 or weekday > 6 for weekday in weekdays):
+            raise ValueError("weekdays must be between 0 (Monday) and 6 (Sunday)")
+        return sorted(set(weekdays))
+
+    @model_validator(mode="after")
+    def check_day_window(self):
+        if self.day_end <= self.day_start:
+            raise ValueError("day_end must be greater than day_start")
+        if len(self.slot_windows()) > MAX_RECURRING_TIME_SLOTS:
+            raise ValueError(
+                f"a schedule can generate at most {MAX_RECURRING_TIME_SLOTS} time slots"
+            )
+        return self
+
+    def slot_windows(self) -> list[tuple[datetime, datetime]]:
+        """Every (start, end) pair the schedule describes, in order."""
+        slot_length = timedelta(minutes=self.slot_minutes)
+        windows = []
+        for offset in range(self.weeks * 7):
+            day = self.start_date + timedelta(days=offset)
+            if day.weekday() not in self.weekdays:
+                continue
+            start_time = datetime.combine(day, self.day_start)
+            day_end = datetime.combine(day, self.day_end)
+            while start_time + slot_length <= day_end:
+                windows.append((start_time, start_time + slot_length))
+                start_time += slot_length
+        return windows
+
+
+class TimeWindow(BaseModel):
+    start_time: datetime
+    end_time: datetime
+
+
+class RecurringTimeSlotResult(BaseModel):
+    created: int
+    conflicts: list[TimeWindow]
+
+
 class AvailableTimeSlotResponse(BaseModel):
     id: int
     doctor_id: int
+    start_time: datetime
+    end_time: datetime
     created_at: datetime
     updated_at: datetime
     doctor_name: str | None = None
 
-    @model_validator(mode="after")
-    def add_doctor_name(self):
-        # If doctor is available in the model, add the doctor name
-        if hasattr(self, "doctor") and self.doctor:
-            self.doctor_name = self.doctor.full_name
-        return self
-
     class Config:
         from_attributes = True
 
@@ -77,3 +147,112 @@ class ApointmentDetail(AppointmentResponse):
 class CreateAppointment(BaseModel):
     doctor_id: int
     available_time_slot_id: int
+
+
+class AppointmentSelection(BaseModel):
+    """Scheduled appointments picked by id, doctor and/or slot start window."""
+
+    appointment_ids: list[int] | None = Field(default=None, max_length=1000)
+    doctor_id: int | None = None
+    start: datetime | None = None
+    end: datetime | None = None
+
+    @field_validator("start", "end")
+    @classmethod
+    def to_naive_utc(cls, value: datetime | None) -> datetime | None:
+        return naive_utc(value) if value else value
+
+    @model_validator(mode="after")
+    def check_filters(self):
+        if not (self.appointment_ids or self.doctor_id or self.start or self.end):
+            raise ValueError("select appointments by appointment_ids, doctor_id or start/end")
+        if self.start and self.end and self.end <= self.start:
+            raise ValueError("end must be greater than start")
+        return self
+
+
+class BulkCancelAppointments(AppointmentSelection):
+    pass
+
+
+class BulkReassignAppointments(AppointmentSelection):
+    new_doctor_id: int
+
+
+class BulkBookingItem(CreateAppointment):
+    patient_id: int
+
+
+class BulkBookAppointments(BaseModel):
+    """Several bookings made at once, e.g. for the members of a group session."""
+
+    appointments: list[BulkBookingItem] = Field(min_length=1, max_length=500)
+
+
+class BulkItemStatus(str, enum.Enum):
+    canceled = "canceled"
+    reassigned = "reassigned"
+    booked = "booked"
+    skipped = "skipped"
+
+
+class BulkAppointmentResult(BaseModel):
+    appointment_id: int | None = None
+    available_time_slot_id: int | None = None
+    status: BulkItemStatus
+    detail: str | None = None
+
+
+class BulkOperationSummary(BaseModel):
+    succeeded: int
+    failed: int
+    results: list[BulkAppointmentResult]
+
+
+class CalendarSlotStatus(str, enum.Enum):
+    available = "available"
+    scheduled = "scheduled"
+    completed = "completed"
+
+
+class CalendarSlot(BaseModel):
+    time_slot_id: int
+    start_time: datetime
+    end_time: datetime
+    status: CalendarSlotStatus
+    appointment_id: int | None = None
+    patient_id: int | None = None
+    patient_name: str | None = None
+
+
+class CalendarDay(BaseModel):
+    date: date
+    slots: list[CalendarSlot]
+
+
+class DoctorCalendar(BaseModel):
+    """One doctor's slots grouped by (UTC) day, every day of the window included."""
+
+    doctor_id: int
+    start: date
+    days: list[CalendarDay]
+
+
+class AppointmentCounts(BaseModel):
+    scheduled: int = 0
+    completed: int = 0
+    canceled: int = 0
+
+
+class DailyAppointmentStats(AppointmentCounts):
+    doctor_id: int
+    day: date
+
+
+class AppointmentStats(BaseModel):
+    """Appointment counts by doctor and slot day within [start, end]."""
+
+    start: date
+    end: date
+    totals: AppointmentCounts
+    days: list[DailyAppointmentStats]
@@ -0,0 +1,57 @@
+from pydantic import BaseModel
+
+
+class PoolStatus(BaseModel):
+    mode: str
+    size: int | None = None
+    checked_out: int
+    idle: int
+    overflow: int
+    checkouts: int
+    connects: int
+    invalidations: int
+    timeouts: int
+    wait_seconds_total: float
+    wait_seconds_avg: float
+    wait_seconds_max: float
+
+
+class DatabasePoolStatus(BaseModel):
+    async_engine: PoolStatus
+    sync_engine: PoolStatus
+
+
+class AuthCacheStatus(BaseModel):
+    size: int
+    maxsize: int
+    ttl_seconds: float
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+
+
+class CacheStatus(BaseModel):
+    backend: str
+    ttl_seconds: float
+    size: int | None = None
+    maxsize: int | None = None
+    evictions: int | None = None
+    hits: int
+    misses: int
+    loads: int
+    coalesced: int
+    lock_waits: int
+    invalidations: int
+    errors: int
+
+
+class PasswordHashingStatus(BaseModel):
+    max_workers: int
+    queued: int
+    running: int
+    completed: int
+    wait_seconds_avg: float
+    wait_seconds_max: float
+    run_seconds_avg: float
+    run_seconds_max: float
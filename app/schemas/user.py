@@ -1,8 +1,14 @@
 import enum
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field, WithJsonSchema
+from typing import Annotated, Optional
 from datetime import datetime
 
+# Emails read back from the database were validated as EmailStr on the way
+# in. Validating them again costs ~100µs each, most of a user's response
+# time, so outgoing models take them as plain strings and only keep the
+# documented format.
+ResponseEmail = Annotated[str, WithJsonSchema({"type": "string", "format": "email"})]
+
 
 class UserRole(str,enum.Enum):
     PATIENT = "patient"
@@ -43,6 +49,20 @@ class TokenData(BaseModel):
     role: UserRole = Field(default=UserRole.PATIENT)
 
 
+class AuthenticatedUser(BaseModel):
+    """The caller of a request, detached from any database session."""
+
+    id: int
+    email: ResponseEmail
+    full_name: str
+    role: UserRole
+
+    class Config:
+        from_attributes = True
+        frozen = True
+        use_enum_values = True
+
+
 class CreateDoctorProfile(BaseModel):
 
     specialization: str
@@ -56,23 +76,45 @@ class UpdateDoctorProfile(BaseModel):
     academic_history: Optional[dict] = None  # Assuming this is a JSON field
     bio: Optional[str] = None
 
+class UserSummary(BaseModel):
+    email: ResponseEmail
+    full_name: str
+    role: UserRole
+
+    class Config:
+        from_attributes = True
+
+
 class DoctorProfileResponse(BaseModel):
     
     id: int
     user_id: int
-    user: UserBase
+    user: UserSummary
     specialization: str
     experience_years: int
     academic_history: dict  # Assuming this is a JSON field
     bio: str
 
     class Config:
-        orm_mode = True
+        from_attributes = True
+
+
+class DoctorCard(BaseModel):
+    """Compact doctor listing for the directory."""
+
+    user_id: int
+    full_name: str
+    specialization: str
+    experience_years: int
+    academic_history: dict
+
+    class Config:
+        from_attributes = True
 
 
 class UserResponse(BaseModel):
     id:int
-    email: EmailStr 
+    email: ResponseEmail
     full_name: str = Field(max_length=225)
     role: UserRole = Field(default=UserRole.PATIENT)  
     doctor_profile: DoctorProfileResponse | None = None
@@ -80,5 +122,5 @@ class UserResponse(BaseModel):
     updated_at: datetime 
 
     class Config:
-        orm_mode = True
+        from_attributes = True
         use_enum_values = True
@@ -1,179 +1,484 @@
 # app/services/appointments.py
 
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
-from app.models.appointments import Appointment, AvailableTimeSlot
+from sqlalchemy import (
+    DateTime,
+    Integer,
+    String,
+    cast,
+    and_,
+    bindparam,
+    column,
+    exists,
+    func,
+    literal,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.engine import RowMapping
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, joinedload, selectinload
+from app.core.cache import cache
+from app.core.database import violated_constraint
+from app.models.appointments import (
+    SLOT_OVERLAP_CONSTRAINT,
+    Appointment,
+    AppointmentDailyStat,
+    AvailableTimeSlot,
+)
+from app.models.users import DoctorProfile, User
 from app.schemas.appointment import (
     AvailableTimeSlotCreate,
     AvailableTimeSlotResponse,
     AppointmentResponse,
     CreateAppointment,
     ApointmentDetail,
+    RecurringTimeSlotCreate,
+    RecurringTimeSlotResult,
+    AppointmentSelection,
+    AppointmentCounts,
+    AppointmentStats,
+    CalendarDay,
+    DailyAppointmentStats,
+    CalendarSlot,
+    DoctorCalendar,
+    BulkAppointmentResult,
+    BulkBookAppointments,
+    BulkCancelAppointments,
+    BulkItemStatus,
+    BulkOperationSummary,
+    BulkReassignAppointments,
 )
-from typing import List
+from app.utils.pagination import paginate
+from datetime import date, datetime, time, timedelta
+from typing import AsyncIterator, List, Optional
 
 
-class AppointmentService:
-    @staticmethod
-    def create_time_slot(
-        db: Session, doctor_id: int, time_slot_data: AvailableTimeSlotCreate
-    ) -> AvailableTimeSlotResponse:
-        """Create a new available time slot for the doctor."""
-        # Check for overlapping time slots
-        existing_time_slot = (
-            db.query(AvailableTimeSlot)
-            .filter(
-                AvailableTimeSlot.doctor_id == doctor_id,
-                ~(
-                    (AvailableTimeSlot.start_time >= time_slot_data.end_time)
-                    | (AvailableTimeSlot.end_time <= time_slot_data.start_time)
+time_slot_cache = cache.namespace("time-slot", AvailableTimeSlotResponse)
+# Only the current and next week are cached, keyed by doctor and Monday, so a
+# write can drop every cached week of a doctor by key. The weeks are versioned
+# by a per-doctor generation that the same writes change. Writes to slots and
+# appointments, and deleting a doctor or a booked patient, do; a change to a
+# booked patient's name shows up once the week expires, after CACHE_TTL.
+calendar_cache = cache.namespace("doctor-calendar", DoctorCalendar)
+
+Patient = aliased(User, name="patient")
+Doctor = aliased(User, name="doctor")
+
+
+# Responses only need the participants' names, so they are selected as columns
+# next to the row instead of hydrating User objects (or lazy loading them one
+# row at a time).
+def _time_slot_rows_query():
+    return select(
+        AvailableTimeSlot.id,
+        AvailableTimeSlot.doctor_id,
+        AvailableTimeSlot.start_time,
+        AvailableTimeSlot.end_time,
+        AvailableTimeSlot.created_at,
+        AvailableTimeSlot.updated_at,
+        Doctor.full_name.label("doctor_name"),
+    ).outerjoin(Doctor, AvailableTimeSlot.doctor_id == Doctor.id)
+
+
+def _appointment_rows_query(appointments=None):
+    # ``appointments`` may also be a CTE over rows RETURNING from a write, so
+    # the response is built in the same statement that changes the row.
+    appointments = Appointment.__table__ if appointments is None else appointments
+    return (
+        select(
+            appointments.c.id,
+            appointments.c.patient_id,
+            appointments.c.doctor_id,
+            appointments.c.available_time_slot_id,
+            appointments.c.status,
+            appointments.c.created_at,
+            appointments.c.updated_at,
+            Patient.full_name.label("patient_name"),
+            Doctor.full_name.label("doctor_name"),
+        )
+        .select_from(appointments)
+        .outerjoin(Patient, appointments.c.patient_id == Patient.id)
+        .outerjoin(Doctor, appointments.c.doctor_id == Doctor.id)
+    )
+
+
+# Rows fetched per round trip by the export's server-side cursor.
+EXPORT_BATCH_SIZE = 1000
+
+APPOINTMENT_EXPORT_FIELDS = (
+    "id",
+    "status",
+    "patient_id",
+    "patient_name",
+    "doctor_id",
+    "doctor_name",
+    "available_time_slot_id",
+    "start_time",
+    "end_time",
+    "created_at",
+    "updated_at",
+)
+
+
+async def _time_slot_response(
+    db: AsyncSession, time_slot_id: int
+) -> AvailableTimeSlotResponse | None:
+    row = (
+        await db.execute(_time_slot_rows_query().where(AvailableTimeSlot.id == time_slot_id))
+    ).mappings().first()
+    return AvailableTimeSlotResponse.model_validate(row) if row else None
+
+
+async def _appointment_response(db: AsyncSession, appointment_id: int) -> AppointmentResponse:
+    row = (
+        await db.execute(_appointment_rows_query().where(Appointment.id == appointment_id))
+    ).mappings().one()
+    return AppointmentResponse.model_validate(row)
+
+
+async def _insert_time_slots(
+    db: AsyncSession, doctor_id: int, windows: list[tuple[datetime, datetime]]
+) -> set[datetime]:
+    """Insert the windows that do not overlap the doctor's slots; return their starts."""
+    candidates = func.unnest(
+        bindparam("starts", [start for start, _ in windows], type_=ARRAY(DateTime)),
+        bindparam("ends", [end for _, end in windows], type_=ARRAY(DateTime)),
+    ).table_valued(
+        column("start_time", DateTime), column("end_time", DateTime)
+    ).render_derived(name="candidates")
+
+    inserted = await db.scalars(
+        insert(AvailableTimeSlot)
+        .from_select(
+            ["doctor_id", "start_time", "end_time"],
+            select(literal(doctor_id), candidates.c.start_time, candidates.c.end_time),
+        )
+        .on_conflict_do_nothing()
+        .returning(AvailableTimeSlot.start_time)
+    )
+    return set(inserted.all())
+
+
+def _cached_calendar_weeks(today: date) -> list[date]:
+    this_week = today - timedelta(days=today.weekday())
+    return [this_week, this_week + timedelta(weeks=1)]
+
+
+async def invalidate_calendars(*doctor_ids: Optional[int]):
+    """Drop the cached weeks of every doctor whose slots or bookings changed.
+
+    The doctor's generation changes first, so a week that a load still in
+    flight stores afterwards is never served.
+    """
+    weeks = _cached_calendar_weeks(datetime.utcnow().date())
+    for doctor_id in {doctor_id for doctor_id in doctor_ids if doctor_id is not None}:
+        await calendar_cache.new_generation(doctor_id)
+        for week in weeks:
+            await calendar_cache.invalidate(f"{doctor_id}:{week.isoformat()}")
+
+
+async def _doctor_calendar(
+    db: AsyncSession, doctor_id: int, start: date, days: int
+) -> DoctorCalendar:
+    doctor_role = await db.scalar(select(User.role).filter_by(id=doctor_id))
+    if doctor_role != "doctor":
+        raise HTTPException(
+            status_code=404,
+            detail="Doctor not found",
+        )
+
+    window_start = datetime.combine(start, time.min)
+    rows = (
+        await db.execute(
+            select(
+                AvailableTimeSlot.id.label("time_slot_id"),
+                AvailableTimeSlot.start_time,
+                AvailableTimeSlot.end_time,
+                Appointment.id.label("appointment_id"),
+                func.coalesce(cast(Appointment.status, String), "available").label("status"),
+                Appointment.patient_id,
+                Patient.full_name.label("patient_name"),
+            )
+            .outerjoin(
+                Appointment,
+                and_(
+                    Appointment.available_time_slot_id == AvailableTimeSlot.id,
+                    Appointment.status != "canceled",
                 ),
             )
-            .first()
+            .outerjoin(Patient, Appointment.patient_id == Patient.id)
+            .where(
+                AvailableTimeSlot.doctor_id == doctor_id,
+                AvailableTimeSlot.start_time >= window_start,
+                AvailableTimeSlot.start_time < window_start + timedelta(days=days),
+            )
+            # A slot keeps completed appointments next to a later scheduled
+            # one; the scheduled booking is the one the calendar shows.
+            .distinct(AvailableTimeSlot.start_time, AvailableTimeSlot.id)
+            .order_by(
+                AvailableTimeSlot.start_time,
+                AvailableTimeSlot.id,
+                (Appointment.status == "scheduled").desc(),
+                Appointment.id.desc(),
+            )
         )
+    ).mappings()
 
-        if existing_time_slot:
+    calendar_days = {
+        start + timedelta(days=offset): CalendarDay(date=start + timedelta(days=offset), slots=[])
+        for offset in range(days)
+    }
+    for row in rows:
+        calendar_days[row["start_time"].date()].slots.append(CalendarSlot.model_validate(row))
+    return DoctorCalendar(doctor_id=doctor_id, start=start, days=list(calendar_days.values()))
+
+
+def _selection_criteria(selection: AppointmentSelection) -> list:
+    criteria = [Appointment.status == "scheduled"]
+    if selection.appointment_ids:
+        criteria.append(Appointment.id.in_(selection.appointment_ids))
+    if selection.doctor_id is not None:
+        criteria.append(Appointment.doctor_id == selection.doctor_id)
+    if selection.start or selection.end:
+        slots_in_window = select(AvailableTimeSlot.id)
+        if selection.start:
+            slots_in_window = slots_in_window.where(AvailableTimeSlot.start_time >= selection.start)
+        if selection.end:
+            slots_in_window = slots_in_window.where(AvailableTimeSlot.start_time < selection.end)
+        criteria.append(Appointment.available_time_slot_id.in_(slots_in_window))
+    return criteria
+
+
+def _bulk_summary(results: list[BulkAppointmentResult]) -> BulkOperationSummary:
+    failed = sum(result.status == BulkItemStatus.skipped for result in results)
+    return BulkOperationSummary(succeeded=len(results) - failed, failed=failed, results=results)
+
+
+def _skipped_selection(
+    selection: AppointmentSelection, handled_ids: set[int]
+) -> list[BulkAppointmentResult]:
+    return [
+        BulkAppointmentResult(
+            appointment_id=appointment_id,
+            status=BulkItemStatus.skipped,
+            detail="Appointment not found or already completed/canceled",
+        )
+        for appointment_id in selection.appointment_ids or []
+        if appointment_id not in handled_ids
+    ]
+
+
+class AppointmentService:
+    @staticmethod
+    async def create_time_slot(
+        db: AsyncSession, doctor_id: int, time_slot_data: AvailableTimeSlotCreate
+    ) -> AvailableTimeSlotResponse:
+        """Create a new available time slot for the doctor."""
+        # Overlaps are rejected by the exclusion constraint on the table.
+        new_time_slot = AvailableTimeSlot(**time_slot_data.model_dump(), doctor_id=doctor_id)
+        db.add(new_time_slot)
+        try:
+            await db.commit()
+        except IntegrityError as e:
+            await db.rollback()
+            if violated_constraint(e) != SLOT_OVERLAP_CONSTRAINT:
+                raise
             raise HTTPException(
                 status_code=400,
                 detail="Time slot already exists or overlaps with another slot",
             )
 
-        new_time_slot = AvailableTimeSlot(**time_slot_data.model_dump(), doctor_id=doctor_id)
-        db.add(new_time_slot)
-        db.commit()
-        db.refresh(new_time_slot)
+        await invalidate_calendars(doctor_id)
+        return await _time_slot_response(db, new_time_slot.id)
+
+    @staticmethod
+    async def create_recurring_time_slots(
+        db: AsyncSession, doctor_id: int, schedule: RecurringTimeSlotCreate
+    ) -> RecurringTimeSlotResult:
+        """Create every slot of a weekly schedule in a single INSERT.
 
-        return AvailableTimeSlotResponse.model_validate(new_time_slot).model_copy(
-            update={"doctor_name": new_time_slot.doctor.full_name if new_time_slot.doctor else None}
+        The candidate windows are sent as two arrays and unnested server side.
+        ON CONFLICT DO NOTHING lets the exclusion constraint skip the windows
+        that overlap existing slots, and those are reported back as conflicts.
+        """
+        windows = schedule.slot_windows()
+        created = await _insert_time_slots(db, doctor_id, windows)
+        await db.commit()
+        await invalidate_calendars(doctor_id)
+
+        return RecurringTimeSlotResult(
+            created=len(created),
+            conflicts=[
+                {"start_time": start, "end_time": end}
+                for start, end in windows
+                if start not in created
+            ],
         )
 
     @staticmethod
-    def get_time_slot(db: Session, time_slot_id: int) -> AvailableTimeSlotResponse:
-        """Get a single available time slot by id."""
-        time_slot = db.query(AvailableTimeSlot).filter_by(id=time_slot_id).first()
-        if not time_slot:
+    async def get_time_slot(
+        db: AsyncSession, time_slot_id: int, version: Optional[datetime] = None
+    ) -> AvailableTimeSlotResponse:
+        """Get a single available time slot by id, read through the shared cache.
+
+        With a ``version`` (see get_time_slot_version) an entry cached for an
+        older version is never served.
+        """
+
+        async def load():
+            time_slot = await _time_slot_response(db, time_slot_id)
+            if not time_slot:
+                raise HTTPException(
+                    status_code=404,
+                    detail="Time slot not found",
+                )
+            return time_slot
+
+        return await time_slot_cache.get_or_load(
+            time_slot_id, load, version=version.isoformat() if version else None
+        )
+
+    @staticmethod
+    async def get_time_slot_version(db: AsyncSession, time_slot_id: int) -> datetime:
+        """Latest updated_at of the rows a time slot response is built from."""
+        version = await db.scalar(
+            select(func.greatest(AvailableTimeSlot.updated_at, Doctor.updated_at))
+            .outerjoin(Doctor, AvailableTimeSlot.doctor_id == Doctor.id)
+            .where(AvailableTimeSlot.id == time_slot_id)
+        )
+        if version is None:
             raise HTTPException(
                 status_code=404,
                 detail="Time slot not found",
             )
-        return AvailableTimeSlotResponse.model_validate(time_slot).model_copy(
-            update={"doctor_name": time_slot.doctor.full_name if time_slot.doctor else None}
-        )
+        return version
 
     @staticmethod
-    def delete_time_slot(db: Session, time_slot_id: int, doctor_id: int) -> None:
+    async def delete_time_slot(db: AsyncSession, time_slot_id: int, doctor_id: int) -> None:
         """Delete an available time slot."""
-        time_slot = (
-            db.query(AvailableTimeSlot).filter_by(id=time_slot_id, doctor_id=doctor_id).first()
+        time_slot = await db.scalar(
+            select(AvailableTimeSlot).filter_by(id=time_slot_id, doctor_id=doctor_id)
         )
         if not time_slot:
             raise HTTPException(
                 status_code=404,
                 detail="Time slot not found",
             )
-        db.delete(time_slot)
-        db.commit()
+        await db.delete(time_slot)
+        await db.commit()
+        await time_slot_cache.invalidate(time_slot_id)
+        await invalidate_calendars(doctor_id)
 
     @staticmethod
-    def update_time_slot(
-        db: Session,
+    async def update_time_slot(
+        db: AsyncSession,
         time_slot_id: int,
         doctor_id: int,
         time_slot_data: AvailableTimeSlotCreate,
     ) -> AvailableTimeSlotResponse:
         """Update an available time slot."""
-        existing_time_slot = (
-            db.query(AvailableTimeSlot).filter_by(id=time_slot_id, doctor_id=doctor_id).first()
-        )
-        if not existing_time_slot:
-            raise HTTPException(
-                status_code=404,
-                detail="Time slot not found",
-            )
-
-        # Check for overlapping time slots (excluding current one)
-        overlapping_slot = (
-            db.query(AvailableTimeSlot)
-            .filter(
-                AvailableTimeSlot.doctor_id == doctor_id,
-                AvailableTimeSlot.id != time_slot_id,
-                ~(
-                    (AvailableTimeSlot.start_time >= time_slot_data.end_time)
-                    | (AvailableTimeSlot.end_time <= time_slot_data.start_time)
-                ),
+        try:
+            updated_id = await db.scalar(
+                update(AvailableTimeSlot)
+                .where(
+                    AvailableTimeSlot.id == time_slot_id,
+                    AvailableTimeSlot.doctor_id == doctor_id,
+                )
+                .values(**time_slot_data.model_dump(exclude_unset=True))
+                .returning(AvailableTimeSlot.id)
             )
-            .first()
-        )
-
-        if overlapping_slot:
+            await db.commit()
+        except IntegrityError as e:
+            await db.rollback()
+            if violated_constraint(e) != SLOT_OVERLAP_CONSTRAINT:
+                raise
             raise HTTPException(
                 status_code=400,
                 detail="Updated time slot would overlap with another slot",
             )
 
-        for key, value in time_slot_data.model_dump(exclude_unset=True).items():
-            setattr(existing_time_slot, key, value)
+        if updated_id is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Time slot not found",
+            )
+        await time_slot_cache.invalidate(time_slot_id)
+        await invalidate_calendars(doctor_id)
+        return await _time_slot_response(db, time_slot_id)
 
-        db.commit()
-        db.refresh(existing_time_slot)
-        return AvailableTimeSlotResponse.model_validate(existing_time_slot).model_copy(
-            update={
-                "doctor_name": (
-                    existing_time_slot.doctor.full_name if existing_time_slot.doctor else None
-                )
-            }
-        )
 
-   
 
     @staticmethod
-    def create_appointment(
-        db: Session, patient_id: int, appointment_data: CreateAppointment
+    async def create_appointment(
+        db: AsyncSession, patient_id: int, appointment_data: CreateAppointment
     ) -> AppointmentResponse:
-        """Create a new appointment."""
-        # Check if appointment already exists
-        existing_appointment = (
-            db.query(Appointment)
-            .filter_by(
-                available_time_slot_id=appointment_data.available_time_slot_id,
-                doctor_id=appointment_data.doctor_id,
-                status="scheduled",
-            )
-            .filter(Appointment.patient_id.isnot(None))
-            .first()
+        """Book a time slot in one statement.
+
+        The slot is only inserted if it belongs to the given doctor, and the
+        partial unique index on scheduled appointments makes concurrent
+        bookings of the same slot resolve to a single winner.
+        """
+        booked = (
+            insert(Appointment)
+            .from_select(
+                ["patient_id", "doctor_id", "available_time_slot_id", "status"],
+                select(
+                    literal(patient_id),
+                    AvailableTimeSlot.doctor_id,
+                    AvailableTimeSlot.id,
+                    literal("scheduled", Appointment.status.type),
+                ).where(
+                    AvailableTimeSlot.id == appointment_data.available_time_slot_id,
+                    AvailableTimeSlot.doctor_id == appointment_data.doctor_id,
+                ),
+            )
+            .on_conflict_do_nothing(
+                index_elements=[Appointment.available_time_slot_id],
+                index_where=Appointment.status == "scheduled",
+            )
+            .returning(*Appointment.__table__.c)
+            .cte("booked")
         )
+        row = (await db.execute(_appointment_rows_query(booked))).mappings().first()
+        await db.commit()
+
+        if row is not None:
+            await invalidate_calendars(appointment_data.doctor_id)
+            return AppointmentResponse.model_validate(row)
 
-        if existing_appointment:
+        # Nothing was inserted: work out why for the error response.
+        slot_doctor_id = await db.scalar(
+            select(AvailableTimeSlot.doctor_id).filter_by(
+                id=appointment_data.available_time_slot_id
+            )
+        )
+        if slot_doctor_id is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Time slot not found",
+            )
+        if slot_doctor_id != appointment_data.doctor_id:
             raise HTTPException(
                 status_code=400,
-                detail="This time slot is already booked by another patient.",
+                detail="This time slot does not belong to the selected doctor.",
             )
-
-        new_appointment = Appointment(
-            **appointment_data.model_dump(), patient_id=patient_id, status="scheduled"
-        )
-        db.add(new_appointment)
-        db.commit()
-        db.refresh(new_appointment)
-
-        return AppointmentResponse.model_validate(new_appointment).model_copy(
-            update={
-                "patient_name": (
-                    new_appointment.patient.full_name if new_appointment.patient else None
-                ),
-                "doctor_name": new_appointment.doctor.full_name if new_appointment.doctor else None,
-            }
+        raise HTTPException(
+            status_code=400,
+            detail="This time slot is already booked by another patient.",
         )
 
     @staticmethod
-    def complete_appointment(
-        db: Session, appointment_id: int, doctor_id: int
+    async def complete_appointment(
+        db: AsyncSession, appointment_id: int, doctor_id: int
     ) -> AppointmentResponse:
         """Complete an appointment."""
-        appointment = (
-            db.query(Appointment)
-            .filter_by(id=appointment_id, doctor_id=doctor_id, status="scheduled")
-            .first()
+        appointment = await db.scalar(
+            select(Appointment).filter_by(
+                id=appointment_id, doctor_id=doctor_id, status="scheduled"
+            )
         )
         if not appointment:
             raise HTTPException(
@@ -181,31 +486,26 @@ class AppointmentService:
                 detail="Appointment not found",
             )
         appointment.status = "completed"
-        db.commit()
-        db.refresh(appointment)
-        return AppointmentResponse.model_validate(appointment).model_copy(
-            update={
-                "patient_name": appointment.patient.full_name if appointment.patient else None,
-                "doctor_name": appointment.doctor.full_name if appointment.doctor else None,
-            }
-        )
+        await db.commit()
+        await invalidate_calendars(doctor_id)
+        return await _appointment_response(db, appointment_id)
 
     @staticmethod
-    def cancel_appointment(
-        db: Session, appointment_id: int, user_id: int, user_role: str
+    async def cancel_appointment(
+        db: AsyncSession, appointment_id: int, user_id: int, user_role: str
     ) -> AppointmentResponse:
         """Cancel an appointment."""
         if user_role == "patient":
-            appointment = (
-                db.query(Appointment)
-                .filter_by(id=appointment_id, patient_id=user_id, status="scheduled")
-                .first()
+            appointment = await db.scalar(
+                select(Appointment).filter_by(
+                    id=appointment_id, patient_id=user_id, status="scheduled"
+                )
             )
         elif user_role == "doctor":
-            appointment = (
-                db.query(Appointment)
-                .filter_by(id=appointment_id, doctor_id=user_id, status="scheduled")
-                .first()
+            appointment = await db.scalar(
+                select(Appointment).filter_by(
+                    id=appointment_id, doctor_id=user_id, status="scheduled"
+                )
             )
         else:
             raise HTTPException(
@@ -221,91 +521,508 @@ class AppointmentService:
 
         appointment.status = "canceled"
         appointment.patient_id = None
-        db.commit()
-        db.refresh(appointment)
-        return AppointmentResponse.model_validate(appointment).model_copy(
-            update={
-                "patient_name": appointment.patient.full_name if appointment.patient else None,
-                "doctor_name": appointment.doctor.full_name if appointment.doctor else None,
-            }
-        )
+        await db.commit()
+        await invalidate_calendars(appointment.doctor_id)
+        return await _appointment_response(db, appointment_id)
 
 
     @staticmethod
-    def get_appointment(db: Session, appointment_id: int) -> ApointmentDetail:
+    async def get_appointment_version(db: AsyncSession, appointment_id: int) -> datetime:
+        """Latest updated_at of the appointment and the rows nested in its detail."""
+        version = await db.scalar(
+            select(
+                func.greatest(
+                    Appointment.updated_at,
+                    AvailableTimeSlot.updated_at,
+                    Patient.updated_at,
+                    Doctor.updated_at,
+                )
+            )
+            .outerjoin(AvailableTimeSlot, Appointment.available_time_slot_id == AvailableTimeSlot.id)
+            .outerjoin(Patient, Appointment.patient_id == Patient.id)
+            .outerjoin(Doctor, Appointment.doctor_id == Doctor.id)
+            .where(Appointment.id == appointment_id)
+        )
+        if version is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Appointment not found",
+            )
+        return version
+
+    @staticmethod
+    async def get_appointment(db: AsyncSession, appointment_id: int) -> ApointmentDetail:
         """Get an appointment by id."""
-        appointment = db.query(Appointment).get(appointment_id)
+        appointment = await db.scalar(
+            select(Appointment)
+            .options(
+                joinedload(Appointment.patient).selectinload(User.doctor_profile),
+                joinedload(Appointment.doctor).selectinload(User.doctor_profile),
+                joinedload(Appointment.available_time_slot),
+            )
+            .filter_by(id=appointment_id)
+        )
         if not appointment:
             raise HTTPException(
                 status_code=404,
                 detail="Appointment not found",
             )
         return appointment
-    
-    
+
+
     @staticmethod
-    def get_all_time_slots(
-        db: Session,
+    async def get_all_time_slots(
+        db: AsyncSession,
         skip: int = 0,
         limit: int = 10,
-        sort_order: str = "asc"
+        sort_order: str = "asc",
+        cursor: Optional[str] = None,
     ) -> List[AvailableTimeSlotResponse]:
-        """Get all available time slots with pagination."""
-        query = db.query(AvailableTimeSlot)
-
-        # Apply sorting
-        if sort_order == "asc":
-            query = query.order_by(AvailableTimeSlot.created_at.asc())
-        else:
-            query = query.order_by(AvailableTimeSlot.created_at.desc())
-
-        # Apply pagination
-        time_slots = query.offset(skip).limit(limit).all()
+        """Get all available time slots with offset or cursor pagination."""
+        query = paginate(
+            _time_slot_rows_query(),
+            AvailableTimeSlot.created_at,
+            AvailableTimeSlot.id,
+            skip,
+            limit,
+            sort_order,
+            cursor,
+        )
+        time_slots = (await db.execute(query)).mappings()
 
-        return [
-            AvailableTimeSlotResponse.model_validate(time_slot).model_copy(
-                update={"doctor_name": time_slot.doctor.full_name if time_slot.doctor else None}
-            )
-            for time_slot in time_slots
-        ]
+        return [AvailableTimeSlotResponse.model_validate(time_slot) for time_slot in time_slots]
 
     @staticmethod
-    def get_all_appointments(
-        db: Session,
+    async def get_all_appointments(
+        db: AsyncSession,
         user_id: int,
         user_role: str,
         skip: int = 0,
         limit: int = 10,
-        sort_order: str = "asc"
+        sort_order: str = "asc",
+        cursor: Optional[str] = None,
     ) -> List[AppointmentResponse]:
-        """Get all appointments based on user role with pagination."""
+        """Get all appointments based on user role with offset or cursor pagination."""
         if user_role == "admin":
-            query = db.query(Appointment)
+            query = _appointment_rows_query()
         elif user_role == "doctor":
-            query = db.query(Appointment).filter_by(doctor_id=user_id)
+            query = _appointment_rows_query().where(Appointment.doctor_id == user_id)
         elif user_role == "patient":
-            query = db.query(Appointment).filter_by(patient_id=user_id)
+            query = _appointment_rows_query().where(Appointment.patient_id == user_id)
         else:
             raise HTTPException(
                 status_code=403,
                 detail="You do not have permission to view appointments.",
             )
 
-        # Apply sorting
-        if sort_order == "asc":
-            query = query.order_by(Appointment.created_at.asc())
-        else:
-            query = query.order_by(Appointment.created_at.desc())
+        query = paginate(
+            query, Appointment.created_at, Appointment.id, skip, limit, sort_order, cursor
+        )
+        appointments = (await db.execute(query)).mappings()
+
+        return [AppointmentResponse.model_validate(appointment) for appointment in appointments]
+
+    @staticmethod
+    async def search_available_time_slots(
+        db: AsyncSession,
+        start: datetime,
+        end: datetime,
+        doctor_id: Optional[int] = None,
+        specialization: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 50,
+    ) -> List[AvailableTimeSlotResponse]:
+        """Find unbooked slots that fit inside [start, end], earliest first."""
+        is_booked = exists().where(
+            Appointment.available_time_slot_id == AvailableTimeSlot.id,
+            Appointment.status == "scheduled",
+        )
+        query = _time_slot_rows_query().where(
+            AvailableTimeSlot.start_time >= start,
+            AvailableTimeSlot.start_time < end,
+            AvailableTimeSlot.end_time <= end,
+            ~is_booked,
+        )
+
+        if doctor_id is not None:
+            query = query.where(AvailableTimeSlot.doctor_id == doctor_id)
+
+        if specialization:
+            query = query.join(
+                DoctorProfile, DoctorProfile.user_id == AvailableTimeSlot.doctor_id
+            ).where(func.lower(DoctorProfile.specialization) == specialization.lower())
+
+        query = query.order_by(
+            AvailableTimeSlot.start_time.asc(), AvailableTimeSlot.id.asc()
+        ).offset(skip).limit(limit)
+
+        time_slots = (await db.execute(query)).mappings()
+        return [AvailableTimeSlotResponse.model_validate(time_slot) for time_slot in time_slots]
+
+    @staticmethod
+    async def bulk_cancel_appointments(
+        db: AsyncSession, selection: BulkCancelAppointments
+    ) -> BulkOperationSummary:
+        """Cancel every selected scheduled appointment with one UPDATE."""
+        canceled = (
+            await db.execute(
+                update(Appointment)
+                .where(*_selection_criteria(selection))
+                .values(status="canceled", patient_id=None)
+                .returning(
+                    Appointment.id, Appointment.available_time_slot_id, Appointment.doctor_id
+                )
+                .execution_options(synchronize_session=False)
+            )
+        ).all()
+        await db.commit()
+        await invalidate_calendars(*(doctor_id for _, _, doctor_id in canceled))
+
+        results = [
+            BulkAppointmentResult(
+                appointment_id=appointment_id,
+                available_time_slot_id=time_slot_id,
+                status=BulkItemStatus.canceled,
+            )
+            for appointment_id, time_slot_id, _ in canceled
+        ]
+        results += _skipped_selection(
+            selection, {appointment_id for appointment_id, _, _ in canceled}
+        )
+        return _bulk_summary(results)
+
+    @staticmethod
+    async def bulk_reassign_appointments(
+        db: AsyncSession, selection: BulkReassignAppointments
+    ) -> BulkOperationSummary:
+        """Move the selected appointments to the same times with another doctor.
+
+        The new doctor gets a slot for every time they do not cover yet, then
+        each appointment moves onto the new doctor's free slot at the same
+        time. Appointments whose time the new doctor is not free for are
+        reported as skipped. Everything happens in one transaction.
+        """
+        new_doctor_role = await db.scalar(
+            select(User.role).filter_by(id=selection.new_doctor_id)
+        )
+        if new_doctor_role != "doctor":
+            raise HTTPException(
+                status_code=404,
+                detail="Doctor not found",
+            )
+
+        targets = (
+            await db.execute(
+                select(
+                    Appointment.id,
+                    Appointment.doctor_id,
+                    AvailableTimeSlot.start_time,
+                    AvailableTimeSlot.end_time,
+                )
+                .join(AvailableTimeSlot, Appointment.available_time_slot_id == AvailableTimeSlot.id)
+                .where(
+                    *_selection_criteria(selection),
+                    Appointment.doctor_id != selection.new_doctor_id,
+                )
+                .with_for_update(of=Appointment)
+            )
+        ).all()
+        target_ids = [appointment_id for appointment_id, _, _, _ in targets]
+
+        reassigned = []
+        if targets:
+            await _insert_time_slots(
+                db,
+                selection.new_doctor_id,
+                sorted({(start_time, end_time) for _, _, start_time, end_time in targets}),
+            )
+
+            Moving = aliased(Appointment)
+            Booked = aliased(Appointment)
+            OldSlot = aliased(AvailableTimeSlot)
+            NewSlot = aliased(AvailableTimeSlot)
+            moves = (
+                select(Moving.id.label("appointment_id"), NewSlot.id.label("time_slot_id"))
+                .join(OldSlot, Moving.available_time_slot_id == OldSlot.id)
+                .join(
+                    NewSlot,
+                    and_(
+                        NewSlot.doctor_id == selection.new_doctor_id,
+                        NewSlot.start_time == OldSlot.start_time,
+                        NewSlot.end_time == OldSlot.end_time,
+                    ),
+                )
+                .where(
+                    Moving.id.in_(target_ids),
+                    ~exists().where(
+                        Booked.available_time_slot_id == NewSlot.id,
+                        Booked.status == "scheduled",
+                    ),
+                )
+                # Two selected appointments at the same time can only get one slot.
+                .distinct(NewSlot.id)
+                .order_by(NewSlot.id, Moving.id)
+                .subquery()
+            )
+            reassigned = (
+                await db.execute(
+                    update(Appointment)
+                    .where(Appointment.id == moves.c.appointment_id)
+                    .values(
+                        doctor_id=selection.new_doctor_id,
+                        available_time_slot_id=moves.c.time_slot_id,
+                    )
+                    .returning(Appointment.id, Appointment.available_time_slot_id)
+                    .execution_options(synchronize_session=False)
+                )
+            ).all()
+        await db.commit()
+        await invalidate_calendars(
+            selection.new_doctor_id, *(doctor_id for _, doctor_id, _, _ in targets)
+        )
+
+        reassigned_ids = {appointment_id for appointment_id, _ in reassigned}
+        results = [
+            BulkAppointmentResult(
+                appointment_id=appointment_id,
+                available_time_slot_id=time_slot_id,
+                status=BulkItemStatus.reassigned,
+            )
+            for appointment_id, time_slot_id in reassigned
+        ]
+        results += [
+            BulkAppointmentResult(
+                appointment_id=appointment_id,
+                status=BulkItemStatus.skipped,
+                detail="The new doctor is not free at this time",
+            )
+            for appointment_id in target_ids
+            if appointment_id not in reassigned_ids
+        ]
+        results += _skipped_selection(selection, set(target_ids))
+        return _bulk_summary(results)
+
+    @staticmethod
+    async def bulk_book_appointments(
+        db: AsyncSession, bookings: BulkBookAppointments
+    ) -> BulkOperationSummary:
+        """Book several (patient, doctor, slot) triples in one INSERT."""
+        # A repeated (patient, slot) pair would find the one row the INSERT
+        # made and be counted as a second booking, so only the first is sent.
+        items, seen = [], set()
+        for item in bookings.appointments:
+            key = (item.patient_id, item.available_time_slot_id)
+            if key not in seen:
+                seen.add(key)
+                items.append(item)
+        requested = func.unnest(
+            bindparam("patient_ids", [item.patient_id for item in items], type_=ARRAY(Integer)),
+            bindparam("doctor_ids", [item.doctor_id for item in items], type_=ARRAY(Integer)),
+            bindparam(
+                "time_slot_ids", [item.available_time_slot_id for item in items], type_=ARRAY(Integer)
+            ),
+        ).table_valued(
+            column("patient_id", Integer),
+            column("doctor_id", Integer),
+            column("available_time_slot_id", Integer),
+        ).render_derived(name="requested")
+
+        booked = (
+            await db.execute(
+                insert(Appointment)
+                .from_select(
+                    ["patient_id", "doctor_id", "available_time_slot_id", "status"],
+                    select(
+                        requested.c.patient_id,
+                        AvailableTimeSlot.doctor_id,
+                        AvailableTimeSlot.id,
+                        literal("scheduled", Appointment.status.type),
+                    )
+                    .select_from(requested)
+                    .join(
+                        AvailableTimeSlot,
+                        and_(
+                            AvailableTimeSlot.id == requested.c.available_time_slot_id,
+                            AvailableTimeSlot.doctor_id == requested.c.doctor_id,
+                        ),
+                    )
+                    .join(User, and_(User.id == requested.c.patient_id, User.role == "patient")),
+                )
+                .on_conflict_do_nothing(
+                    index_elements=[Appointment.available_time_slot_id],
+                    index_where=Appointment.status == "scheduled",
+                )
+                .returning(
+                    Appointment.id,
+                    Appointment.patient_id,
+                    Appointment.available_time_slot_id,
+                    Appointment.doctor_id,
+                )
+            )
+        ).all()
+        await db.commit()
+        await invalidate_calendars(*(doctor_id for _, _, _, doctor_id in booked))
 
-        # Apply pagination
-        appointments = query.offset(skip).limit(limit).all()
+        booked_ids = {
+            (patient_id, time_slot_id): appointment_id
+            for appointment_id, patient_id, time_slot_id, _ in booked
+        }
+        failed = [
+            item for item in items if (item.patient_id, item.available_time_slot_id) not in booked_ids
+        ]
 
-        return [
-            AppointmentResponse.model_validate(appointment).model_copy(
-                update={
-                    "patient_name": appointment.patient.full_name if appointment.patient else None,
-                    "doctor_name": appointment.doctor.full_name if appointment.doctor else None,
-                }
+        # One lookup each explains every failed item.
+        slot_doctors, patient_ids, slot_patients = {}, set(), {}
+        if failed:
+            failed_slot_ids = {item.available_time_slot_id for item in failed}
+            slot_patients = dict(
+                (
+                    await db.execute(
+                        select(Appointment.available_time_slot_id, Appointment.patient_id).where(
+                            Appointment.available_time_slot_id.in_(failed_slot_ids),
+                            Appointment.status == "scheduled",
+                        )
+                    )
+                ).all()
+            )
+            slot_doctors = dict(
+                (
+                    await db.execute(
+                        select(AvailableTimeSlot.id, AvailableTimeSlot.doctor_id).where(
+                            AvailableTimeSlot.id.in_(failed_slot_ids)
+                        )
+                    )
+                ).all()
+            )
+            patient_ids = set(
+                (
+                    await db.scalars(
+                        select(User.id).where(
+                            User.id.in_({item.patient_id for item in failed}),
+                            User.role == "patient",
+                        )
+                    )
+                ).all()
             )
-            for appointment in appointments
+
+        results, reported = [], set()
+        for item in bookings.appointments:
+            key = (item.patient_id, item.available_time_slot_id)
+            if key in reported:
+                results.append(
+                    BulkAppointmentResult(
+                        available_time_slot_id=item.available_time_slot_id,
+                        status=BulkItemStatus.skipped,
+                        detail="Duplicate item",
+                    )
+                )
+                continue
+            reported.add(key)
+            if key in booked_ids:
+                results.append(
+                    BulkAppointmentResult(
+                        appointment_id=booked_ids[key],
+                        available_time_slot_id=item.available_time_slot_id,
+                        status=BulkItemStatus.booked,
+                    )
+                )
+                continue
+
+            if item.available_time_slot_id not in slot_doctors:
+                detail = "Time slot not found"
+            elif slot_doctors[item.available_time_slot_id] != item.doctor_id:
+                detail = "This time slot does not belong to the selected doctor."
+            elif item.patient_id not in patient_ids:
+                detail = "Patient not found"
+            elif slot_patients.get(item.available_time_slot_id) == item.patient_id:
+                detail = "This time slot is already booked by this patient."
+            else:
+                detail = "This time slot is already booked by another patient."
+            results.append(
+                BulkAppointmentResult(
+                    available_time_slot_id=item.available_time_slot_id,
+                    status=BulkItemStatus.skipped,
+                    detail=detail,
+                )
+            )
+        return _bulk_summary(results)
+
+    @staticmethod
+    async def stream_appointments(
+        db: AsyncSession,
+        status: Optional[str] = None,
+        doctor_id: Optional[int] = None,
+    ) -> AsyncIterator[RowMapping]:
+        """Yield appointment rows with names and slot times from a server-side cursor.
+
+        Rows arrive ``EXPORT_BATCH_SIZE`` at a time, so memory stays flat no
+        matter how many appointments match. Appointments whose slot was
+        deleted are kept, with no slot times.
+        """
+        query = (
+            _appointment_rows_query()
+            .add_columns(AvailableTimeSlot.start_time, AvailableTimeSlot.end_time)
+            .outerjoin(AvailableTimeSlot, Appointment.available_time_slot_id == AvailableTimeSlot.id)
+            .order_by(Appointment.created_at, Appointment.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        if status is not None:
+            query = query.where(Appointment.status == status)
+        if doctor_id is not None:
+            query = query.where(Appointment.doctor_id == doctor_id)
+
+        result = await db.stream(query)
+        async for row in result.mappings():
+            yield row
+
+    @staticmethod
+    async def get_doctor_calendar(
+        db: AsyncSession, doctor_id: int, start: date, days: int = 7
+    ) -> DoctorCalendar:
+        """A doctor's slots with their booking status and patient, day by day.
+
+        The current and next calendar week (Monday plus seven days) are read
+        through the cache; writes to the doctor's slots or appointments, and
+        deleting the doctor, drop them again.
+        """
+        if days == 7 and start in _cached_calendar_weeks(datetime.utcnow().date()):
+            return await calendar_cache.get_or_load(
+                f"{doctor_id}:{start.isoformat()}",
+                lambda: _doctor_calendar(db, doctor_id, start, days),
+                version=await calendar_cache.generation(doctor_id),
+            )
+        return await _doctor_calendar(db, doctor_id, start, days)
+
+    @staticmethod
+    async def get_appointment_stats(
+        db: AsyncSession, start: date, end: date, doctor_id: Optional[int] = None
+    ) -> AppointmentStats:
+        """Appointment counts per doctor and day from the trigger-maintained aggregates.
+
+        The query reads at most one row per doctor, day and status, however
+        many appointments there are.
+        """
+        counts = {
+            status: func.coalesce(
+                func.sum(AppointmentDailyStat.count).filter(AppointmentDailyStat.status == status), 0
+            ).label(status)
+            for status in ("scheduled", "completed", "canceled")
+        }
+        query = (
+            select(AppointmentDailyStat.doctor_id, AppointmentDailyStat.day, *counts.values())
+            .where(AppointmentDailyStat.day >= start, AppointmentDailyStat.day <= end)
+            .group_by(AppointmentDailyStat.doctor_id, AppointmentDailyStat.day)
+            .having(func.sum(AppointmentDailyStat.count) > 0)
+            .order_by(AppointmentDailyStat.day, AppointmentDailyStat.doctor_id)
+        )
+        if doctor_id is not None:
+            query = query.where(AppointmentDailyStat.doctor_id == doctor_id)
+
+        days = [
+            DailyAppointmentStats.model_validate(row)
+            for row in (await db.execute(query)).mappings()
         ]
+        totals = AppointmentCounts(
+            **{status: sum(getattr(day, status) for day in days) for status in counts}
+        )
+        return AppointmentStats(start=start, end=end, totals=totals, days=days)
@@ -1,12 +1,19 @@
 # app/services/users.py
 
-from datetime import timedelta
+from datetime import datetime, timedelta
+import json
 import os
 from typing import Optional
 
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 
+from app.core.cache import cache
+from app.core.principal_cache import principal_cache
+from app.models.appointments import Appointment
 from app.models.users import DoctorProfile, User
+from app.services.appointments import invalidate_calendars
 from app.schemas.user import (
     CreateDoctorProfile,
     LoginUser,
@@ -14,16 +21,76 @@ from app.schemas.user import (
     UpdateDoctorProfile,
     CreateUser,
     DoctorProfileResponse,
+    DoctorCard,
 )
-from app.utils.auth import create_access_token, get_password_hash, verify_password
+from app.utils.auth import create_access_token, password_hasher
+from app.utils.pagination import paginate
 from fastapi import HTTPException, status
 ACCESS_TOKEN_EXPIRE_MINUTES = float(os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES", 15))
 
+user_cache = cache.namespace("user", UserResponse)
+
+
+# UserResponse nests the doctor profile, which cannot be lazy loaded on an
+# AsyncSession, so it is always fetched together with the user.
+def _user_query():
+    return select(User).options(selectinload(User.doctor_profile))
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _search_filter(search: str, search_mode: str):
+    """Filter for the users matching ``search``; every mode is index backed.
+
+    ``contains`` and ``fuzzy`` use the trigram GIN indexes on full_name and
+    email, ``prefix`` the lower(email) text_pattern_ops btree.
+    """
+    if search_mode == "prefix":
+        return func.lower(User.email).like(f"{_escape_like(search.lower())}%", escape="\\")
+    if search_mode == "fuzzy":
+        return or_(User.full_name.op("%")(search), User.email.op("%")(search))
+    pattern = f"%{_escape_like(search)}%"
+    return or_(User.full_name.ilike(pattern, escape="\\"), User.email.ilike(pattern, escape="\\"))
+
+
+def _doctor_profile_query():
+    return select(DoctorProfile).options(joinedload(DoctorProfile.user))
+
+
+def _academic_history_filter(filters: list[str]):
+    """Turn ``key`` and ``key:value`` filters into GIN-indexable JSONB operators.
+
+    Values are parsed as JSON when possible, so ``year:2010`` matches the
+    number 2010 and ``degree:MBBS`` the string "MBBS".
+    """
+    expected, keys = {}, []
+    for item in filters:
+        key, separator, value = item.partition(":")
+        if not key:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="academic_history filters must be 'key' or 'key:value'",
+            )
+        if not separator:
+            keys.append(key)
+            continue
+        try:
+            expected[key] = json.loads(value)
+        except ValueError:
+            expected[key] = value
+
+    conditions = [DoctorProfile.academic_history.has_key(key) for key in keys]
+    if expected:
+        conditions.append(DoctorProfile.academic_history.contains(expected))
+    return and_(*conditions)
+
 class UserService:
     @staticmethod
-    def login(db: Session, form_data: LoginUser):
-        user = db.query(User).filter_by(email=form_data.email).first()
-        if not user or not verify_password(form_data.password, user.hashed_password):
+    async def login(db: AsyncSession, form_data: LoginUser):
+        user = await db.scalar(select(User).filter_by(email=form_data.email))
+        if not user or not await password_hasher.verify(form_data.password, user.hashed_password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password",
@@ -37,15 +104,15 @@ class UserService:
         return {"access_token": access_token, "token_type": "Bearer"}
 
     @staticmethod
-    def register_user(db: Session, user_data: CreateUser):
-        existing_user = db.query(User).filter_by(email=user_data.email).first()
+    async def register_user(db: AsyncSession, user_data: CreateUser):
+        existing_user = await db.scalar(select(User).filter_by(email=user_data.email))
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered",
             )
 
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await password_hasher.hash(user_data.password)
         new_user = User(
             email=user_data.email,
             full_name=user_data.full_name,
@@ -53,13 +120,16 @@ class UserService:
             role=user_data.role,
         )
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
-        return new_user
+        await db.commit()
+        return await db.scalar(
+            _user_query().filter_by(id=new_user.id).execution_options(populate_existing=True)
+        )
 
     @staticmethod
-    def create_doctor_profile(db: Session, user_id: int, profile_data: CreateDoctorProfile):
-        user = db.query(User).filter_by(id=user_id).first()
+    async def create_doctor_profile(
+        db: AsyncSession, user_id: int, profile_data: CreateDoctorProfile
+    ):
+        user = await db.scalar(select(User).filter_by(id=user_id))
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -68,13 +138,23 @@ class UserService:
 
         doctor_profile = DoctorProfile(user_id=user_id, **profile_data.model_dump())
         db.add(doctor_profile)
-        db.commit()
-        db.refresh(doctor_profile)
-        return doctor_profile
+        # The profile is part of the user's representation, so it bumps the
+        # user's version (and ETag) too.
+        user.updated_at = func.now()
+        await db.commit()
+        principal_cache.invalidate(user_id)
+        await user_cache.invalidate(user_id)
+        return await db.scalar(
+            _doctor_profile_query()
+            .filter_by(id=doctor_profile.id)
+            .execution_options(populate_existing=True)
+        )
 
     @staticmethod
-    def update_doctor_profile(db: Session, user_id: int, profile_data: UpdateDoctorProfile):
-        doctor_profile = db.query(DoctorProfile).filter_by(user_id=user_id).first()
+    async def update_doctor_profile(
+        db: AsyncSession, user_id: int, profile_data: UpdateDoctorProfile
+    ):
+        doctor_profile = await db.scalar(select(DoctorProfile).filter_by(user_id=user_id))
         if not doctor_profile:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -84,54 +164,135 @@ class UserService:
         for key, value in profile_data.model_dump(exclude_unset=True).items():
             setattr(doctor_profile, key, value)
 
-        db.commit()
-        db.refresh(doctor_profile)
-        return doctor_profile
+        await db.execute(update(User).filter_by(id=user_id).values(updated_at=func.now()))
+        await db.commit()
+        principal_cache.invalidate(user_id)
+        await user_cache.invalidate(user_id)
+        return await db.scalar(
+            _doctor_profile_query()
+            .filter_by(id=doctor_profile.id)
+            .execution_options(populate_existing=True)
+        )
 
     @staticmethod
-    def get_user(db: Session, user_id: int):
-        user = db.query(User).get(user_id)
-        if not user:
+    async def get_user_version(db: AsyncSession, user_id: int):
+        """updated_at of a user, read without loading the doctor profile."""
+        version = await db.scalar(select(User.updated_at).filter_by(id=user_id))
+        if version is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found",
             )
-        return user
+        return version
+
+    @staticmethod
+    async def get_user(db: AsyncSession, user_id: int, version: Optional[datetime] = None):
+        async def load():
+            user = await db.scalar(_user_query().filter_by(id=user_id))
+            if not user:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="User not found",
+                )
+            return UserResponse.model_validate(user, from_attributes=True)
+
+        return await user_cache.get_or_load(
+            user_id, load, version=version.isoformat() if version else None
+        )
 
     @staticmethod
-    def delete_user(db: Session, user_id: int):
-        user = db.query(User).get(user_id)
+    async def delete_user(db: AsyncSession, user_id: int):
+        user = await db.get(User, user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found",
             )
-        db.delete(user)
-        db.commit()
+        # Cached calendar weeks show the doctor (and skip the "Doctor not
+        # found" check) and the names of the patients booked in them.
+        calendar_doctor_ids = [user_id] if user.role == "doctor" else []
+        calendar_doctor_ids += await db.scalars(
+            select(Appointment.doctor_id).filter_by(patient_id=user_id).distinct()
+        )
+        await db.delete(user)
+        await db.commit()
+        principal_cache.invalidate(user_id)
+        await user_cache.invalidate(user_id)
+        await invalidate_calendars(*calendar_doctor_ids)
 
     @staticmethod
-    def get_all_users(
-        db: Session,
+    async def get_all_users(
+        db: AsyncSession,
         skip: int = 0,
         limit: int = 10,
         search: Optional[str] = None,
         role: Optional[str] = None,
         sort_by: str = "created_at",
         sort_order: str = "asc",
+        cursor: Optional[str] = None,
+        search_mode: str = "contains",
     ):
-        query = db.query(User)
+        ranked = bool(search) and search_mode == "fuzzy"
+        if cursor is not None and (sort_by != "created_at" or ranked):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor pagination is only supported when sorting by created_at",
+            )
+
+        query = _user_query()
 
         if search:
-            query = query.filter(
-                (User.full_name.ilike(f"%{search}%")) | (User.email.ilike(f"%{search}%"))
-            )
+            query = query.filter(_search_filter(search, search_mode))
 
         if role:
             query = query.filter(User.role == role)
 
-        if sort_order == "asc":
-            query = query.order_by(getattr(User, sort_by).asc())
+        if ranked:
+            # Fuzzy results are ordered by how close they are to the search.
+            similarity = func.greatest(
+                func.similarity(User.full_name, search), func.similarity(User.email, search)
+            )
+            query = query.order_by(similarity.desc(), User.id).offset(skip).limit(limit)
+        elif sort_by == "created_at":
+            query = paginate(query, User.created_at, User.id, skip, limit, sort_order, cursor)
         else:
-            query = query.order_by(getattr(User, sort_by).desc())
+            if sort_order == "asc":
+                query = query.order_by(getattr(User, sort_by).asc())
+            else:
+                query = query.order_by(getattr(User, sort_by).desc())
+            query = query.offset(skip).limit(limit)
+
+        return (await db.scalars(query)).all()
+
+    @staticmethod
+    async def get_doctor_directory(
+        db: AsyncSession,
+        specialization: Optional[str] = None,
+        min_experience_years: Optional[int] = None,
+        academic_history: Optional[list[str]] = None,
+        skip: int = 0,
+        limit: int = 10,
+    ) -> list[DoctorCard]:
+        """List doctor profile cards, most experienced first, in one query."""
+        query = select(
+            DoctorProfile.user_id,
+            User.full_name,
+            DoctorProfile.specialization,
+            DoctorProfile.experience_years,
+            DoctorProfile.academic_history,
+        ).join(User, DoctorProfile.user_id == User.id)
 
-        return query.offset(skip).limit(limit).all()
+        if specialization:
+            query = query.where(func.lower(DoctorProfile.specialization) == specialization.lower())
+        if min_experience_years is not None:
+            query = query.where(DoctorProfile.experience_years >= min_experience_years)
+        if academic_history:
+            query = query.where(_academic_history_filter(academic_history))
+
+        query = (
+            query.order_by(DoctorProfile.experience_years.desc(), DoctorProfile.user_id)
+            .offset(skip)
+            .limit(limit)
+        )
+        rows = (await db.execute(query)).mappings()
+        return [DoctorCard.model_validate(row) for row in rows]
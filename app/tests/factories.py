@@ -1,11 +1,34 @@
 from sqlalchemy.orm import Session
 
 from app.models.appointments import Appointment, AvailableTimeSlot
-from app.models.users import User
+from app.models.users import DoctorProfile, User
 from app.utils.auth import get_password_hash
+import functools
+import itertools
 import random
 from datetime import datetime, timedelta
 
+# Slots of the same doctor may not overlap, so generated slots are laid out two
+# hours apart instead of at random times.
+FIRST_TIME_SLOT_START = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+_time_slot_sequence = itertools.count()
+
+
+DEFAULT_PASSWORD = "string123"
+
+
+@functools.lru_cache(maxsize=None)
+def hash_password(password: str) -> str:
+    """bcrypt is deliberately slow, so every distinct password is hashed only once."""
+    return get_password_hash(password)
+
+
+def next_time_slot_window():
+    """Return (start, end) ISO strings for a slot that no earlier slot overlaps."""
+    start_time = FIRST_TIME_SLOT_START + timedelta(hours=2 * next(_time_slot_sequence))
+    end_time = start_time + timedelta(minutes=random.randint(30, 120))
+    return start_time.isoformat(), end_time.isoformat()
+
 
 class UserFactory:
     def __init__(self, **defaults):
@@ -13,7 +36,7 @@ class UserFactory:
         self.defaults = {
             "email": "test@example.com",
             "full_name": "Test User",
-            "hashed_password": get_password_hash("string123"),
+            "hashed_password": hash_password(DEFAULT_PASSWORD),
             "role": "patient",
         }
         self.defaults.update(defaults)
@@ -35,7 +58,7 @@ class UserFactory:
 
         # Handle password specially if provided
         if "password" in user_data:
-            user_data["hashed_password"] = get_password_hash(user_data["password"])
+            user_data["hashed_password"] = hash_password(user_data["password"])
             del user_data["password"]
 
         user = User(**user_data)
@@ -45,24 +68,45 @@ class UserFactory:
         return user
 
 
+class DoctorProfileFactory:
+    def __init__(self, **defaults):
+        """Initialize with default attributes that will be used for all created doctor profiles"""
+        self.defaults = {
+            "specialization": "General Practice",
+            "experience_years": 5,
+            "academic_history": {"degree": "MBBS"},
+            "bio": "Test doctor",
+        }
+        self.defaults.update(defaults)
+
+    def create(self, db: Session, **kwargs):
+        """Create and persist a test doctor profile to the database"""
+        doctor_profile = DoctorProfile(**{**self.defaults, **kwargs})
+        db.add(doctor_profile)
+        db.commit()
+        db.refresh(doctor_profile)
+        return doctor_profile
+
+
 class AvailableTimeSlotFactory:
     def __init__(self, **defaults):
         """Initialize with default attributes that will be used for all created time slots"""
-        start_time = datetime.now() + timedelta(days=random.randint(1, 30))
-        end_time = start_time + timedelta(minutes=random.randint(30, 120))
-
         self.defaults = {
             "doctor_id": 1,
-            "start_time": start_time.isoformat(),
-            "end_time": end_time.isoformat(),
         }
         self.defaults.update(defaults)
 
+    def build_data(self, **kwargs):
+        """Merge defaults and kwargs, picking a fresh time window if none is given"""
+        time_slot_data = {**self.defaults, **kwargs}
+        if "start_time" not in time_slot_data:
+            time_slot_data["start_time"], time_slot_data["end_time"] = next_time_slot_window()
+        return time_slot_data
+
     def create(self, db: Session, **kwargs):
         """Create and persist a test available time slot to the database"""
         # Start with factory defaults, override with method kwargs
-        time_slot_data = {**self.defaults, **kwargs}
-        time_slot = AvailableTimeSlot(**time_slot_data)
+        time_slot = AvailableTimeSlot(**self.build_data(**kwargs))
         db.add(time_slot)
         db.commit()
         db.refresh(time_slot)
@@ -72,8 +116,7 @@ class AvailableTimeSlotFactory:
         """Create and persist a batch of test available time slots to the database"""
         time_slots = []
         for _ in range(count):
-            time_slot_data = {**self.defaults, **kwargs}
-            time_slot = AvailableTimeSlot(**time_slot_data)
+            time_slot = AvailableTimeSlot(**self.build_data(**kwargs))
             db.add(time_slot)
             time_slots.append(time_slot)
         db.commit()
@@ -105,13 +148,11 @@ class AppointmentFactory:
 
     def create_batch(self, db: Session, count: int = 5, **kwargs):
         """Create and persist a batch of test appointments to the database"""
-        appointments = []
-        for _ in range(count):
-            # Create a new available time slot for each appointment
-            available_time_slot_factory = AvailableTimeSlotFactory()
-            available_time_slot = available_time_slot_factory.create(db)
+        # Every appointment gets its own time slot; they are created together.
+        available_time_slots = AvailableTimeSlotFactory().create_batch(db, count)
 
-            # Update the defaults with the newly created available time slot ID
+        appointments = []
+        for available_time_slot in available_time_slots:
             appointment_data = {
                 **self.defaults,
                 "available_time_slot_id": available_time_slot.id,
@@ -1,5 +1,24 @@
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
 import pytest
-from app.tests.factories import AppointmentFactory, AvailableTimeSlotFactory
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from app.models.appointments import Appointment
+from app.schemas.appointment import CreateAppointment
+from app.services import appointments as appointment_service
+from app.services.appointments import AppointmentService
+from app.tests.factories import (
+    AppointmentFactory,
+    AvailableTimeSlotFactory,
+    DoctorProfileFactory,
+    UserFactory,
+    next_time_slot_window,
+)
 
 class TestAppointment:
     @pytest.mark.parametrize(
@@ -41,6 +60,122 @@ class TestAppointment:
         assert response.status_code == 400
         assert response.json() == {"detail": "Time slot already exists or overlaps with another slot"}
 
+    def test_allow_back_to_back_time_slots(self, client, mock_authenticated_user, db):
+        """Test that a slot may start exactly when the previous one ends."""
+        token, auth_user = mock_authenticated_user(role="doctor")
+
+        time_slot_factory = AvailableTimeSlotFactory()
+        time_slot_factory.create(
+            db=db,
+            doctor_id=auth_user.id,
+            start_time="2025-05-02T10:00:00Z",
+            end_time="2025-05-02T11:00:00Z",
+        )
+
+        client.headers.update({"Authorization": f"Bearer {token}"})
+        payload = {"start_time": "2025-05-02T11:00:00Z", "end_time": "2025-05-02T12:00:00Z"}
+
+        response = client.post("/appointments/create-time-slot", json=payload)
+        assert response.status_code == 201
+
+    def test_deny_overlapping_time_slot_update(self, client, mock_authenticated_user, db):
+        """Test that a slot cannot be moved onto another slot of the same doctor."""
+        token, auth_user = mock_authenticated_user(role="doctor")
+
+        time_slot_factory = AvailableTimeSlotFactory()
+        time_slot_factory.create(
+            db=db,
+            doctor_id=auth_user.id,
+            start_time="2025-05-02T10:00:00Z",
+            end_time="2025-05-02T11:00:00Z",
+        )
+        time_slot = time_slot_factory.create(
+            db=db,
+            doctor_id=auth_user.id,
+            start_time="2025-05-02T12:00:00Z",
+            end_time="2025-05-02T13:00:00Z",
+        )
+
+        client.headers.update({"Authorization": f"Bearer {token}"})
+        payload = {"start_time": "2025-05-02T10:30:00Z", "end_time": "2025-05-02T12:30:00Z"}
+
+        response = client.put(f"/appointments/update-time-slot/{time_slot.id}", json=payload)
+        assert response.status_code == 400
+        assert response.json() == {"detail": "Updated time slot would overlap with another slot"}
+
+    def test_update_time_slot_of_another_doctor(self, client, mock_authenticated_user, db):
+        """Test that doctors can only update their own slots."""
+        _, other_doctor = mock_authenticated_user(role="doctor")
+        token, _ = mock_authenticated_user(role="doctor")
+
+        time_slot = AvailableTimeSlotFactory().create(db=db, doctor_id=other_doctor.id)
+
+        client.headers.update({"Authorization": f"Bearer {token}"})
+        payload = {"start_time": "2025-05-02T12:00:00Z", "end_time": "2025-05-02T13:00:00Z"}
+
+        response = client.put(f"/appointments/update-time-slot/{time_slot.id}", json=payload)
+        assert response.status_code == 404
+
+    def test_create_recurring_time_slots(self, client, mock_authenticated_user, db):
+        """Test generating a weekly schedule that reports overlaps instead of failing."""
+        token, auth_user = mock_authenticated_user(role="doctor")
+
+        AvailableTimeSlotFactory().create(
+            db=db,
+            doctor_id=auth_user.id,
+            start_time="2025-05-05T10:30:00",
+            end_time="2025-05-05T11:00:00",
+        )
+
+        client.headers.update({"Authorization": f"Bearer {token}"})
+        payload = {
+            "start_date": "2025-05-05",
+            "weeks": 2,
+            "weekdays": [0, 2],
+            "day_start": "09:00:00",
+            "day_end": "12:00:00",
+            "slot_minutes": 60,
+        }
+
+        response = client.post("/appointments/create-recurring-time-slots", json=payload)
+        assert response.status_code == 201
+        assert response.json() == {
+            "created": 11,
+            "conflicts": [{"start_time": "2025-05-05T10:00:00", "end_time": "2025-05-05T11:00:00"}],
+        }
+
+        response = client.post("/appointments/create-recurring-time-slots", json=payload)
+        assert response.status_code == 201
+        assert response.json()["created"] == 0
+        assert len(response.json()["conflicts"]) == 12
+
+    @pytest.mark.parametrize(
+        "changes",
+        [
+            {"day_start": "12:00:00", "day_end": "09:00:00"},
+            {"weekdays": [7]},
+            {"weeks": 52, "weekdays": [0, 1, 2, 3, 4, 5, 6], "slot_minutes": 5},
+        ],
+    )
+    def test_create_recurring_time_slots_with_invalid_schedule(
+        self, client, mock_authenticated_user, changes
+    ):
+        """Test that impossible or oversized schedules are rejected."""
+        token, _ = mock_authenticated_user(role="doctor")
+        client.headers.update({"Authorization": f"Bearer {token}"})
+        payload = {
+            "start_date": "2025-05-05",
+            "weeks": 1,
+            "weekdays": [0],
+            "day_start": "09:00:00",
+            "day_end": "12:00:00",
+            "slot_minutes": 30,
+            **changes,
+        }
+
+        response = client.post("/appointments/create-recurring-time-slots", json=payload)
+        assert response.status_code == 422
+
     def test_time_slot_creation_with_invalid_dates(self, client, mock_authenticated_user):
         """Test that invalid date formats are rejected."""
         token, _ = mock_authenticated_user(role="doctor")
@@ -71,6 +206,32 @@ class TestAppointment:
         assert response.json()["id"] == time_slot.id
         assert response.json()["doctor_id"] == auth_user.id
 
+    def test_get_time_slot_conditional(self, client, mock_authenticated_user, db):
+        """Test that an unchanged time slot answers If-None-Match with 304."""
+        token, auth_user = mock_authenticated_user(role="doctor")
+        time_slot = AvailableTimeSlotFactory().create(db=db, doctor_id=auth_user.id)
+        client.headers.update({"Authorization": f"Bearer {token}"})
+
+        response = client.get(f"/appointments/get-time-slot/{time_slot.id}")
+        etag = response.headers["ETag"]
+
+        response = client.get(
+            f"/appointments/get-time-slot/{time_slot.id}", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+
+        start_time, end_time = next_time_slot_window()
+        payload = {"start_time": start_time, "end_time": end_time}
+        assert client.put(f"/appointments/update-time-slot/{time_slot.id}", json=payload).status_code == 200
+
+        response = client.get(
+            f"/appointments/get-time-slot/{time_slot.id}", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
     def test_delete_time_slot(self, client, mock_authenticated_user, db):
         """Test deleting a time slot."""
         token, auth_user = mock_authenticated_user(role="doctor")
@@ -123,6 +284,82 @@ class TestAppointment:
         assert response.status_code == 200
         assert len(response.json()) == 5
 
+    @pytest.mark.parametrize(
+        "params, expected_slots",
+        [
+            ({}, ["cardio_free", "derm_free"]),
+            ({"specialization": "cardiology"}, ["cardio_free"]),
+            ({"doctor_id": "derm"}, ["derm_free"]),
+            ({"end": "2025-05-02T10:30:00"}, []),
+        ],
+    )
+    def test_search_available_time_slots(
+        self, client, mock_authenticated_user, db, params, expected_slots
+    ):
+        """Test that the availability search only returns unbooked slots in the window."""
+        token, patient_data = mock_authenticated_user(role="patient")
+        _, cardiologist = mock_authenticated_user(role="doctor")
+        _, dermatologist = mock_authenticated_user(role="doctor")
+        DoctorProfileFactory().create(db, user_id=cardiologist.id, specialization="Cardiology")
+        DoctorProfileFactory().create(db, user_id=dermatologist.id, specialization="Dermatology")
+
+        time_slot_factory = AvailableTimeSlotFactory()
+        slots = {
+            "cardio_free": time_slot_factory.create(
+                db,
+                doctor_id=cardiologist.id,
+                start_time="2025-05-02T10:00:00",
+                end_time="2025-05-02T11:00:00",
+            ),
+            "cardio_booked": time_slot_factory.create(
+                db,
+                doctor_id=cardiologist.id,
+                start_time="2025-05-02T12:00:00",
+                end_time="2025-05-02T13:00:00",
+            ),
+            "derm_free": time_slot_factory.create(
+                db,
+                doctor_id=dermatologist.id,
+                start_time="2025-05-03T09:00:00",
+                end_time="2025-05-03T10:00:00",
+            ),
+            "derm_outside_window": time_slot_factory.create(
+                db,
+                doctor_id=dermatologist.id,
+                start_time="2025-06-01T09:00:00",
+                end_time="2025-06-01T10:00:00",
+            ),
+        }
+        AppointmentFactory().create(
+            db,
+            doctor_id=cardiologist.id,
+            patient_id=patient_data.id,
+            available_time_slot_id=slots["cardio_booked"].id,
+        )
+
+        query = {"start": "2025-05-01T00:00:00", "end": "2025-05-31T00:00:00", **params}
+        if query.get("doctor_id") == "derm":
+            query["doctor_id"] = dermatologist.id
+
+        client.headers.update({"Authorization": f"Bearer {token}"})
+
+        response = client.get("/appointments/search-available-time-slots", params=query)
+        assert response.status_code == 200
+        assert [slot["id"] for slot in response.json()] == [
+            slots[name].id for name in expected_slots
+        ]
+
+    def test_search_available_time_slots_with_invalid_window(self, client, mock_authenticated_user):
+        """Test that the window end must come after its start."""
+        token, _ = mock_authenticated_user(role="patient")
+        client.headers.update({"Authorization": f"Bearer {token}"})
+
+        response = client.get(
+            "/appointments/search-available-time-slots",
+            params={"start": "2025-05-02T00:00:00", "end": "2025-05-01T00:00:00"},
+        )
+        assert response.status_code == 400
+
     @pytest.mark.parametrize(
         "role, expected_status",
         [
@@ -161,6 +398,86 @@ class TestAppointment:
                 "detail": "Only patient has the  permission to perform this action"
             }
 
+    def test_book_time_slot_of_another_doctor(self, client, mock_authenticated_user, db):
+        """Test that a slot can only be booked with the doctor it belongs to."""
+        _, doctor_data = mock_authenticated_user(role="doctor")
+        _, other_doctor_data = mock_authenticated_user(role="doctor")
+        token, _ = mock_authenticated_user(role="patient")
+
+        time_slot = AvailableTimeSlotFactory().create(db=db, doctor_id=doctor_data.id)
+
+        client.headers.update({"Authorization": f"Bearer {token}"})
+        payload = {"available_time_slot_id": time_slot.id, "doctor_id": other_doctor_data.id}
+
+        response = client.post("/appointments/book-appointment", json=payload)
+        assert response.status_code == 400
+        assert response.json() == {
+            "detail": "This time slot does not belong to the selected doctor."
+        }
+
+        payload = {"available_time_slot_id": time_slot.id + 1, "doctor_id": doctor_data.id}
+        response = client.post("/appointments/book-appointment", json=payload)
+        assert response.status_code == 404
+
+    def test_book_already_booked_time_slot(self, client, mock_authenticated_user, db):
+        """Test that a scheduled slot cannot be booked again, but a canceled one can."""
+        _, doctor_data = mock_authenticated_user(role="doctor")
+        token, _ = mock_authenticated_user(role="patient")
+
+        time_slot = AvailableTimeSlotFactory().create(db=db, doctor_id=doctor_data.id)
+        payload = {"available_time_slot_id": time_slot.id, "doctor_id": doctor_data.id}
+
+        client.headers.update({"Authorization": f"Bearer {token}"})
+
+        first = client.post("/appointments/book-appointment", json=payload)
+        assert first.status_code == 201
+
+        response = client.post("/appointments/book-appointment", json=payload)
+        assert response.status_code == 400
+        assert response.json() == {
+            "detail": "This time slot is already booked by another patient."
+        }
+
+        client.post(f"/appointments/cancel-appointment/{first.json()['id']}")
+        response = client.post("/appointments/book-appointment", json=payload)
+        assert response.status_code == 201
+
+    def test_concurrent_bookings_have_a_single_winner(
+        self, db, async_session_factory, mock_authenticated_user
+    ):
+        """Test that simultaneous bookings of one slot produce exactly one appointment."""
+        _, doctor_data = mock_authenticated_user(role="doctor")
+        user_factory = UserFactory(role="patient")
+        patients = [
+            user_factory.create(db, email=f"patient{index}@app.com") for index in range(20)
+        ]
+        time_slot = AvailableTimeSlotFactory().create(db=db, doctor_id=doctor_data.id)
+        appointment = CreateAppointment(
+            doctor_id=doctor_data.id, available_time_slot_id=time_slot.id
+        )
+
+        async def book(patient_id):
+            async with async_session_factory() as session:
+                try:
+                    await AppointmentService.create_appointment(session, patient_id, appointment)
+                except HTTPException as e:
+                    return e.status_code
+                return 201
+
+        async def book_all():
+            return await asyncio.gather(*(book(patient.id) for patient in patients))
+
+        results = asyncio.run(book_all())
+
+        assert results.count(201) == 1
+        assert results.count(400) == len(patients) - 1
+        assert (
+            db.query(Appointment)
+            .filter_by(available_time_slot_id=time_slot.id, status="scheduled")
+            .count()
+            == 1
+        )
+
     @pytest.mark.parametrize(
         "role, expected_status",
         [
@@ -255,6 +572,75 @@ class TestAppointment:
         assert response.status_code == 200
         assert len(response.json()) == 5
 
+    @pytest.mark.parametrize("sort_order", ["asc", "desc"])
+    def test_get_all_appointments_with_cursor(self, client, mock_authenticated_user, db, sort_order):
+        """Test walking every appointment page by page with the next cursor."""
+        token, auth_user = mock_authenticated_user(role="doctor")
+
+        appointment_factory = AppointmentFactory()
+        appointments = appointment_factory.create_batch(db=db, count=7, doctor_id=auth_user.id)
+
+        client.headers.update({"Authorization": f"Bearer {token}"})
+
+        seen = []
+        params = {"limit": 3, "sort_order": sort_order}
+        while True:
+            response = client.get("/appointments/get-all-appointments", params=params)
+            assert response.status_code == 200
+            seen.extend(item["id"] for item in response.json())
+            if "X-Next-Cursor" not in response.headers:
+                break
+            params["cursor"] = response.headers["X-Next-Cursor"]
+
+        expected = sorted(appointment.id for appointment in appointments)
+        assert seen == (expected if sort_order == "asc" else expected[::-1])
+
+    def test_get_all_appointments_with_invalid_cursor(self, client, mock_authenticated_user):
+        """Test that a malformed cursor is rejected."""
+        token, _ = mock_authenticated_user(role="doctor")
+
+        client.headers.update({"Authorization": f"Bearer {token}"})
+
+        response = client.get("/appointments/get-all-appointments", params={"cursor": "nope"})
+        assert response.status_code == 400
+        assert response.json() == {"detail": "Invalid pagination cursor"}
+
+    def test_list_query_count_does_not_grow_with_page_size(
+        self, client, mock_authenticated_user, db, query_counter
+    ):
+        """Test that list endpoints fetch related names in the same statement."""
+        token, _ = mock_authenticated_user(role="admin")
+
+        user_factory = UserFactory()
+        time_slot_factory = AvailableTimeSlotFactory()
+        appointment_factory = AppointmentFactory()
+        for index in range(20):
+            doctor = user_factory.create(db, email=f"doctor{index}@app.com", role="doctor")
+            patient = user_factory.create(db, email=f"patient{index}@app.com", role="patient")
+            time_slot = time_slot_factory.create(db, doctor_id=doctor.id)
+            appointment_factory.create(
+                db,
+                doctor_id=doctor.id,
+                patient_id=patient.id,
+                available_time_slot_id=time_slot.id,
+            )
+
+        client.headers.update({"Authorization": f"Bearer {token}"})
+        # Warm the principal cache so only the list queries are compared.
+        client.get("/appointments/get-all-time-slots")
+
+        for path in ("/appointments/get-all-appointments", "/appointments/get-all-time-slots"):
+            query_counts = []
+            for limit in (1, 20):
+                query_counter.clear()
+                response = client.get(path, params={"limit": limit})
+                assert response.status_code == 200
+                assert len(response.json()) == limit
+                assert all(item["doctor_name"] for item in response.json())
+                query_counts.append(len(query_counter))
+
+            assert query_counts[0] == query_counts[1]
+
     def test_get_appointment_by_id(self, client, mock_authenticated_user, db):
         """Test fetching an appointment by its ID."""
         token, auth_user = mock_authenticated_user(role="doctor")
@@ -282,3 +668,596 @@ class TestAppointment:
         assert response.status_code == 200
         assert response.json()["id"] == appointment.id
         assert response.json()["doctor_id"] == auth_user.id
+
+    @pytest.mark.parametrize(
+        "role, expected_status",
+        [
+            ("admin", 200),
+            ("doctor", 403),
+            ("patient", 403),
+        ],
+    )
+    def test_bulk_cancel_appointments(self, client, mock_authenticated_user, db, role, expected_status):
+        """Test that an admin can cancel a doctor's scheduled appointments at once."""
+        token, _ = mock_authenticated_user(role=role)
+        _, doctor_data = mock_authenticated_user(role="doctor")
+        _, patient_data = mock_authenticated_user(role="patient")
+        time_slots = AvailableTimeSlotFactory().create_batch(db, count=3, doctor_id=doctor_data.id)
+        appointment_factory = AppointmentFactory(doctor_id=doctor_data.id, patient_id=patient_data.id)
+        scheduled = [
+            appointment_factory.create(db, available_time_slot_id=time_slot.id)
+            for time_slot in time_slots[:2]
+        ]
+        completed = appointment_factory.create(
+            db, available_time_slot_id=time_slots[2].id, status="completed"
+        )
+
+        client.headers.update({"Authorization": f"Bearer {token}"})
+        response = client.post(
+            "/appointments/bulk-cancel-appointments",
+            json={"doctor_id": doctor_data.id, "appointment_ids": [a.id for a in scheduled] + [completed.id]},
+        )
+        assert response.status_code == expected_status
+        if expected_status != 200:
+            return
+
+        data = response.json()
+        assert data["succeeded"] == 2
+        assert data["failed"] == 1
+        assert {r["appointment_id"] for r in data["results"] if r["status"] == "canceled"} == {
+            a.id for a in scheduled
+        }
+        assert data["results"][-1]["appointment_id"] == completed.id
+        assert data["results"][-1]["status"] == "skipped"
+
+        db.expire_all()
+        assert db.query(Appointment).filter_by(doctor_id=doctor_data.id, status="canceled").count() == 2
+        assert db.get(Appointment, completed.id).status == "completed"
+
+    def test_bulk_cancel_requires_a_selection(self, client, mock_authenticated_user):
+        """Test that an empty selection is rejected instead of canceling everything."""
+        token, _ = mock_authenticated_user(role="admin")
+        client.headers.update({"Authorization": f"Bearer {token}"})
+
+        response = client.post("/appointments/bulk-cancel-appointments", json={})
+        assert response.status_code == 422
+
+    def test_bulk_reassign_appointments(self, client, mock_authenticated_user, db):
+        """Test moving a doctor's appointments to another doctor at the same times."""
+        token, _ = mock_authenticated_user(role="admin")
+        _, doctor_data = mock_authenticated_user(role="doctor")
+        _, covering_doctor = mock_authenticated_user(role="doctor")
+        _, patient_data = mock_authenticated_user(role="patient")
+        time_slots = AvailableTimeSlotFactory().create_batch(db, count=2, doctor_id=doctor_data.id)
+        appointment_factory = AppointmentFactory(doctor_id=doctor_data.id, patient_id=patient_data.id)
+        free_for_cover, busy_for_cover = [
+            appointment_factory.create(db, available_time_slot_id=time_slot.id) for time_slot in time_slots
+        ]
+
+        # The covering doctor already has a booked appointment at the second time.
+        covering_slot = AvailableTimeSlotFactory().create(
+            db,
+            doctor_id=covering_doctor.id,
+            start_time=time_slots[1].start_time,
+            end_time=time_slots[1].end_time,
+        )
+        AppointmentFactory().create(
+            db,
+            doctor_id=covering_doctor.id,
+            patient_id=patient_data.id,
+            available_time_slot_id=covering_slot.id,
+        )
+
+        client.headers.update({"Authorization": f"Bearer {token}"})
+        response = client.post(
+            "/appointments/bulk-reassign-appointments",
+            json={"doctor_id": doctor_data.id, "new_doctor_id": covering_doctor.id},
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["succeeded"] == 1
+        assert data["failed"] == 1
+        results = {r["appointment_id"]: r for r in data["results"]}
+        assert results[free_for_cover.id]["status"] == "reassigned"
+        assert results[busy_for_cover.id]["status"] == "skipped"
+
+        db.expire_all()
+        moved = db.get(Appointment, free_for_cover.id)
+        assert moved.doctor_id == covering_doctor.id
+        assert moved.status == "scheduled"
+        assert moved.available_time_slot.doctor_id == covering_doctor.id
+        assert moved.available_time_slot.start_time == time_slots[0].start_time
+        assert db.get(Appointment, busy_for_cover.id).doctor_id == doctor_data.id
+
+    def test_bulk_reassign_to_unknown_doctor(self, client, mock_authenticated_user):
+        """Test that appointments can only be reassigned to an existing doctor."""
+        token, _ = mock_authenticated_user(role="admin")
+        _, patient_data = mock_authenticated_user(role="patient")
+        client.headers.update({"Authorization": f"Bearer {token}"})
+
+        response = client.post(
+            "/appointments/bulk-reassign-appointments",
+            json={"appointment_ids": [1], "new_doctor_id": patient_data.id},
+        )
+        assert response.status_code == 404
+
+    def test_bulk_book_appointments(self, client, mock_authenticated_user, db):
+        """Test booking a group of patients in one request with per-item results."""
+        token, _ = mock_authenticated_user(role="admin")
+        _, doctor_data = mock_authenticated_user(role="doctor")
+        _, other_doctor = mock_authenticated_user(role="doctor")
+        user_factory = UserFactory(role="patient")
+        patients = [user_factory.create(db, email=f"group{index}@app.com") for index in range(3)]
+        time_slots = AvailableTimeSlotFactory().create_batch(db, count=3, doctor_id=doctor_data.id)
+        AppointmentFactory().create(
+            db,
+            doctor_id=doctor_data.id,
+            patient_id=patients[0].id,
+            available_time_slot_id=time_slots[2].id,
+        )
+
+        payload = {
+            "appointments": [
+                {"patient_id": patients[0].id, "doctor_id": doctor_data.id, "available_time_slot_id": time_slots[0].id},
+                {"patient_id": patients[1].id, "doctor_id": doctor_data.id, "available_time_slot_id": time_slots[1].id},
+                {"patient_id": patients[2].id, "doctor_id": doctor_data.id, "available_time_slot_id": time_slots[2].id},
+                {"patient_id": patients[2].id, "doctor_id": other_doctor.id, "available_time_slot_id": time_slots[1].id},
+                {"patient_id": other_doctor.id, "doctor_id": doctor_data.id, "available_time_slot_id": time_slots[1].id},
+                {"patient_id": patients[2].id, "doctor_id": doctor_data.id, "available_time_slot_id": time_slots[2].id + 100},
+            ]
+        }
+
+        client.headers.update({"Authorization": f"Bearer {token}"})
+        response = client.post("/appointments/bulk-book-appointments", json=payload)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["succeeded"] == 2
+        assert data["failed"] == 4
+        assert [r["status"] for r in data["results"]] == ["booked", "booked"] + ["skipped"] * 4
+        assert [r["detail"] for r in data["results"][2:]] == [
+            "This time slot is already booked by another patient.",
+            "This time slot does not belong to the selected doctor.",
+            "Patient not found",
+            "Time slot not found",
+        ]
+        assert db.query(Appointment).filter_by(status="scheduled").count() == 3
+
+    def test_bulk_book_counts_repeated_items_once(self, client, mock_authenticated_user, db):
+        """Test that a repeated item is reported as a duplicate, not a second booking."""
+        token, _ = mock_authenticated_user(role="admin")
+        _, doctor_data = mock_authenticated_user(role="doctor")
+        _, patient_data = mock_authenticated_user(role="patient")
+        time_slots = AvailableTimeSlotFactory().create_batch(db, count=2, doctor_id=doctor_data.id)
+        AppointmentFactory().create(
+            db,
+            doctor_id=doctor_data.id,
+            patient_id=patient_data.id,
+            available_time_slot_id=time_slots[1].id,
+        )
+        item = {"patient_id": patient_data.id, "doctor_id": doctor_data.id, "available_time_slot_id": time_slots[0].id}
+        rebooking = {**item, "available_time_slot_id": time_slots[1].id}
+
+        client.headers.update({"Authorization": f"Bearer {token}"})
+        response = client.post(
+            "/appointments/bulk-book-appointments", json={"appointments": [item, item, rebooking]}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["succeeded"] == 1
+        assert data["failed"] == 2
+        assert [r["detail"] for r in data["results"]] == [
+            None,
+            "Duplicate item",
+            "This time slot is already booked by this patient.",
+        ]
+        assert db.query(Appointment).filter_by(available_time_slot_id=time_slots[0].id).count() == 1
+
+    @pytest.mark.parametrize(
+        "role, expected_status",
+        [
+            ("admin", 200),
+            ("doctor", 403),
+            ("patient", 403),
+        ],
+    )
+    def test_export_appointments_as_ndjson(self, client, mock_authenticated_user, db, role, expected_status):
+        """Test streaming every appointment as one JSON object per line."""
+        token, _ = mock_authenticated_user(role=role)
+        _, doctor_data = mock_authenticated_user(role="doctor")
+        _, patient_data = mock_authenticated_user(role="patient")
+        time_slots = AvailableTimeSlotFactory().create_batch(db, count=3, doctor_id=doctor_data.id)
+        appointments = [
+            AppointmentFactory().create(
+                db,
+                doctor_id=doctor_data.id,
+                patient_id=patient_data.id,
+                available_time_slot_id=time_slot.id,
+            )
+            for time_slot in time_slots
+        ]
+
+        client.headers.update({"Authorization": f"Bearer {token}"})
+        response = client.get("/appointments/export-appointments")
+        assert response.status_code == expected_status
+        if expected_status != 200:
+            return
+
+        assert response.headers["content-type"] == "application/x-ndjson"
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["id"] for row in rows] == [appointment.id for appointment in appointments]
+        assert rows[0]["patient_name"] == patient_data.full_name
+        assert rows[0]["doctor_name"] == doctor_data.full_name
+        assert rows[0]["start_time"] == time_slots[0].start_time.isoformat()
+
+    def test_export_appointments_as_csv(self, client, mock_authenticated_user, db):
+        """Test the CSV export and its status filter."""
+        token, _ = mock_authenticated_user(role="admin")
+        _, doctor_data = mock_authenticated_user(role="doctor")
+        _, patient_data = mock_authenticated_user(role="patient")
+        time_slots = AvailableTimeSlotFactory().create_batch(db, count=2, doctor_id=doctor_data.id)
+        appointment_factory = AppointmentFactory(doctor_id=doctor_data.id, patient_id=patient_data.id)
+        scheduled = appointment_factory.create(db, available_time_slot_id=time_slots[0].id)
+        appointment_factory.create(db, available_time_slot_id=time_slots[1].id, status="completed")
+
+        client.headers.update({"Authorization": f"Bearer {token}"})
+        response = client.get(
+            "/appointments/export-appointments", params={"format": "csv", "status": "scheduled"}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(rows) == 1
+        assert rows[0]["id"] == str(scheduled.id)
+        assert rows[0]["end_time"] == time_slots[0].end_time.isoformat()
+
+    def test_export_keeps_appointments_of_deleted_time_slots(self, client, mock_authenticated_user, db):
+        """Test that an appointment whose slot was deleted is still exported, without times."""
+        admin_token, _ = mock_authenticated_user(role="admin")
+        doctor_token, doctor_data = mock_authenticated_user(role="doctor")
+        _, patient_data = mock_authenticated_user(role="patient")
+        time_slot = AvailableTimeSlotFactory().create(db=db, doctor_id=doctor_data.id)
+        appointment = AppointmentFactory().create(
+            db,
+            doctor_id=doctor_data.id,
+            patient_id=patient_data.id,
+            available_time_slot_id=time_slot.id,
+        )
+
+        client.headers.update({"Authorization": f"Bearer {doctor_token}"})
+        assert client.delete(f"/appointments/delete-time-slot/{time_slot.id}").status_code == 204
+
+        client.headers.update({"Authorization": f"Bearer {admin_token}"})
+        rows = [
+            json.loads(line)
+            for line in client.get("/appointments/export-appointments").text.splitlines()
+        ]
+        assert [row["id"] for row in rows] == [appointment.id]
+        assert rows[0]["available_time_slot_id"] is None
+        assert rows[0]["start_time"] is None and rows[0]["end_time"] is None
+
+        response = client.get("/appointments/export-appointments", params={"format": "csv"})
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert rows[0]["id"] == str(appointment.id)
+        assert rows[0]["start_time"] == ""
+
+    def test_get_appointment_conditional(self, client, mock_authenticated_user, db):
+        """Test that the appointment ETag changes when the appointment does."""
+        token, doctor_data = mock_authenticated_user(role="doctor")
+        _, patient_data = mock_authenticated_user(role="patient")
+        time_slot = AvailableTimeSlotFactory().create(db=db, doctor_id=doctor_data.id)
+        appointment = AppointmentFactory().create(
+            db,
+            doctor_id=doctor_data.id,
+            patient_id=patient_data.id,
+            available_time_slot_id=time_slot.id,
+        )
+        client.headers.update({"Authorization": f"Bearer {token}"})
+
+        etag = client.get(f"/appointments/get-appointment/{appointment.id}").headers["ETag"]
+        response = client.get(
+            f"/appointments/get-appointment/{appointment.id}",
+            headers={"If-None-Match": f'"other", {etag}'},
+        )
+        assert response.status_code == 304
+
+        client.post(f"/appointments/complete-appointment/{appointment.id}")
+        response = client.get(
+            f"/appointments/get-appointment/{appointment.id}", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 200
+        assert response.json()["status"] == "completed"
+
+        response = client.get(f"/appointments/get-appointment/{appointment.id + 1}")
+        assert response.status_code == 404
+
+    def test_get_doctor_calendar(self, client, mock_authenticated_user, db):
+        """Test that the calendar lists every day with annotated slots."""
+        token, doctor_data = mock_authenticated_user(role="doctor")
+        _, patient_data = mock_authenticated_user(role="patient")
+        slot_factory = AvailableTimeSlotFactory(doctor_id=doctor_data.id)
+        free = slot_factory.create(db, start_time="2025-05-05T09:00:00", end_time="2025-05-05T10:00:00")
+        booked = slot_factory.create(db, start_time="2025-05-05T10:00:00", end_time="2025-05-05T11:00:00")
+        done = slot_factory.create(db, start_time="2025-05-07T09:00:00", end_time="2025-05-07T10:00:00")
+        slot_factory.create(db, start_time="2025-05-12T09:00:00", end_time="2025-05-12T10:00:00")
+        appointment_factory = AppointmentFactory(doctor_id=doctor_data.id, patient_id=patient_data.id)
+        appointment_factory.create(db, available_time_slot_id=booked.id, status="canceled", patient_id=None)
+        appointment = appointment_factory.create(db, available_time_slot_id=booked.id)
+        appointment_factory.create(db, available_time_slot_id=done.id, status="completed")
+
+        client.headers.update({"Authorization": f"Bearer {token}"})
+        response = client.get(
+            f"/appointments/doctor-calendar/{doctor_data.id}", params={"start": "2025-05-05"}
+        )
+        assert response.status_code == 200
+        days = response.json()["days"]
+        assert [day["date"] for day in days] == [f"2025-05-{day:02d}" for day in range(5, 12)]
+        assert [len(day["slots"]) for day in days] == [2, 0, 1, 0, 0, 0, 0]
+
+        first_day = days[0]["slots"]
+        assert first_day[0]["time_slot_id"] == free.id
+        assert first_day[0]["status"] == "available"
+        assert first_day[0]["patient_name"] is None
+        assert first_day[1]["status"] == "scheduled"
+        assert first_day[1]["appointment_id"] == appointment.id
+        assert first_day[1]["patient_name"] == patient_data.full_name
+        assert days[2]["slots"][0]["status"] == "completed"
+
+    @pytest.mark.parametrize(
+        "role, own_calendar, expected_status",
+        [
+            ("admin", False, 200),
+            ("doctor", True, 200),
+            ("doctor", False, 403),
+            ("patient", False, 403),
+        ],
+    )
+    def test_get_doctor_calendar_permissions(
+        self, client, mock_authenticated_user, role, own_calendar, expected_status
+    ):
+        """Test that doctors can only see their own calendar."""
+        token, auth_user = mock_authenticated_user(role=role)
+        _, doctor_data = mock_authenticated_user(role="doctor")
+        doctor_id = auth_user.id if own_calendar else doctor_data.id
+
+        client.headers.update({"Authorization": f"Bearer {token}"})
+        response = client.get(f"/appointments/doctor-calendar/{doctor_id}")
+        assert response.status_code == expected_status
+
+    def test_cached_calendar_week_follows_bookings(
+        self, client, mock_authenticated_user, db, query_counter
+    ):
+        """Test that the cached current week is served until a booking changes it."""
+        doctor_token, doctor_data = mock_authenticated_user(role="doctor")
+        patient_token, _ = mock_authenticated_user(role="patient")
+        today = datetime.utcnow().date()
+        monday = today - timedelta(days=today.weekday())
+        start_time = datetime.combine(monday + timedelta(days=8), datetime.min.time())
+        time_slot = AvailableTimeSlotFactory().create(
+            db,
+            doctor_id=doctor_data.id,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+        )
+        url = f"/appointments/doctor-calendar/{doctor_data.id}"
+        params = {"start": (monday + timedelta(weeks=1)).isoformat()}
+        headers = {"Authorization": f"Bearer {doctor_token}"}
+
+        slot = client.get(url, params=params, headers=headers).json()["days"][1]["slots"][0]
+        assert slot["status"] == "available"
+        query_counter.clear()
+        client.get(url, params=params, headers=headers)
+        assert query_counter == []
+
+        client.post(
+            "/appointments/book-appointment",
+            json={"available_time_slot_id": time_slot.id, "doctor_id": doctor_data.id},
+            headers={"Authorization": f"Bearer {patient_token}"},
+        )
+        slot = client.get(url, params=params, headers=headers).json()["days"][1]["slots"][0]
+        assert slot["status"] == "scheduled"
+
+    def test_calendar_load_in_flight_does_not_outlive_a_booking(
+        self, db, async_session_factory, mock_authenticated_user, monkeypatch
+    ):
+        """Test that a week read before a booking is not cached past it."""
+        _, doctor_data = mock_authenticated_user(role="doctor")
+        _, patient_data = mock_authenticated_user(role="patient")
+        today = datetime.utcnow().date()
+        monday = today - timedelta(days=today.weekday()) + timedelta(weeks=1)
+        start_time = datetime.combine(monday, datetime.min.time())
+        time_slot = AvailableTimeSlotFactory().create(
+            db, doctor_id=doctor_data.id, start_time=start_time, end_time=start_time + timedelta(hours=1)
+        )
+        loaded, release = asyncio.Event(), asyncio.Event()
+        load_calendar = appointment_service._doctor_calendar
+
+        async def slow_load(*args):
+            calendar = await load_calendar(*args)
+            if not loaded.is_set():
+                loaded.set()
+                await release.wait()
+            return calendar
+
+        monkeypatch.setattr(appointment_service, "_doctor_calendar", slow_load)
+
+        async def calendar_status():
+            async with async_session_factory() as session:
+                calendar = await AppointmentService.get_doctor_calendar(session, doctor_data.id, monday)
+                return calendar.days[0].slots[0].status
+
+        async def scenario():
+            stale = asyncio.create_task(calendar_status())
+            await loaded.wait()
+            async with async_session_factory() as session:
+                await AppointmentService.create_appointment(
+                    session,
+                    patient_data.id,
+                    CreateAppointment(doctor_id=doctor_data.id, available_time_slot_id=time_slot.id),
+                )
+            release.set()
+            return await stale, await calendar_status()
+
+        assert asyncio.run(scenario()) == ("available", "scheduled")
+
+    def test_cached_calendar_week_is_dropped_with_its_doctor(self, client, mock_authenticated_user):
+        """Test that a deleted doctor's cached week is not served instead of a 404."""
+        token, _ = mock_authenticated_user(role="admin")
+        _, doctor_data = mock_authenticated_user(role="doctor")
+        today = datetime.utcnow().date()
+        url = f"/appointments/doctor-calendar/{doctor_data.id}"
+        params = {"start": (today - timedelta(days=today.weekday())).isoformat()}
+        client.headers.update({"Authorization": f"Bearer {token}"})
+
+        assert client.get(url, params=params).status_code == 200
+        assert client.delete(f"/users/{doctor_data.id}").status_code == 204
+        assert client.get(url, params=params).status_code == 404
+
+    def test_cached_calendar_week_drops_deleted_patients(self, client, mock_authenticated_user, db):
+        """Test that deleting a booked patient drops their name from cached weeks."""
+        doctor_token, doctor_data = mock_authenticated_user(role="doctor")
+        _, patient_data = mock_authenticated_user(role="patient")
+        today = datetime.utcnow().date()
+        monday = today - timedelta(days=today.weekday())
+        start_time = datetime.combine(monday + timedelta(days=8), datetime.min.time())
+        time_slot = AvailableTimeSlotFactory().create(
+            db,
+            doctor_id=doctor_data.id,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+        )
+        AppointmentFactory().create(
+            db,
+            doctor_id=doctor_data.id,
+            patient_id=patient_data.id,
+            available_time_slot_id=time_slot.id,
+        )
+        url = f"/appointments/doctor-calendar/{doctor_data.id}"
+        params = {"start": (monday + timedelta(weeks=1)).isoformat()}
+        client.headers.update({"Authorization": f"Bearer {doctor_token}"})
+
+        slot = client.get(url, params=params).json()["days"][1]["slots"][0]
+        assert slot["patient_name"] == patient_data.full_name
+        assert client.delete(f"/users/{patient_data.id}").status_code == 204
+        slot = client.get(url, params=params).json()["days"][1]["slots"][0]
+        assert slot["patient_id"] is None
+        assert slot["patient_name"] is None
+
+    def test_appointment_stats_follow_every_write_path(self, client, mock_authenticated_user, db):
+        """Test that the trigger-kept aggregates always equal a COUNT(*) over appointments."""
+        admin_token, _ = mock_authenticated_user(role="admin")
+        doctor_token, doctor_data = mock_authenticated_user(role="doctor")
+        _, covering_doctor = mock_authenticated_user(role="doctor")
+        patient_token, patient_data = mock_authenticated_user(role="patient")
+        time_slots = AvailableTimeSlotFactory().create_batch(db, count=4, doctor_id=doctor_data.id)
+        as_admin = {"Authorization": f"Bearer {admin_token}"}
+        as_doctor = {"Authorization": f"Bearer {doctor_token}"}
+        as_patient = {"Authorization": f"Bearer {patient_token}"}
+
+        def assert_stats_match():
+            expected = db.execute(
+                text(
+                    "SELECT a.doctor_id, s.start_time::date, a.status, count(*) "
+                    "FROM appointments a JOIN available_time_slots s ON s.id = a.available_time_slot_id "
+                    "WHERE a.doctor_id IS NOT NULL GROUP BY 1, 2, 3"
+                )
+            ).all()
+            actual = db.execute(
+                text("SELECT doctor_id, day, status, count FROM appointment_daily_stats WHERE count <> 0")
+            ).all()
+            assert sorted(actual) == sorted(expected)
+            db.rollback()
+
+        booked_ids = []
+        for time_slot in time_slots:
+            response = client.post(
+                "/appointments/book-appointment",
+                json={"available_time_slot_id": time_slot.id, "doctor_id": doctor_data.id},
+                headers=as_patient,
+            )
+            booked_ids.append(response.json()["id"])
+        assert_stats_match()
+
+        client.post(f"/appointments/complete-appointment/{booked_ids[0]}", headers=as_doctor)
+        client.post(f"/appointments/cancel-appointment/{booked_ids[1]}", headers=as_patient)
+        assert_stats_match()
+
+        # Moving a booked slot to another day moves its appointments' counts.
+        start_time, end_time = next_time_slot_window()
+        start_time = (datetime.fromisoformat(start_time) + timedelta(days=3)).isoformat()
+        end_time = (datetime.fromisoformat(end_time) + timedelta(days=3)).isoformat()
+        response = client.put(
+            f"/appointments/update-time-slot/{time_slots[2].id}",
+            json={"start_time": start_time, "end_time": end_time},
+            headers=as_doctor,
+        )
+        assert response.status_code == 200
+        assert_stats_match()
+
+        response = client.post(
+            "/appointments/bulk-reassign-appointments",
+            json={"appointment_ids": [booked_ids[2]], "new_doctor_id": covering_doctor.id},
+            headers=as_admin,
+        )
+        assert response.json()["succeeded"] == 1
+        assert_stats_match()
+
+        response = client.post(
+            "/appointments/bulk-cancel-appointments",
+            json={"doctor_id": covering_doctor.id},
+            headers=as_admin,
+        )
+        assert response.json()["succeeded"] == 1
+        assert_stats_match()
+
+        response = client.delete(
+            f"/appointments/delete-time-slot/{time_slots[0].id}", headers=as_doctor
+        )
+        assert response.status_code == 204
+        assert_stats_match()
+
+    def test_get_appointment_stats(self, client, mock_authenticated_user, db):
+        """Test the stats endpoint's pivot, date range and doctor filter."""
+        token, _ = mock_authenticated_user(role="admin")
+        _, doctor_data = mock_authenticated_user(role="doctor")
+        _, other_doctor = mock_authenticated_user(role="doctor")
+        _, patient_data = mock_authenticated_user(role="patient")
+        slot_factory = AvailableTimeSlotFactory()
+        for doctor, start_time, status in [
+            (doctor_data, "2025-05-05T09:00:00", "scheduled"),
+            (doctor_data, "2025-05-05T10:00:00", "completed"),
+            (doctor_data, "2025-05-06T09:00:00", "canceled"),
+            (other_doctor, "2025-05-05T09:00:00", "scheduled"),
+            (doctor_data, "2025-06-01T09:00:00", "scheduled"),
+        ]:
+            end_time = start_time.replace(":00:00", ":30:00")
+            time_slot = slot_factory.create(db, doctor_id=doctor.id, start_time=start_time, end_time=end_time)
+            AppointmentFactory().create(
+                db,
+                doctor_id=doctor.id,
+                patient_id=patient_data.id,
+                available_time_slot_id=time_slot.id,
+                status=status,
+            )
+
+        client.headers.update({"Authorization": f"Bearer {token}"})
+        response = client.get(
+            "/appointments/appointment-stats",
+            params={"start": "2025-05-01", "end": "2025-05-31", "doctor_id": doctor_data.id},
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["totals"] == {"scheduled": 1, "completed": 1, "canceled": 1}
+        assert data["days"] == [
+            {"doctor_id": doctor_data.id, "day": "2025-05-05", "scheduled": 1, "completed": 1, "canceled": 0},
+            {"doctor_id": doctor_data.id, "day": "2025-05-06", "scheduled": 0, "completed": 0, "canceled": 1},
+        ]
+
+        response = client.get(
+            "/appointments/appointment-stats", params={"start": "2025-05-05", "end": "2025-05-05"}
+        )
+        assert response.json()["totals"] == {"scheduled": 2, "completed": 1, "canceled": 0}
+
+        response = client.get(
+            "/appointments/appointment-stats", params={"start": "2025-05-05", "end": "2025-05-01"}
+        )
+        assert response.status_code == 400
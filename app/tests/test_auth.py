@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from app.core.principal_cache import PrincipalCache, principal_cache
+from app.schemas.user import AuthenticatedUser
+from app.utils.auth import PasswordHasher, get_password_hash
+
+
+def _principal(user_id: int) -> AuthenticatedUser:
+    return AuthenticatedUser(
+        id=user_id, email=f"user{user_id}@app.com", full_name="Test User", role="patient"
+    )
+
+
+def test_warm_cache_skips_user_lookup(client, mock_authenticated_user, query_counter):
+    token, auth_user = mock_authenticated_user(role="doctor")
+    client.headers.update({"Authorization": f"Bearer {token}"})
+
+    response = client.get("/appointments/get-all-time-slots")
+    assert response.status_code == 200
+    cold_query_count = len(query_counter)
+
+    query_counter.clear()
+    response = client.get("/appointments/get-all-time-slots")
+    assert response.status_code == 200
+
+    assert len(query_counter) == cold_query_count - 1
+    assert not any("FROM users" in statement for statement in query_counter)
+    assert principal_cache.get(auth_user.id).role == "doctor"
+
+
+def test_deleted_user_is_evicted_from_cache(client, mock_authenticated_user):
+    token, auth_user = mock_authenticated_user(role="patient")
+    client.headers.update({"Authorization": f"Bearer {token}"})
+
+    assert client.get("/appointments/get-all-time-slots").status_code == 200
+    assert client.delete(f"/users/{auth_user.id}").status_code == 204
+
+    response = client.get("/appointments/get-all-time-slots")
+    assert response.status_code == 401
+    assert response.json() == {"detail": "User not found"}
+
+
+def test_principal_cache_evicts_least_recently_used():
+    cache = PrincipalCache(maxsize=2, ttl=60)
+    cache.set(_principal(1))
+    cache.set(_principal(2))
+    cache.get(1)
+    cache.set(_principal(3))
+
+    assert cache.get(2) is None
+    assert cache.get(1).id == 1
+    assert cache.get(3).id == 3
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["hits"] == 3
+    assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.parametrize("ttl", [0, -1])
+def test_principal_cache_disabled_without_ttl(ttl):
+    cache = PrincipalCache(maxsize=2, ttl=ttl)
+    cache.set(_principal(1))
+
+    assert cache.get(1) is None
+
+
+def test_password_hasher_keeps_event_loop_responsive():
+    hasher = PasswordHasher(max_workers=1)
+    hashed_password = get_password_hash("string123")
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticking = asyncio.create_task(ticker())
+        results = await asyncio.gather(
+            *(hasher.verify("string123", hashed_password) for _ in range(3))
+        )
+        ticking.cancel()
+        return results, ticks
+
+    results, ticks = asyncio.run(run())
+
+    assert results == [True, True, True]
+    assert ticks > 3
+    stats = hasher.stats()
+    assert stats["completed"] == 3
+    assert stats["queued"] == 0
+    assert stats["running"] == 0
+    assert stats["wait_seconds_max"] > 0
@@ -0,0 +1,110 @@
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from app.tests.factories import DEFAULT_PASSWORD, UserFactory
+from benchmarks import seed, serialization
+from benchmarks.dataset import DatasetSize, seed_dataset
+from benchmarks.services import CASES, compare, run_benchmarks
+from conftest import async_engine, engine
+
+
+def test_benchmarks_run_on_a_small_dataset(db):
+    size = DatasetSize(patients=20, doctors=3, slots_per_doctor=6)
+
+    report = run_benchmarks(engine, async_engine, [size], iterations=2, log=lambda line: None)
+
+    assert [result["case"] for result in report["results"]] == [case.name for case in CASES]
+    result = report["results"][0]
+    assert result["size"]["users"] == 23
+    assert result["size"]["available_time_slots"] == 18
+    assert result["p95_ms"] >= result["p50_ms"] > 0
+    assert result["queries"] >= 1
+    # Reports are written as JSON and compared case by case.
+    report = json.loads(json.dumps(report))
+    assert len(compare(report, report)) == len(CASES)
+
+
+def test_serialization_benchmark_times_every_list_endpoint():
+    report = serialization.run(rows=20, repeat=2)
+
+    assert [result["case"] for result in report["results"]] == [
+        case.name for case in serialization.CASES
+    ]
+    for result in report["results"]:
+        assert result["response_us"] > 0
+        assert result["total_us"] >= result["response_us"]
+        assert result["bytes_per_row"] > 0
+    assert len(serialization.compare(report, report)) == len(serialization.CASES)
+
+
+def test_seeded_dataset_is_reproducible_and_consistent(client):
+    size = DatasetSize(patients=30, doctors=4, slots_per_doctor=10, slots_per_day=3)
+    anchor = datetime(2025, 1, 1)
+
+    def snapshot():
+        dataset = seed_dataset(engine, size, seed=3, anchor=anchor, recreate_schema=False)
+        with engine.connect() as connection:
+            rows = connection.execute(
+                text(
+                    "SELECT id, patient_id, doctor_id, available_time_slot_id, status::text "
+                    "FROM appointments ORDER BY id"
+                )
+            ).all()
+        return dataset, rows
+
+    dataset, rows = snapshot()
+    assert snapshot()[1] == rows
+    assert dataset.counts["users"] == 34
+    assert dataset.counts["available_time_slots"] == 40
+    assert len(rows) == dataset.counts["appointments"] > 0
+
+    with engine.connect() as connection:
+        # The overlap constraint and indexes were rebuilt after the load.
+        assert connection.scalar(
+            text(
+                "SELECT count(*) FROM pg_constraint "
+                "WHERE conname = 'excl_available_time_slots_doctor_overlap'"
+            )
+        ) == 1
+        stats = connection.execute(
+            text("SELECT doctor_id, day, status, count FROM appointment_daily_stats ORDER BY 1, 2, 3")
+        ).all()
+        recount = connection.execute(
+            text(
+                "SELECT a.doctor_id, s.start_time::date, a.status::text, count(*) "
+                "FROM appointments a JOIN available_time_slots s ON s.id = a.available_time_slot_id "
+                "GROUP BY 1, 2, 3 ORDER BY 1, 2, 3"
+            )
+        ).all()
+    assert stats == recount
+
+    # Every user shares the factories' password.
+    with engine.connect() as connection:
+        email = connection.scalar(text("SELECT email FROM users ORDER BY id DESC LIMIT 1"))
+    response = client.post("/users/login", json={"email": email, "password": DEFAULT_PASSWORD})
+    assert response.status_code == 200
+
+
+def test_seed_command_refuses_to_overwrite_data(db, capsys):
+    UserFactory().create(db)
+    # Release the session's lock on users so the tables can be truncated.
+    db.close()
+    url = engine.url.render_as_string(hide_password=False)
+
+    with pytest.raises(SystemExit):
+        seed.main(["--database-url", url, "--patients", "5"])
+    assert "--truncate" in capsys.readouterr().err
+
+    seed.main(["--database-url", url, "--patients", "5", "--truncate"])
+    assert "seeded 6 users" in capsys.readouterr().err
+
+
+def test_seed_command_rejects_overlapping_days(capsys):
+    with pytest.raises(SystemExit):
+        seed.main(["--database-url", "postgresql://unused", "--patients", "5", "--slots-per-day", "49"])
+    assert "--slots-per-day" in capsys.readouterr().err
+    with pytest.raises(ValueError):
+        DatasetSize(patients=5, doctors=1, slots_per_day=49)
@@ -0,0 +1,214 @@
+import asyncio
+
+import fakeredis
+import pytest
+from pydantic import BaseModel
+
+from app.core.cache import Cache, CacheBackendError, MemoryBackend, RedisBackend
+from app.tests.factories import AvailableTimeSlotFactory
+
+
+class Item(BaseModel):
+    id: int
+    name: str
+
+
+def memory_backend():
+    return MemoryBackend(maxsize=100)
+
+
+def redis_backend():
+    return RedisBackend(fakeredis.FakeAsyncRedis())
+
+
+class FailingBackend(MemoryBackend):
+    name = "failing"
+
+    async def get(self, key):
+        raise CacheBackendError("connection refused")
+
+    async def set(self, key, value, ttl):
+        raise CacheBackendError("connection refused")
+
+
+@pytest.fixture(params=[memory_backend, redis_backend], ids=["memory", "redis"])
+def make_backend(request):
+    return request.param
+
+
+def test_read_through_and_invalidation(make_backend):
+    items = Cache(make_backend()).namespace("item", Item)
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return Item(id=1, name=f"load {len(loads)}")
+
+    async def scenario():
+        first = await items.get_or_load(1, load)
+        second = await items.get_or_load(1, load)
+        await items.invalidate(1)
+        third = await items.get_or_load(1, load)
+        return first, second, third
+
+    first, second, third = asyncio.run(scenario())
+    assert first == second == Item(id=1, name="load 1")
+    assert third == Item(id=1, name="load 2")
+    assert items.cache.stats()["hits"] == 1
+    assert items.cache.stats()["loads"] == 2
+
+
+def test_entries_expire_and_follow_versions(make_backend):
+    items = Cache(make_backend(), ttl=0.05).namespace("item", Item)
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return Item(id=1, name="item")
+
+    async def scenario():
+        await items.get_or_load(1, load, version="v1")
+        await items.get_or_load(1, load, version="v1")
+        await items.get_or_load(1, load, version="v2")
+        await asyncio.sleep(0.1)
+        await items.get_or_load(1, load, version="v2")
+
+    asyncio.run(scenario())
+    assert len(loads) == 3
+
+
+def test_concurrent_misses_load_once(make_backend):
+    items = Cache(make_backend()).namespace("item", Item)
+    loads = []
+
+    async def load():
+        loads.append(1)
+        await asyncio.sleep(0.05)
+        return Item(id=1, name="slow")
+
+    async def scenario():
+        return await asyncio.gather(*(items.get_or_load(1, load) for _ in range(20)))
+
+    results = asyncio.run(scenario())
+    assert len(loads) == 1
+    assert all(result.name == "slow" for result in results)
+
+
+def test_workers_sharing_redis_load_once():
+    server = fakeredis.FakeServer()
+    workers = [
+        Cache(RedisBackend(fakeredis.FakeAsyncRedis(server=server))).namespace("item", Item)
+        for _ in range(3)
+    ]
+    loads = []
+
+    async def load():
+        loads.append(1)
+        await asyncio.sleep(0.05)
+        return Item(id=1, name="shared")
+
+    async def scenario():
+        return await asyncio.gather(*(worker.get_or_load(1, load) for worker in workers))
+
+    results = asyncio.run(scenario())
+    assert len(loads) == 1
+    assert all(result.name == "shared" for result in results)
+    assert sum(worker.cache.stats()["lock_waits"] for worker in workers) == 2
+
+
+def test_new_generation_outdates_a_load_in_flight(make_backend):
+    items = Cache(make_backend()).namespace("item", Item)
+    loading, release = asyncio.Event(), asyncio.Event()
+    loads = []
+
+    async def load():
+        loads.append(1)
+        item = Item(id=1, name=f"load {len(loads)}")
+        if len(loads) == 1:
+            loading.set()
+            await release.wait()
+        return item
+
+    async def get():
+        return await items.get_or_load(1, load, version=await items.generation("group"))
+
+    async def scenario():
+        stale = asyncio.create_task(get())
+        await loading.wait()
+        # A write commits and invalidates while the first load still runs.
+        await items.new_generation("group")
+        await items.invalidate(1)
+        fresh = asyncio.create_task(get())
+        await asyncio.sleep(0)
+        release.set()
+        return await stale, await fresh, await get()
+
+    stale, fresh, later = asyncio.run(scenario())
+    assert stale == Item(id=1, name="load 1")
+    assert fresh == Item(id=1, name="load 2")
+    # The first load may still overwrite the key, but under the old generation.
+    assert later != stale
+
+
+def test_failed_loads_are_not_cached(make_backend):
+    items = Cache(make_backend()).namespace("item", Item)
+
+    async def load():
+        raise ValueError("not found")
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                await items.get_or_load(1, load)
+
+    asyncio.run(scenario())
+    assert items.cache.stats()["loads"] == 0
+
+
+def test_backend_errors_fall_back_to_loading():
+    items = Cache(FailingBackend()).namespace("item", Item)
+
+    async def load():
+        return Item(id=1, name="fresh")
+
+    assert asyncio.run(items.get_or_load(1, load)).name == "fresh"
+    assert items.cache.stats()["errors"] == 2
+
+
+def test_get_time_slot_is_cached_until_updated(client, mock_authenticated_user, db, query_counter):
+    token, auth_user = mock_authenticated_user(role="doctor")
+    time_slot = AvailableTimeSlotFactory().create(db=db, doctor_id=auth_user.id)
+    client.headers.update({"Authorization": f"Bearer {token}"})
+
+    first = client.get(f"/appointments/get-time-slot/{time_slot.id}")
+    query_counter.clear()
+    second = client.get(f"/appointments/get-time-slot/{time_slot.id}")
+    assert second.json() == first.json()
+    # Only the version lookup behind the ETag reaches the database.
+    assert len(query_counter) == 1
+
+    payload = AvailableTimeSlotFactory().build_data()
+    client.put(
+        f"/appointments/update-time-slot/{time_slot.id}",
+        json={"start_time": payload["start_time"], "end_time": payload["end_time"]},
+    )
+    third = client.get(f"/appointments/get-time-slot/{time_slot.id}")
+    assert third.json()["start_time"] == payload["start_time"]
+
+
+@pytest.mark.parametrize(
+    "role, expected_status",
+    [
+        ("admin", 200),
+        ("doctor", 403),
+        ("patient", 403),
+    ],
+)
+def test_cache_status(client, mock_authenticated_user, role, expected_status):
+    token, _ = mock_authenticated_user(role=role)
+    client.headers.update({"Authorization": f"Bearer {token}"})
+
+    response = client.get("/monitoring/cache")
+    assert response.status_code == expected_status
+    if expected_status == 200:
+        assert response.json()["backend"] == "memory"
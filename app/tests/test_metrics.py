@@ -0,0 +1,98 @@
+import os
+import subprocess
+import sys
+
+from prometheus_client import REGISTRY
+from prometheus_client.parser import text_string_to_metric_families
+
+from app.tests.factories import UserFactory
+
+
+def request_count(method, route, status):
+    return REGISTRY.get_sample_value(
+        "http_request_duration_seconds_count",
+        {"method": method, "route": route, "status": status},
+    ) or 0
+
+
+def test_requests_are_labelled_by_route_template(client, mock_authenticated_user, db):
+    token, _ = mock_authenticated_user(role="admin")
+    user = UserFactory().create(db, email="metrics@example.com")
+    client.headers.update({"Authorization": f"Bearer {token}"})
+    before = request_count("GET", "/users/{user_id}", "200")
+    missing_before = request_count("GET", "/users/{user_id}", "404")
+
+    assert client.get(f"/users/{user.id}").status_code == 200
+    assert client.get("/users/999999").status_code == 404
+
+    assert request_count("GET", "/users/{user_id}", "200") == before + 1
+    assert request_count("GET", "/users/{user_id}", "404") == missing_before + 1
+    assert REGISTRY.get_sample_value(
+        "http_requests_in_progress", {"method": "GET"}
+    ) == 0
+
+
+def test_unmatched_paths_share_one_label(client):
+    before = request_count("GET", "unmatched", "404")
+
+    client.get("/no-such-page/1")
+    client.get("/no-such-page/2")
+
+    assert request_count("GET", "unmatched", "404") == before + 2
+
+
+def test_metrics_endpoint_exposes_prometheus_text(client):
+    client.get("/")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    families = {family.name: family for family in text_string_to_metric_families(response.text)}
+    assert {"http_request_duration_seconds", "http_response_size_bytes"} <= families.keys()
+    sizes = [
+        sample
+        for sample in families["http_response_size_bytes"].samples
+        if sample.name.endswith("_sum") and sample.labels["route"] == "/"
+    ]
+    assert sizes and sizes[0].value > 0
+
+
+WORKER = """
+import asyncio
+from app.core.metrics import MetricsMiddleware
+
+async def endpoint(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+async def main():
+    app = MetricsMiddleware(endpoint)
+    for _ in range(3):
+        await app({"type": "http", "method": "GET"}, None, lambda message: asyncio.sleep(0))
+
+asyncio.run(main())
+"""
+
+SCRAPE = """
+from app.core.metrics import render_metrics
+print(render_metrics()[0].decode())
+"""
+
+
+def test_metrics_are_merged_across_worker_processes(tmp_path):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", WORKER], env=env, check=True)
+    output = subprocess.run(
+        [sys.executable, "-c", SCRAPE], env=env, check=True, capture_output=True, text=True
+    ).stdout
+
+    samples = {
+        (sample.name, sample.labels.get("route")): sample.value
+        for family in text_string_to_metric_families(output)
+        for sample in family.samples
+    }
+    assert samples[("http_request_duration_seconds_count", "unmatched")] == 6
+    assert samples[("http_response_size_bytes_sum", "unmatched")] == 12
@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy import create_engine
+
+from app.core.pool import PoolStats, engine_options, instrument_engine
+
+
+@pytest.mark.parametrize(
+    "role, expected_status",
+    [
+        ("admin", 200),
+        ("doctor", 403),
+        ("patient", 403),
+    ],
+)
+def test_db_pool_status(client, mock_authenticated_user, role, expected_status):
+    token, _ = mock_authenticated_user(role=role)
+    client.headers.update({"Authorization": f"Bearer {token}"})
+
+    response = client.get("/monitoring/db-pool")
+    assert response.status_code == expected_status
+    if expected_status == 200:
+        assert set(response.json()) == {"async_engine", "sync_engine"}
+        assert response.json()["async_engine"]["mode"] == "queue"
+
+
+def test_password_hashing_status_counts_logins(client, mock_authenticated_user):
+    token, auth_user = mock_authenticated_user(role="admin")
+    client.headers.update({"Authorization": f"Bearer {token}"})
+    completed = client.get("/monitoring/password-hashing").json()["completed"]
+
+    response = client.post(
+        "/users/login", json={"email": auth_user.email, "password": "string123"}
+    )
+    assert response.status_code == 200
+
+    response = client.get("/monitoring/password-hashing")
+    assert response.status_code == 200
+    assert response.json()["completed"] == completed + 1
+
+
+def test_pool_stats_track_checkouts(db):
+    stats = PoolStats()
+    engine = create_engine(db.get_bind().url, **engine_options(False, stats))
+    instrument_engine(engine, stats)
+
+    with engine.connect():
+        assert stats.snapshot(engine.pool)["checked_out"] == 1
+
+    snapshot = stats.snapshot(engine.pool)
+    engine.dispose()
+
+    assert snapshot["checkouts"] == 1
+    assert snapshot["connects"] == 1
+    assert snapshot["checked_out"] == 0
+    assert snapshot["idle"] == 1
+    assert snapshot["wait_seconds_max"] >= 0
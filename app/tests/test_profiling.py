@@ -0,0 +1,105 @@
+import os
+import pstats
+
+import pytest
+
+from app.utils import profiling
+from app.utils.profiling import PROFILE_ARTIFACT_HEADER
+from app.tests.factories import DEFAULT_PASSWORD, UserFactory
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def login(client, db, **kwargs):
+    user = UserFactory().create(db, email="profiled@example.com")
+    return client.post(
+        "/users/login", json={"email": user.email, "password": DEFAULT_PASSWORD}, **kwargs
+    )
+
+
+def test_admins_get_a_pstats_profile(client, mock_authenticated_user, db, profile_dir):
+    token, _ = mock_authenticated_user(role="admin")
+    client.headers.update({"Authorization": f"Bearer {token}"})
+
+    response = login(client, db, params={"profile": "pstats"})
+
+    assert response.status_code == 200
+    name = response.headers[PROFILE_ARTIFACT_HEADER]
+    assert name.endswith(".pstats")
+    download = client.get(f"/monitoring/profiles/{name}")
+    assert download.status_code == 200
+    stats = pstats.Stats(str(profile_dir / name))
+    # bcrypt runs on the password hashing threads and is sampled there.
+    assert any("passlib" in filename for filename, _, _ in stats.stats)
+
+
+def test_flamegraph_profile_has_collapsed_stacks(client, mock_authenticated_user, db, profile_dir):
+    token, _ = mock_authenticated_user(role="admin")
+    client.headers.update({"Authorization": f"Bearer {token}"})
+
+    response = login(client, db, headers={"X-Profile": "flamegraph"})
+
+    name = response.headers[PROFILE_ARTIFACT_HEADER]
+    lines = (profile_dir / name).read_text().splitlines()
+    assert any(line.startswith("password-hash") for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+@pytest.mark.parametrize("role", ["doctor", "patient"])
+def test_only_admins_can_profile(client, mock_authenticated_user, profile_dir, role):
+    token, _ = mock_authenticated_user(role=role)
+    client.headers.update({"Authorization": f"Bearer {token}"})
+
+    response = client.get("/users/doctor-directory", headers={"X-Profile": "1"})
+
+    assert response.status_code == 403
+    assert PROFILE_ARTIFACT_HEADER not in response.headers
+    assert list(profile_dir.iterdir()) == []
+
+
+def test_preflights_and_refusals_get_cors_headers(client, mock_authenticated_user, profile_dir):
+    origin = {"Origin": "http://frontend.example.com"}
+
+    preflight = client.options(
+        "/users/",
+        params={"profile": "pstats"},
+        headers={**origin, "Access-Control-Request-Method": "GET"},
+    )
+    assert preflight.status_code == 200
+    assert "access-control-allow-origin" in preflight.headers
+
+    token, _ = mock_authenticated_user(role="patient")
+    client.headers.update({"Authorization": f"Bearer {token}"})
+    refused = client.get("/users/doctor-directory", params={"profile": "1"}, headers=origin)
+    assert refused.status_code == 403
+    assert "access-control-allow-origin" in refused.headers
+    assert list(profile_dir.iterdir()) == []
+
+
+def test_requests_without_the_flag_are_not_profiled(client, mock_authenticated_user, profile_dir):
+    token, _ = mock_authenticated_user(role="admin")
+    client.headers.update({"Authorization": f"Bearer {token}"})
+
+    response = client.get("/users/doctor-directory")
+
+    assert response.status_code == 200
+    assert PROFILE_ARTIFACT_HEADER not in response.headers
+    assert client.get("/monitoring/profiles/..%2Fpasswd").status_code == 404
+
+
+def test_only_the_newest_artifacts_are_kept(client, mock_authenticated_user, db, profile_dir, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_MAX_ARTIFACTS", 2)
+    for age, name in enumerate(["newer.collapsed", "older.collapsed"], start=1):
+        (profile_dir / name).write_text("")
+        os.utime(profile_dir / name, (1000 - age, 1000 - age))
+    token, _ = mock_authenticated_user(role="admin")
+    client.headers.update({"Authorization": f"Bearer {token}"})
+
+    response = client.get("/users/doctor-directory", params={"profile": "1"})
+
+    name = response.headers[PROFILE_ARTIFACT_HEADER]
+    assert sorted(path.name for path in profile_dir.iterdir()) == sorted([name, "newer.collapsed"])
@@ -0,0 +1,399 @@
+"""Query plan regression tests for the service hot paths.
+
+Every statement a service method sends is captured and run through
+EXPLAIN against a seeded database, and the test fails when any of them
+reads one of the app's tables with a sequential scan. The planner is left
+to its own cost estimates (no enable_seqscan = off), so a missing or
+unusable index shows up the same way it would in production.
+"""
+import asyncio
+import hashlib
+import json
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, text
+
+from app.core.cache import cache
+from app.core.database import Base
+from app.schemas.appointment import (
+    AvailableTimeSlotCreate,
+    BulkBookAppointments,
+    BulkCancelAppointments,
+    BulkReassignAppointments,
+    CreateAppointment,
+    RecurringTimeSlotCreate,
+)
+from app.schemas.user import LoginUser, UpdateDoctorProfile
+from app.services.appointments import AppointmentService
+from app.services.users import UserService
+from app.utils.auth import get_password_hash
+from app.utils.pagination import encode_cursor
+from conftest import TestingAsyncSessionLocal, async_engine, engine
+
+DOCTORS = 5000
+PATIENTS = 50000
+SLOTS_PER_DOCTOR = 20
+PASSWORD = "string123"
+SLOT_SPACING = timedelta(days=2)
+# Every doctor's slots run from 20 days ago to 20 days ahead, so lookups
+# around "now" hit a small slice of the table, as they do in production.
+NOW_SLOT = SLOTS_PER_DOCTOR // 2
+FIRST_SLOT = (
+    datetime.utcnow().replace(minute=0, second=0, microsecond=0) - NOW_SLOT * SLOT_SPACING
+)
+
+SPECIALIZATIONS = [
+    "Cardiology",
+    "Dermatology",
+    "Endocrinology",
+    "Gastroenterology",
+    "General Practice",
+    "Neurology",
+    "Oncology",
+    "Pediatrics",
+    "Psychiatry",
+    "Radiology",
+]
+
+# Names and emails are random strings, so their trigrams are about as
+# selective as those of real ones. Triggers are switched off while seeding
+# (session_replication_role) and the daily stats are filled in one go at the
+# end, which is much faster than maintaining them row by row.
+SEED_SQL = """
+SET LOCAL session_replication_role = replica;
+
+INSERT INTO users (email, full_name, hashed_password, role)
+SELECT
+    left(md5(n::text), 8) || '.' || left(md5((-n)::text), 10) || '@example.com',
+    left(md5(n::text), 8) || ' ' || left(md5((-n)::text), 10),
+    :hashed_password,
+    CASE WHEN n <= :doctors THEN 'doctor' ELSE 'patient' END
+FROM generate_series(1, :doctors + :patients) AS n;
+
+INSERT INTO doctor_profiles (user_id, specialization, experience_years, academic_history, bio)
+SELECT
+    n,
+    (:specializations)[1 + n % cardinality(:specializations)],
+    n % 40,
+    jsonb_build_object(
+        'degree', CASE WHEN n % 3 = 0 THEN 'PhD' ELSE 'MBBS' END, 'graduated', 1980 + n % 40
+    ),
+    'Doctor ' || n
+FROM generate_series(1, :doctors) AS n;
+
+-- Doctors' slots start at different hours of the two days between them, so
+-- an hour's window holds a 48th of the slots rather than all of them.
+INSERT INTO available_time_slots (doctor_id, start_time, end_time)
+SELECT
+    doctor_id,
+    :first_slot + slot * :slot_spacing + doctor_id % 48 * interval '1 hour',
+    :first_slot + slot * :slot_spacing + doctor_id % 48 * interval '1 hour' + interval '30 minutes'
+FROM generate_series(1, :doctors) AS doctor_id, generate_series(0, :slots_per_doctor - 1) AS slot
+ORDER BY doctor_id, slot;
+
+-- Two of three slots are booked: the older ones completed or canceled, the
+-- rest scheduled, and a cancellation leaves the slot to a later booking.
+INSERT INTO appointments (patient_id, doctor_id, available_time_slot_id, status, created_at)
+SELECT
+    :doctors + 1 + id % :patients,
+    doctor_id,
+    id,
+    CASE
+        WHEN id % 7 = 0 THEN 'canceled'
+        WHEN start_time < now() at time zone 'utc' THEN 'completed'
+        ELSE 'scheduled'
+    END::appointment_status,
+    now() - (id % 1000) * interval '1 hour'
+FROM available_time_slots
+WHERE id % 3 <> 0;
+
+INSERT INTO appointments (patient_id, doctor_id, available_time_slot_id, status, created_at)
+SELECT :doctors + 1 + (id * 7) % :patients, doctor_id, id, 'scheduled', now()
+FROM available_time_slots
+WHERE id % 7 = 0 AND id % 3 <> 0 AND start_time > now() at time zone 'utc';
+
+INSERT INTO appointment_daily_stats (doctor_id, day, status, count)
+SELECT appointments.doctor_id, available_time_slots.start_time::date, appointments.status, count(*)
+FROM appointments
+JOIN available_time_slots ON available_time_slots.id = appointments.available_time_slot_id
+GROUP BY 1, 2, 3;
+"""
+
+
+def last_name(user_id: int) -> str:
+    return hashlib.md5(str(-user_id).encode()).hexdigest()[:10]
+
+
+def email(user_id: int) -> str:
+    return f"{hashlib.md5(str(user_id).encode()).hexdigest()[:8]}.{last_name(user_id)}@example.com"
+
+
+def slot_id(doctor_id: int, slot: int) -> int:
+    return (doctor_id - 1) * SLOTS_PER_DOCTOR + slot + 1
+
+
+def slot_start(slot: int) -> datetime:
+    return FIRST_SLOT + slot * SLOT_SPACING
+
+
+@pytest.fixture(scope="module")
+def seeded_database():
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        for statement in SEED_SQL.split(";\n"):
+            if statement.strip():
+                connection.execute(
+                    text(statement),
+                    {
+                        "doctors": DOCTORS,
+                        "patients": PATIENTS,
+                        "slots_per_doctor": SLOTS_PER_DOCTOR,
+                        "specializations": SPECIALIZATIONS,
+                        "first_slot": FIRST_SLOT,
+                        "slot_spacing": SLOT_SPACING,
+                        "hashed_password": get_password_hash(PASSWORD),
+                    },
+                )
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("VACUUM ANALYZE"))
+        seed = connection.execute(
+            text(
+                """
+                SELECT
+                    completed.id AS complete_appointment_id,
+                    canceled.id AS cancel_appointment_id,
+                    canceled.patient_id
+                FROM
+                    (SELECT min(id) AS id FROM appointments
+                     WHERE doctor_id = 26 AND status = 'scheduled') AS completed,
+                    (SELECT id, patient_id FROM appointments
+                     WHERE doctor_id = 27 AND status = 'scheduled' ORDER BY id LIMIT 1) AS canceled
+                """
+            )
+        ).mappings().one()
+
+    yield seed
+
+    Base.metadata.drop_all(bind=engine)
+
+
+@contextmanager
+def captured_statements():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+def plan_nodes(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+
+async def sequential_scans(statements) -> list[tuple[str, str]]:
+    """(table, statement) for every app table a statement's plan seq scans."""
+    tables = set(Base.metadata.tables)
+    scans = []
+    async with async_engine.connect() as connection:
+        for statement, parameters in statements:
+            if not statement.lstrip().upper().startswith(EXPLAINABLE):
+                continue
+            result = await connection.exec_driver_sql(
+                f"EXPLAIN (FORMAT JSON) {statement}", parameters
+            )
+            plan = result.scalar()
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            for node in plan_nodes(plan[0]["Plan"]):
+                if node["Node Type"] == "Seq Scan" and node["Relation Name"] in tables:
+                    scans.append((node["Relation Name"], statement))
+        await connection.rollback()
+    return scans
+
+
+HOT_PATHS = {
+    "get_time_slot": lambda db, seed: AppointmentService.get_time_slot(db, slot_id(7, 3)),
+    "get_time_slot_version": lambda db, seed: AppointmentService.get_time_slot_version(
+        db, slot_id(7, 3)
+    ),
+    "get_all_time_slots": lambda db, seed: AppointmentService.get_all_time_slots(db, skip=200),
+    "get_all_time_slots_cursor": lambda db, seed: AppointmentService.get_all_time_slots(
+        db, sort_order="desc", cursor=encode_cursor(datetime.now(timezone.utc), 20000)
+    ),
+    "search_available_time_slots": lambda db, seed: (
+        AppointmentService.search_available_time_slots(
+            db, slot_start(NOW_SLOT + 2), slot_start(NOW_SLOT + 4)
+        )
+    ),
+    "search_available_time_slots_by_doctor": lambda db, seed: (
+        AppointmentService.search_available_time_slots(
+            db, slot_start(NOW_SLOT), slot_start(NOW_SLOT + 9), doctor_id=9
+        )
+    ),
+    "search_available_time_slots_by_specialization": lambda db, seed: (
+        AppointmentService.search_available_time_slots(
+            db, slot_start(NOW_SLOT + 2), slot_start(NOW_SLOT + 4), specialization="neurology"
+        )
+    ),
+    "create_time_slot": lambda db, seed: AppointmentService.create_time_slot(
+        db,
+        11,
+        AvailableTimeSlotCreate(
+            start_time=slot_start(NOW_SLOT + 1) + timedelta(hours=2),
+            end_time=slot_start(NOW_SLOT + 1) + timedelta(hours=3),
+        ),
+    ),
+    "create_recurring_time_slots": lambda db, seed: (
+        AppointmentService.create_recurring_time_slots(
+            db,
+            12,
+            RecurringTimeSlotCreate(
+                start_date=slot_start(SLOTS_PER_DOCTOR).date() + timedelta(days=1),
+                weeks=1,
+                weekdays=[0, 2, 4],
+                day_start="09:00",
+                day_end="12:00",
+                slot_minutes=30,
+            ),
+        )
+    ),
+    "update_time_slot": lambda db, seed: AppointmentService.update_time_slot(
+        db,
+        slot_id(13, NOW_SLOT + 8),
+        13,
+        AvailableTimeSlotCreate(
+            start_time=slot_start(NOW_SLOT + 8) + timedelta(hours=1),
+            end_time=slot_start(NOW_SLOT + 8) + timedelta(hours=2),
+        ),
+    ),
+    "delete_time_slot": lambda db, seed: AppointmentService.delete_time_slot(
+        db, slot_id(14, NOW_SLOT + 9), 14
+    ),
+    "create_appointment": lambda db, seed: AppointmentService.create_appointment(
+        db,
+        DOCTORS + 15,
+        CreateAppointment(doctor_id=15, available_time_slot_id=slot_id(15, NOW_SLOT + 6)),
+    ),
+    "get_appointment_version": lambda db, seed: AppointmentService.get_appointment_version(db, 100),
+    "get_appointment": lambda db, seed: AppointmentService.get_appointment(db, 100),
+    "complete_appointment": lambda db, seed: AppointmentService.complete_appointment(
+        db, seed["complete_appointment_id"], 26
+    ),
+    "cancel_appointment": lambda db, seed: AppointmentService.cancel_appointment(
+        db, seed["cancel_appointment_id"], seed["patient_id"], "patient"
+    ),
+    "get_all_appointments_admin": lambda db, seed: AppointmentService.get_all_appointments(
+        db, 1, "admin", skip=500
+    ),
+    "get_all_appointments_doctor": lambda db, seed: AppointmentService.get_all_appointments(
+        db, 16, "doctor", sort_order="desc"
+    ),
+    "get_all_appointments_patient": lambda db, seed: AppointmentService.get_all_appointments(
+        db, DOCTORS + 17, "patient"
+    ),
+    "bulk_cancel_appointments": lambda db, seed: AppointmentService.bulk_cancel_appointments(
+        db,
+        BulkCancelAppointments(
+            doctor_id=18, start=slot_start(NOW_SLOT + 3), end=slot_start(NOW_SLOT + 7)
+        ),
+    ),
+    "bulk_cancel_appointments_by_window": lambda db, seed: (
+        AppointmentService.bulk_cancel_appointments(
+            db,
+            BulkCancelAppointments(
+                start=slot_start(NOW_SLOT + 9),
+                end=slot_start(NOW_SLOT + 9) + timedelta(hours=1),
+            ),
+        )
+    ),
+    "bulk_reassign_appointments": lambda db, seed: AppointmentService.bulk_reassign_appointments(
+        db,
+        BulkReassignAppointments(
+            doctor_id=19,
+            start=slot_start(NOW_SLOT + 3),
+            end=slot_start(NOW_SLOT + 6),
+            new_doctor_id=20,
+        ),
+    ),
+    "bulk_book_appointments": lambda db, seed: AppointmentService.bulk_book_appointments(
+        db,
+        BulkBookAppointments(
+            appointments=[
+                {
+                    "patient_id": DOCTORS + 1 + slot,
+                    "doctor_id": 21,
+                    "available_time_slot_id": slot_id(21, slot),
+                }
+                for slot in range(NOW_SLOT, SLOTS_PER_DOCTOR)
+            ]
+        ),
+    ),
+    "get_doctor_calendar": lambda db, seed: AppointmentService.get_doctor_calendar(
+        db, 22, slot_start(NOW_SLOT + 2).date()
+    ),
+    "get_appointment_stats": lambda db, seed: AppointmentService.get_appointment_stats(
+        db, date.today(), date.today() + timedelta(days=6)
+    ),
+    "get_appointment_stats_by_doctor": lambda db, seed: AppointmentService.get_appointment_stats(
+        db, date.today() - timedelta(days=30), date.today() + timedelta(days=30), doctor_id=23
+    ),
+    "login": lambda db, seed: UserService.login(
+        db, LoginUser(email=email(DOCTORS + 1), password=PASSWORD)
+    ),
+    "get_user": lambda db, seed: UserService.get_user(db, 24),
+    "get_user_version": lambda db, seed: UserService.get_user_version(db, 24),
+    "get_all_users": lambda db, seed: UserService.get_all_users(db, skip=100),
+    "get_all_users_by_role": lambda db, seed: UserService.get_all_users(
+        db, role="doctor", sort_order="desc"
+    ),
+    "get_all_users_search": lambda db, seed: UserService.get_all_users(
+        db, search=last_name(DOCTORS + 123)
+    ),
+    "get_all_users_fuzzy_search": lambda db, seed: UserService.get_all_users(
+        db, search=last_name(25)[:-1], search_mode="fuzzy"
+    ),
+    "get_all_users_prefix_search": lambda db, seed: UserService.get_all_users(
+        db, search=email(1234)[:5], search_mode="prefix"
+    ),
+    "get_doctor_directory": lambda db, seed: UserService.get_doctor_directory(db, skip=20),
+    "get_doctor_directory_filtered": lambda db, seed: UserService.get_doctor_directory(
+        db, specialization="cardiology", min_experience_years=20
+    ),
+    "get_doctor_directory_academic_history": lambda db, seed: UserService.get_doctor_directory(
+        db, academic_history=["degree:PhD"]
+    ),
+    "update_doctor_profile": lambda db, seed: UserService.update_doctor_profile(
+        db, 25, UpdateDoctorProfile(experience_years=12)
+    ),
+}
+
+
+@pytest.mark.parametrize("hot_path", HOT_PATHS)
+def test_hot_path_avoids_sequential_scans(seeded_database, hot_path):
+    async def scenario():
+        # Read-through caches would hide the queries behind a warm entry.
+        await cache.clear()
+        with captured_statements() as statements:
+            async with TestingAsyncSessionLocal() as db:
+                await HOT_PATHS[hot_path](db, seeded_database)
+        return await sequential_scans(statements)
+
+    try:
+        scans = asyncio.run(scenario())
+    except HTTPException as e:
+        pytest.fail(f"{hot_path} failed on the seeded data: {e.detail}")
+    assert scans == [], "\n\n".join(
+        f"Seq Scan on {table}:\n{statement}" for table, statement in scans
+    )
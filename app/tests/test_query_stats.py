@@ -0,0 +1,61 @@
+import asyncio
+import logging
+
+import pytest
+from sqlalchemy import select
+
+from app.core import query_stats
+from app.core.query_stats import NPlusOneError, track_queries
+from app.models.users import User
+from app.tests.factories import UserFactory
+
+
+def test_debug_mode_reports_queries_as_headers(client, mock_authenticated_user, monkeypatch):
+    token, auth_user = mock_authenticated_user(role="admin")
+    client.headers.update({"Authorization": f"Bearer {token}"})
+
+    response = client.get(f"/users/{auth_user.id}")
+    assert query_stats.QUERY_COUNT_HEADER not in response.headers
+
+    monkeypatch.setattr(query_stats, "DEBUG", True)
+    response = client.get("/users/", params={"limit": 5})
+    assert response.status_code == 200
+    assert int(response.headers[query_stats.QUERY_COUNT_HEADER]) >= 1
+    assert float(response.headers[query_stats.QUERY_TIME_HEADER]) > 0
+
+
+def load_users_one_by_one(sessions, user_ids, **options):
+    async def scenario():
+        with track_queries(**options) as stats:
+            async with sessions() as db:
+                for user_id in user_ids:
+                    await db.scalar(select(User).filter_by(id=user_id))
+        return stats
+
+    return asyncio.run(scenario())
+
+
+def test_repeated_statements_are_flagged_as_n_plus_one(async_session_factory, db, caplog):
+    ids = [UserFactory().create(db, email=f"user{i}@example.com").id for i in range(3)]
+
+    stats = load_users_one_by_one(async_session_factory, ids, threshold=3, raise_on_n_plus_one=False)
+
+    assert stats.count == 3
+    assert stats.seconds > 0
+    assert len(stats.n_plus_one) == 1
+    assert "N+1 query" in caplog.text
+
+    with pytest.raises(NPlusOneError):
+        load_users_one_by_one(async_session_factory, ids, threshold=3, raise_on_n_plus_one=True)
+
+
+def test_same_parameters_are_not_n_plus_one(async_session_factory, db, caplog):
+    user = UserFactory().create(db)
+
+    with caplog.at_level(logging.WARNING):
+        stats = load_users_one_by_one(
+            async_session_factory, [user.id] * 5, threshold=3, raise_on_n_plus_one=True
+        )
+
+    assert stats.count == 5
+    assert stats.n_plus_one == []
@@ -1,6 +1,9 @@
 import pytest
+from sqlalchemy import select, text
 
-from app.tests.factories import UserFactory
+from app.models.users import User
+from app.services.users import _search_filter
+from app.tests.factories import DoctorProfileFactory, UserFactory
 
 
 @pytest.mark.parametrize(
@@ -44,3 +47,165 @@ def test_login_user(client, user_data, db, expected_status, expected_token):
         assert "access_token" in response.json()
     else:
         assert "access_token" not in response.json()
+
+
+def test_get_all_users_with_cursor(client, mock_authenticated_user, db):
+    token, auth_user = mock_authenticated_user(role="admin")
+
+    factory = UserFactory()
+    users = [factory.create(db=db, email=f"user{index}@example.com") for index in range(4)]
+
+    client.headers.update({"Authorization": f"Bearer {token}"})
+
+    first_page = client.get("/users/", params={"limit": 3})
+    assert first_page.status_code == 200
+    assert [user["id"] for user in first_page.json()] == [auth_user.id] + [user.id for user in users[:2]]
+
+    second_page = client.get(
+        "/users/", params={"limit": 3, "cursor": first_page.headers["X-Next-Cursor"]}
+    )
+    assert second_page.status_code == 200
+    assert [user["id"] for user in second_page.json()] == [user.id for user in users[2:]]
+    assert "X-Next-Cursor" not in second_page.headers
+
+
+def test_get_all_users_cursor_requires_created_at_sort(client, mock_authenticated_user):
+    token, _ = mock_authenticated_user(role="admin")
+    client.headers.update({"Authorization": f"Bearer {token}"})
+
+    response = client.get("/users/", params={"cursor": "abc", "sort_by": "email"})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "search, search_mode, expected_emails",
+    [
+        ("ohnson", "contains", ["alice.johnson@example.com"]),
+        ("100%", "contains", ["promo100%@example.com"]),
+        ("Alise Jonson", "fuzzy", ["alice.johnson@example.com", "alice.jones@example.com"]),
+        ("ALICE.JO", "prefix", ["alice.johnson@example.com", "alice.jones@example.com"]),
+        ("alice_", "prefix", []),
+    ],
+)
+def test_search_users(client, mock_authenticated_user, db, search, search_mode, expected_emails):
+    token, _ = mock_authenticated_user(role="admin")
+
+    factory = UserFactory()
+    factory.create(db=db, email="alice.johnson@example.com", full_name="Alice Johnson")
+    factory.create(db=db, email="alice.jones@example.com", full_name="Alice Jones")
+    factory.create(db=db, email="bob.smith@example.com", full_name="Bob Smith")
+    factory.create(db=db, email="promo100%@example.com", full_name="Promo Account")
+    factory.create(db=db, email="promo1000@example.com", full_name="Other Promo")
+
+    client.headers.update({"Authorization": f"Bearer {token}"})
+    response = client.get(
+        "/users/", params={"search": search, "search_mode": search_mode, "sort_by": "email"}
+    )
+    assert response.status_code == 200
+    assert [user["email"] for user in response.json()] == expected_emails
+
+
+def test_search_queries_use_the_search_indexes(db):
+    db.execute(text("SET enable_seqscan = off"))
+
+    for search_mode, index_name in [
+        ("contains", "ix_users_full_name_trgm"),
+        ("fuzzy", "ix_users_email_trgm"),
+        ("prefix", "ix_users_lower_email_pattern"),
+    ]:
+        query = select(User).where(_search_filter("alice", search_mode))
+        compiled = query.compile(dialect=db.get_bind().dialect)
+        plan = "\n".join(
+            db.connection().exec_driver_sql(f"EXPLAIN {compiled}", compiled.params).scalars()
+        )
+        assert index_name in plan, plan
+
+
+@pytest.mark.parametrize(
+    "params, expected_names",
+    [
+        ({}, ["Dr Grey", "Dr House", "Dr Who"]),
+        ({"specialization": "cardiology"}, ["Dr Grey", "Dr Who"]),
+        ({"specialization": "Cardiology", "min_experience_years": 10}, ["Dr Grey"]),
+        ({"academic_history": "fellowship"}, ["Dr Grey"]),
+        ({"academic_history": ["degree:MBBS", "graduated:2010"]}, ["Dr House"]),
+        ({"academic_history": "degree:PhD"}, []),
+    ],
+)
+def test_doctor_directory(client, mock_authenticated_user, db, params, expected_names):
+    token, _ = mock_authenticated_user(role="patient")
+
+    user_factory = UserFactory(role="doctor")
+    profile_factory = DoctorProfileFactory()
+    for index, (name, specialization, years, academic_history) in enumerate(
+        [
+            ("Dr Who", "Cardiology", 3, {"degree": "MD"}),
+            ("Dr House", "Diagnostics", 12, {"degree": "MBBS", "graduated": 2010}),
+            ("Dr Grey", "Cardiology", 15, {"degree": "MD", "fellowship": "Cardiac surgery"}),
+        ]
+    ):
+        doctor = user_factory.create(db=db, email=f"doctor{index}@example.com", full_name=name)
+        profile_factory.create(
+            db=db,
+            user_id=doctor.id,
+            specialization=specialization,
+            experience_years=years,
+            academic_history=academic_history,
+        )
+
+    client.headers.update({"Authorization": f"Bearer {token}"})
+    response = client.get("/users/doctor-directory", params=params)
+    assert response.status_code == 200
+    assert [doctor["full_name"] for doctor in response.json()] == expected_names
+    if expected_names:
+        assert set(response.json()[0]) == {
+            "user_id",
+            "full_name",
+            "specialization",
+            "experience_years",
+            "academic_history",
+        }
+
+
+def test_get_user_conditional(client, mock_authenticated_user):
+    token, doctor = mock_authenticated_user(role="doctor")
+    client.headers.update({"Authorization": f"Bearer {token}"})
+
+    response = client.get(f"/users/{doctor.id}")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    response = client.get(f"/users/{doctor.id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    # The nested doctor profile is part of the user's version.
+    profile = {"specialization": "Cardiology", "experience_years": 4, "academic_history": {}, "bio": "Hi"}
+    assert client.post("/users/doctor_profile", json=profile).status_code == 201
+
+    response = client.get(f"/users/{doctor.id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["doctor_profile"]["specialization"] == "Cardiology"
+    assert response.headers["ETag"] != etag
+
+
+def test_user_responses_keep_their_shape_and_documented_email(client, mock_authenticated_user, db):
+    token, _ = mock_authenticated_user(role="admin")
+    doctor = UserFactory(role="doctor").create(db=db, email="house@example.com", full_name="Dr House")
+    DoctorProfileFactory().create(db=db, user_id=doctor.id)
+
+    client.headers.update({"Authorization": f"Bearer {token}"})
+    response = client.get(f"/users/{doctor.id}")
+    assert response.status_code == 200
+    assert response.json()["email"] == "house@example.com"
+    assert response.json()["doctor_profile"]["user"] == {
+        "email": "house@example.com",
+        "full_name": "Dr House",
+        "role": "doctor",
+    }
+
+    # Responses skip revalidating stored emails, the schema still says what they are.
+    schemas = client.get("/api/v1/openapi.json").json()["components"]["schemas"]
+    for schema in ("UserResponse", "UserSummary"):
+        assert schemas[schema]["properties"]["email"]["type"] == "string"
+        assert schemas[schema]["properties"]["email"]["format"] == "email"
@@ -1,4 +1,8 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta,datetime
+import threading
+import time
 from typing import Optional
 from passlib.context import CryptContext
 from jose import JWTError, jwt
@@ -6,6 +10,7 @@ import os
 
 SECRET_KEY = os.environ.get("SECRET_KEY")
 ALGORITHM = os.environ.get("ALGORITHM")
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))
 
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -19,6 +24,77 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+class PasswordHasher:
+    """Runs bcrypt on a bounded thread pool instead of the event loop.
+
+    bcrypt releases the GIL, so at most ``max_workers`` hashes run in
+    parallel while other requests keep being served. Calls beyond that wait
+    in the executor queue, which ``stats()`` reports as ``queued``.
+    """
+
+    def __init__(self, max_workers: int = PASSWORD_HASH_WORKERS):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="password-hash"
+        )
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.run_seconds_total = 0.0
+        self.run_seconds_max = 0.0
+
+    async def _submit(self, func, *args):
+        submitted_at = time.perf_counter()
+        with self._lock:
+            self.queued += 1
+
+        def timed_call():
+            started_at = time.perf_counter()
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+                waited = started_at - submitted_at
+                self.wait_seconds_total += waited
+                self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            try:
+                return func(*args)
+            finally:
+                elapsed = time.perf_counter() - started_at
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+                    self.run_seconds_total += elapsed
+                    self.run_seconds_max = max(self.run_seconds_max, elapsed)
+
+        return await asyncio.get_running_loop().run_in_executor(self._executor, timed_call)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit(verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(get_password_hash, password)
+
+    def stats(self) -> dict:
+        with self._lock:
+            completed = self.completed
+            return {
+                "max_workers": self.max_workers,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": completed,
+                "wait_seconds_avg": self.wait_seconds_total / completed if completed else 0.0,
+                "wait_seconds_max": self.wait_seconds_max,
+                "run_seconds_avg": self.run_seconds_total / completed if completed else 0.0,
+                "run_seconds_max": self.run_seconds_max,
+            }
+
+
+password_hasher = PasswordHasher()
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -0,0 +1,50 @@
+import csv
+import io
+from datetime import datetime
+from typing import AsyncIterator, Mapping, Sequence
+
+import orjson
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Rows are encoded in chunks so each write to the socket carries many rows
+# without ever holding more than one chunk in memory.
+EXPORT_CHUNK_ROWS = 500
+
+
+async def ndjson_lines(rows: AsyncIterator[Mapping]) -> AsyncIterator[bytes]:
+    """Encode ``rows`` as newline-delimited JSON, one object per line.
+
+    orjson encodes datetimes and enums itself and returns bytes, so rows go
+    to the socket without a Python ``default`` hook or a str round trip.
+    """
+    chunk = []
+    async for row in rows:
+        chunk.append(orjson.dumps(dict(row)))
+        if len(chunk) >= EXPORT_CHUNK_ROWS:
+            yield b"\n".join(chunk) + b"\n"
+            chunk = []
+    if chunk:
+        yield b"\n".join(chunk) + b"\n"
+
+
+async def csv_lines(rows: AsyncIterator[Mapping], fields: Sequence[str]) -> AsyncIterator[str]:
+    """Encode ``rows`` as CSV with a header line of ``fields``."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    count = 0
+    async for row in rows:
+        writer.writerow(
+            {key: value.isoformat() if isinstance(value, datetime) else value for key, value in row.items()}
+        )
+        count += 1
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
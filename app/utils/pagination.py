@@ -0,0 +1,67 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Optional, Sequence
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    """Encode the (created_at, id) position of a row as an opaque cursor."""
+    payload = json.dumps({"created_at": created_at.isoformat(), "id": id})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["created_at"]), int(payload["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor",
+        )
+
+
+def paginate(
+    query: Select,
+    created_at_column,
+    id_column,
+    skip: int,
+    limit: int,
+    sort_order: str,
+    cursor: Optional[str] = None,
+) -> Select:
+    """Order ``query`` by (created_at, id) and apply offset or keyset paging.
+
+    With a cursor the page starts right after the row it points at, so the
+    cost does not depend on how deep the page is and concurrent inserts do
+    not shift rows between pages.
+    """
+    if sort_order == "asc":
+        query = query.order_by(created_at_column.asc(), id_column.asc())
+    else:
+        query = query.order_by(created_at_column.desc(), id_column.desc())
+
+    if cursor is None:
+        return query.offset(skip).limit(limit)
+
+    position = tuple_(created_at_column, id_column)
+    last_seen = tuple_(*decode_cursor(cursor))
+    if sort_order == "asc":
+        query = query.where(position > last_seen)
+    else:
+        query = query.where(position < last_seen)
+    return query.limit(limit)
+
+
+def next_cursor(items: Sequence, limit: int) -> Optional[str]:
+    """Cursor for the page after ``items``, or None when it was the last one."""
+    if len(items) < limit:
+        return None
+    return encode_cursor(items[-1].created_at, items[-1].id)
@@ -0,0 +1,247 @@
+import marshal
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Optional
+from urllib.parse import parse_qs
+
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+from app.core.database import get_async_db
+from app.dependencies.auth import get_auth_user, get_token, security
+from app.dependencies.permissions import is_admin
+
+PROFILE_DIR = os.environ.get(
+    "PROFILE_DIR", os.path.join(tempfile.gettempdir(), "la-hospital-profiles")
+)
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL", 0.001))
+# Only the newest artifacts are kept, older ones are deleted as new ones are
+# stored.
+PROFILE_MAX_ARTIFACTS = int(os.environ.get("PROFILE_MAX_ARTIFACTS", 100))
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_QUERY_PARAM = "profile"
+PROFILE_ARTIFACT_HEADER = "X-Profile-Artifact"
+_PROFILE_HEADER_KEY = PROFILE_HEADER.lower().encode()
+# "flamegraph" writes collapsed stacks (flamegraph.pl, speedscope), "pstats"
+# a file for pstats.Stats or snakeviz.
+PROFILE_FORMATS = {"flamegraph": "collapsed", "pstats": "pstats", "1": "collapsed", "true": "collapsed"}
+
+# Leaf frames of a thread that is parked waiting for work.
+_IDLE_MODULES = (
+    "threading.py", "queue.py", "selectors.py", os.path.join("concurrent", "futures", "thread.py"),
+)
+
+Frame = tuple[str, int, str]
+
+
+class Sampler:
+    """Samples the stacks of the running threads every ``interval`` seconds.
+
+    ``thread_id`` (the event loop) is always sampled, every other thread
+    only while it is busy, so work handed to executors, such as bcrypt,
+    shows up too. Anything else the process runs meanwhile, like other
+    requests on the same loop, is sampled along with the request.
+    """
+
+    def __init__(self, thread_id: int, interval: Optional[float] = None):
+        self.thread_id = thread_id
+        self.interval = PROFILE_INTERVAL if interval is None else interval
+        self.samples: Counter[tuple[Frame, ...]] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if thread_id != self.thread_id and frame.f_code.co_filename.endswith(_IDLE_MODULES):
+                    continue
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                self.samples[self._stack(frame, names.get(thread_id, str(thread_id)))] += 1
+
+    @staticmethod
+    def _stack(frame, thread_name: str) -> tuple[Frame, ...]:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+        stack.append(("~", 0, thread_name))
+        return tuple(reversed(stack))
+
+    def collapsed(self) -> str:
+        """One ``root;...;leaf count`` line per distinct stack."""
+        lines = []
+        for stack, count in self.samples.most_common():
+            frames = ";".join(
+                name if filename == "~" else f"{name} ({os.path.basename(filename)}:{line})"
+                for filename, line, name in stack
+            )
+            lines.append(f"{frames} {count}")
+        return "\n".join(lines) + "\n"
+
+    def pstats(self) -> bytes:
+        """The samples as a marshalled ``pstats.Stats`` file.
+
+        A function's own time is the samples it was the leaf of, its
+        cumulative time the samples it appears in at all.
+        """
+        own, total, calls = Counter(), Counter(), {}
+        for stack, count in self.samples.items():
+            own[stack[-1]] += count
+            seen = set()
+            for caller, callee in zip((None,) + stack, stack):
+                if callee in seen:
+                    continue
+                seen.add(callee)
+                total[callee] += count
+                if caller is not None:
+                    callers = calls.setdefault(callee, Counter())
+                    callers[caller] += count
+
+        stats = {}
+        for function, count in total.items():
+            callers = {
+                caller: (n, n, 0.0, n * self.interval)
+                for caller, n in calls.get(function, {}).items()
+            }
+            stats[function] = (
+                count, count, own[function] * self.interval, count * self.interval, callers
+            )
+        return marshal.dumps(stats)
+
+
+def requested_profile(scope) -> Optional[str]:
+    """The artifact format a request asked for, if it asked to be profiled."""
+    for name, value in scope["headers"]:
+        if name == _PROFILE_HEADER_KEY:
+            return PROFILE_FORMATS.get(value.decode().lower())
+    if b"profile=" in scope["query_string"]:
+        values = parse_qs(scope["query_string"].decode()).get(PROFILE_QUERY_PARAM)
+        if values:
+            return PROFILE_FORMATS.get(values[0].lower())
+    return None
+
+
+def profile_path(name: str) -> Optional[str]:
+    """Path of a stored artifact, or None for names that are not one."""
+    if os.path.basename(name) != name:
+        return None
+    path = os.path.join(PROFILE_DIR, name)
+    return path if os.path.isfile(path) else None
+
+
+async def _ensure_admin(scope):
+    """Run the ``is_admin`` dependency chain by hand for the request."""
+    request = Request(scope)
+    get_db = scope["app"].dependency_overrides.get(get_async_db, get_async_db)
+    token = await get_token(await security(request))
+    sessions = get_db()
+    try:
+        user = await get_auth_user(token, await sessions.__anext__())
+    finally:
+        await sessions.aclose()
+    await is_admin(user)
+
+
+class ProfilingMiddleware:
+    """Profile single requests that admins flag with ``X-Profile`` or ``?profile=``.
+
+    The artifact is stored in PROFILE_DIR and its name returned in the
+    ``X-Profile-Artifact`` header, for GET /monitoring/profiles/{name}.
+    Only the newest PROFILE_MAX_ARTIFACTS are kept.
+    Requests without the flag only pay for looking for it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        # Preflights carry the query string but never credentials.
+        extension = (
+            requested_profile(scope)
+            if scope["type"] == "http" and scope["method"] != "OPTIONS"
+            else None
+        )
+        if extension is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await _ensure_admin(scope)
+        except HTTPException as error:
+            response = JSONResponse(
+                {"detail": error.detail}, status_code=error.status_code, headers=error.headers
+            )
+            await response(scope, receive, send)
+            return
+
+        name = f"{int(time.time())}-{scope['method'].lower()}-{uuid.uuid4().hex[:8]}.{extension}"
+        sampler = Sampler(threading.get_ident())
+
+        async def send_with_artifact(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (PROFILE_ARTIFACT_HEADER.lower().encode(), name.encode()),
+                ]
+            elif message["type"] == "http.response.body" and not message.get("more_body"):
+                # Stored before the response completes, so it can be fetched
+                # as soon as the client has it.
+                sampler.stop()
+                await run_in_threadpool(_store, name, sampler)
+            await send(message)
+
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_artifact)
+        finally:
+            sampler.stop()
+
+
+def _store(name: str, sampler: Sampler):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    if name.endswith(".pstats"):
+        with open(os.path.join(PROFILE_DIR, name), "wb") as artifact:
+            artifact.write(sampler.pstats())
+    else:
+        with open(os.path.join(PROFILE_DIR, name), "w") as artifact:
+            artifact.write(sampler.collapsed())
+    _prune()
+
+
+def _prune():
+    """Delete all but the newest PROFILE_MAX_ARTIFACTS artifacts."""
+    artifacts = []
+    for entry in os.scandir(PROFILE_DIR):
+        if entry.is_file():
+            try:
+                artifacts.append((entry.stat().st_mtime_ns, entry.path))
+            except FileNotFoundError:
+                continue
+    artifacts.sort(reverse=True)
+    for _, path in artifacts[PROFILE_MAX_ARTIFACTS:]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # Pruned by a concurrent request, or another worker.
+            pass
@@ -0,0 +1,378 @@
+"""Deterministic datasets of a chosen size, loaded with COPY.
+
+Rows are generated in id order from a seeded random generator and streamed to
+Postgres in chunks through ``COPY ... FROM STDIN``, so memory stays flat at
+millions of rows. Every user shares a single precomputed password hash, and
+the appointment stats trigger is switched off during the load and the stats
+table is filled in one statement afterwards.
+"""
+import io
+import json
+import random
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, Optional, Sequence
+
+from sqlalchemy import Engine, inspect, text
+
+from app.core.database import Base
+from app.models.appointments import Appointment, AppointmentDailyStat, AvailableTimeSlot
+from app.models.users import DoctorProfile, User
+from app.tests.factories import DEFAULT_PASSWORD, hash_password
+
+COPY_CHUNK_ROWS = 50000
+SLOT_MINUTES = 30
+# A doctor's day of back-to-back slots must end before the next day's first
+# one starts.
+MAX_SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+SPECIALIZATIONS = (
+    "Cardiology",
+    "Dermatology",
+    "General Practice",
+    "Neurology",
+    "Oncology",
+    "Pediatrics",
+    "Psychiatry",
+    "Radiology",
+)
+DEGREES = ("MBBS", "MD", "PhD")
+UNIVERSITIES = ("Ibadan", "Lagos", "Nairobi", "Cape Town", "Cairo", "Accra", "Makerere")
+FIRST_NAMES = (
+    "Ada", "Bola", "Chen", "Dara", "Emeka", "Fatima", "Grace", "Hugo", "Ines", "Jamal",
+    "Kofi", "Lena", "Musa", "Nkechi", "Omar", "Priya", "Quinn", "Rosa", "Sade", "Tunde",
+)
+LAST_NAMES = (
+    "Abiola", "Brown", "Castro", "Diallo", "Evans", "Fischer", "Garcia", "Haddad", "Ito",
+    "Johnson", "Kimura", "Lopez", "Mensah", "Nwosu", "Okafor", "Petrov", "Rossi", "Silva",
+)
+
+USER_COLUMNS = ("id", "email", "full_name", "hashed_password", "role", "created_at", "updated_at")
+PROFILE_COLUMNS = (
+    "id", "user_id", "specialization", "experience_years", "academic_history", "bio",
+)
+SLOT_COLUMNS = ("id", "doctor_id", "start_time", "end_time", "created_at", "updated_at")
+APPOINTMENT_COLUMNS = (
+    "id", "patient_id", "doctor_id", "available_time_slot_id", "status", "created_at",
+    "updated_at",
+)
+
+BACKFILL_DAILY_STATS = """
+INSERT INTO appointment_daily_stats (doctor_id, day, status, count)
+SELECT appointments.doctor_id, available_time_slots.start_time::date, appointments.status::text, count(*)
+FROM appointments
+JOIN available_time_slots ON available_time_slots.id = appointments.available_time_slot_id
+WHERE appointments.doctor_id IS NOT NULL AND appointments.status IS NOT NULL
+GROUP BY 1, 2, 3
+"""
+
+
+@dataclass(frozen=True)
+class DatasetSize:
+    """How many rows of each kind to seed.
+
+    Every doctor works ``slots_per_day`` back-to-back half hour slots a day
+    until they have ``slots_per_doctor``, half of the days in the past, and
+    ``booked_ratio`` of the slots are booked.
+    """
+
+    patients: int
+    doctors: int
+    slots_per_doctor: int = 20
+    slots_per_day: int = 1
+    booked_ratio: float = 2 / 3
+
+    def __post_init__(self):
+        # The overlap constraint is only rebuilt after the load, so a bad
+        # size would otherwise fail after loading everything.
+        if not 1 <= self.slots_per_day <= MAX_SLOTS_PER_DAY:
+            raise ValueError(f"slots_per_day must be between 1 and {MAX_SLOTS_PER_DAY}")
+
+    @classmethod
+    def scaled(cls, patients: int, **kwargs) -> "DatasetSize":
+        return cls(patients=patients, doctors=max(1, patients // 10), **kwargs)
+
+    @property
+    def users(self) -> int:
+        return self.doctors + self.patients
+
+    @property
+    def days(self) -> int:
+        return -(-self.slots_per_doctor // self.slots_per_day)
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass
+class Dataset:
+    """What was seeded, with ids the benchmarks can pick their inputs from."""
+
+    size: DatasetSize
+    anchor: datetime
+    doctor_ids: Sequence[int]
+    patient_ids: Sequence[int]
+    time_slot_ids: Sequence[int]
+    appointment_ids: Sequence[int]
+    counts: dict
+
+
+def _copy_value(value) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, dict):
+        value = json.dumps(value)
+    elif not isinstance(value, str):
+        return str(value)
+    return (
+        value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    )
+
+
+def _copy(cursor, table: str, columns: Sequence[str], rows: Iterable[tuple]) -> int:
+    """COPY ``rows`` into ``table`` a chunk at a time; returns the row count."""
+    statement = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    count, buffer = 0, io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(map(_copy_value, row)))
+        buffer.write("\n")
+        count += 1
+        if count % COPY_CHUNK_ROWS == 0:
+            buffer.seek(0)
+            cursor.copy_expert(statement, buffer)
+            buffer = io.StringIO()
+    if buffer.tell():
+        buffer.seek(0)
+        cursor.copy_expert(statement, buffer)
+    return count
+
+
+def _user_rows(size: DatasetSize, rng: random.Random, anchor: datetime, hashed_password: str):
+    # Sign ups are spread over the two years before the anchor, in id order.
+    spacing = timedelta(days=730) / max(size.users, 1)
+    first_signup = anchor - timedelta(days=730)
+    for user_id in range(1, size.users + 1):
+        role = "doctor" if user_id <= size.doctors else "patient"
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        created_at = first_signup + spacing * user_id
+        yield (
+            user_id,
+            f"{first}.{last}.{user_id}@example.com".lower(),
+            f"{first} {last}",
+            hashed_password,
+            role,
+            created_at,
+            created_at,
+        )
+
+
+def _profile_rows(size: DatasetSize, rng: random.Random):
+    for doctor_id in range(1, size.doctors + 1):
+        experience_years = rng.randint(0, 40)
+        yield (
+            doctor_id,
+            doctor_id,
+            rng.choice(SPECIALIZATIONS),
+            experience_years,
+            {
+                "degree": rng.choice(DEGREES),
+                "university": rng.choice(UNIVERSITIES),
+                "year": 2024 - experience_years - rng.randint(0, 5),
+            },
+            f"{experience_years} years in practice",
+        )
+
+
+def _schedule(size: DatasetSize, rng: random.Random, anchor: datetime):
+    """Yield (slot rows, appointment rows) per doctor, with ids in doctor order.
+
+    A doctor's slots follow each other without gaps from a fixed daily start
+    hour, so they never overlap. Past bookings are completed, later ones
+    scheduled, and one in ten either way is canceled.
+    """
+    first_day = anchor - timedelta(days=size.days // 2)
+    slot_id = appointment_id = 0
+    for doctor_id in range(1, size.doctors + 1):
+        start_hour = rng.randint(7, 16)
+        slots, appointments = [], []
+        for index in range(size.slots_per_doctor):
+            day, position = divmod(index, size.slots_per_day)
+            start_time = first_day + timedelta(
+                days=day, hours=start_hour, minutes=SLOT_MINUTES * position
+            )
+            created_at = start_time - timedelta(days=rng.randint(7, 60))
+            slot_id += 1
+            slots.append(
+                (
+                    slot_id,
+                    doctor_id,
+                    start_time,
+                    start_time + timedelta(minutes=SLOT_MINUTES),
+                    created_at,
+                    created_at,
+                )
+            )
+            if not size.patients or rng.random() >= size.booked_ratio:
+                continue
+            if rng.random() < 0.1:
+                status = "canceled"
+            elif start_time < anchor:
+                status = "completed"
+            else:
+                status = "scheduled"
+            booked_at = min(created_at + timedelta(days=rng.randint(0, 6)), anchor)
+            appointment_id += 1
+            appointments.append(
+                (
+                    appointment_id,
+                    rng.randint(size.doctors + 1, size.users),
+                    doctor_id,
+                    slot_id,
+                    status,
+                    booked_at,
+                    booked_at,
+                )
+            )
+        yield slots, appointments
+
+
+def _chunked(schedule: Iterator, limit: int):
+    """Group per doctor schedules into chunks of about ``limit`` slots."""
+    slots, appointments = [], []
+    for doctor_slots, doctor_appointments in schedule:
+        slots += doctor_slots
+        appointments += doctor_appointments
+        if len(slots) >= limit:
+            yield slots, appointments
+            slots, appointments = [], []
+    if slots:
+        yield slots, appointments
+
+
+SECONDARY_INDEXES = """
+SELECT pg_get_indexdef(pg_index.indexrelid), index_class.relname
+FROM pg_index
+JOIN pg_class AS index_class ON index_class.oid = pg_index.indexrelid
+WHERE pg_index.indrelid = %s::regclass
+    AND NOT pg_index.indisprimary
+    AND NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conindid = pg_index.indexrelid)
+"""
+EXCLUSION_CONSTRAINTS = """
+SELECT conname, pg_get_constraintdef(oid)
+FROM pg_constraint
+WHERE conrelid = %s::regclass AND contype = 'x'
+"""
+
+
+@contextmanager
+def _indexes_deferred(cursor, tables: Sequence[str]):
+    """Drop the secondary indexes and exclusion constraints of ``tables``
+    and build them again, in bulk, once the block has loaded the rows."""
+    indexes, constraints = [], []
+    for table in tables:
+        cursor.execute(SECONDARY_INDEXES, (table,))
+        indexes += cursor.fetchall()
+        cursor.execute(EXCLUSION_CONSTRAINTS, (table,))
+        constraints += [(table, name, definition) for name, definition in cursor.fetchall()]
+    for table, name, _ in constraints:
+        cursor.execute(f"ALTER TABLE {table} DROP CONSTRAINT {name}")
+    for _, name in indexes:
+        cursor.execute(f"DROP INDEX {name}")
+    yield
+    for definition, _ in indexes:
+        cursor.execute(definition)
+    for table, name, definition in constraints:
+        cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}")
+
+
+def _prepare_schema(engine: Engine, recreate: bool):
+    if recreate or not inspect(engine).has_table(User.__tablename__):
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        return
+    tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+    with engine.begin() as connection:
+        connection.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+
+
+def seed_dataset(
+    engine: Engine,
+    size: DatasetSize,
+    seed: int = 0,
+    anchor: Optional[datetime] = None,
+    recreate_schema: bool = True,
+    password: str = DEFAULT_PASSWORD,
+) -> Dataset:
+    """Fill the database behind ``engine`` with a dataset of ``size``.
+
+    The schema is recreated, or with ``recreate_schema=False`` an existing
+    (e.g. migrated) one is emptied instead. The same ``size``, ``seed`` and
+    ``anchor`` (midnight today by default) always produce the same rows.
+    """
+    rng = random.Random(seed)
+    if anchor is None:
+        anchor = datetime.utcnow()
+    anchor = anchor.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    _prepare_schema(engine, recreate_schema)
+
+    counts = {}
+    connection = engine.raw_connection()
+    try:
+        tables = [table.name for table in Base.metadata.sorted_tables]
+        with connection.cursor() as cursor, _indexes_deferred(cursor, tables):
+            counts["users"] = _copy(
+                cursor,
+                User.__tablename__,
+                USER_COLUMNS,
+                _user_rows(size, rng, anchor, hash_password(password)),
+            )
+            counts["doctor_profiles"] = _copy(
+                cursor, DoctorProfile.__tablename__, PROFILE_COLUMNS, _profile_rows(size, rng)
+            )
+            # Maintaining the stats row by row would dominate the load.
+            cursor.execute(
+                f"ALTER TABLE {Appointment.__tablename__} "
+                "DISABLE TRIGGER trg_appointments_daily_stats"
+            )
+            counts["available_time_slots"] = counts["appointments"] = 0
+            for slots, appointments in _chunked(_schedule(size, rng, anchor), COPY_CHUNK_ROWS):
+                counts["available_time_slots"] += _copy(
+                    cursor, AvailableTimeSlot.__tablename__, SLOT_COLUMNS, slots
+                )
+                counts["appointments"] += _copy(
+                    cursor, Appointment.__tablename__, APPOINTMENT_COLUMNS, appointments
+                )
+            cursor.execute(
+                f"ALTER TABLE {Appointment.__tablename__} "
+                "ENABLE TRIGGER trg_appointments_daily_stats"
+            )
+            cursor.execute(BACKFILL_DAILY_STATS)
+            # Rows were copied with explicit ids, so move the sequences past them.
+            for table in (User, DoctorProfile, AvailableTimeSlot, Appointment):
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence('{table.__tablename__}', 'id'), "
+                    f"coalesce((SELECT max(id) FROM {table.__tablename__}), 0) + 1, false)"
+                )
+        connection.commit()
+    finally:
+        connection.close()
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("VACUUM ANALYZE"))
+        counts["appointment_daily_stats"] = connection.scalar(
+            text(f"SELECT count(*) FROM {AppointmentDailyStat.__tablename__}")
+        )
+
+    return Dataset(
+        size=size,
+        anchor=anchor,
+        doctor_ids=range(1, size.doctors + 1),
+        patient_ids=range(size.doctors + 1, size.users + 1),
+        time_slot_ids=range(1, counts["available_time_slots"] + 1),
+        appointment_ids=range(1, counts["appointments"] + 1),
+        counts=counts,
+    )
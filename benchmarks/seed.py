@@ -0,0 +1,76 @@
+"""Seed a database with a production sized, reproducible dataset.
+
+    python -m benchmarks.seed --patients 1000000 --seed 42 --anchor 2025-01-01
+
+Doctors, patients, doctor profiles, non-overlapping time slots and their
+appointments are generated from ``--seed`` and loaded with COPY; see
+benchmarks/dataset.py. The target is DATABASE_URL unless ``--database-url``
+is given. Its schema is kept and its tables emptied first, which is refused
+while they hold data unless ``--truncate`` is passed.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import create_engine, inspect, select, func
+
+from app.models.users import User
+from benchmarks.dataset import MAX_SLOTS_PER_DAY, DatasetSize, seed_dataset
+
+
+def _slots_per_day(value: str) -> int:
+    slots = int(value)
+    if not 1 <= slots <= MAX_SLOTS_PER_DAY:
+        # More would run into the next day's first slot.
+        raise argparse.ArgumentTypeError(f"must be between 1 and {MAX_SLOTS_PER_DAY}")
+    return slots
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.seed", description=__doc__.split("\n")[0])
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--patients", type=int, required=True)
+    parser.add_argument("--doctors", type=int, help="defaults to a tenth of the patients")
+    parser.add_argument("--slots-per-doctor", type=int, default=20)
+    parser.add_argument("--slots-per-day", type=_slots_per_day, default=1)
+    parser.add_argument("--booked-ratio", type=float, default=2 / 3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--anchor",
+        type=datetime.fromisoformat,
+        help="date the dataset is laid out around (YYYY-MM-DD), defaults to today",
+    )
+    parser.add_argument(
+        "--truncate", action="store_true", help="empty the tables even if they hold data"
+    )
+    args = parser.parse_args(argv)
+
+    if not args.database_url:
+        parser.error("--database-url or DATABASE_URL is required")
+    size = DatasetSize(
+        patients=args.patients,
+        doctors=args.doctors if args.doctors is not None else max(1, args.patients // 10),
+        slots_per_doctor=args.slots_per_doctor,
+        slots_per_day=args.slots_per_day,
+        booked_ratio=args.booked_ratio,
+    )
+
+    engine = create_engine(args.database_url)
+    if inspect(engine).has_table(User.__tablename__) and not args.truncate:
+        with engine.connect() as connection:
+            if connection.scalar(select(func.count()).select_from(User)):
+                parser.error("the database already has users; pass --truncate to replace them")
+
+    started = time.perf_counter()
+    dataset = seed_dataset(
+        engine, size, seed=args.seed, anchor=args.anchor, recreate_schema=False
+    )
+    counts = ", ".join(f"{count} {table}" for table, count in dataset.counts.items())
+    print(f"seeded {counts} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
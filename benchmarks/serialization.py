@@ -0,0 +1,261 @@
+"""Time what the list endpoints spend per row turning query results into JSON.
+
+    python -m benchmarks.serialization run --rows 1000 --output after.json
+    python -m benchmarks.serialization compare before.json after.json
+
+For each list endpoint the rows it fetches (mappings, or ORM objects for
+/users/) are put through the steps a request takes:
+
+* ``build``: what the service does to them, e.g. ``model_validate`` per row
+* ``response``: the route's response_model validation and encoding, through
+  the route's own response field, as FastAPI runs it
+* ``total``: both, the per-row cost of the endpoint outside the database
+
+For comparison, ``orjson`` and ``json`` time the response again as it would
+run with an ORJSONResponse or JSONResponse response class, which validate,
+dump to Python objects and then encode. No database is needed.
+"""
+import argparse
+import json
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
+
+import orjson
+from fastapi.routing import APIRoute
+
+from app.routers import appointments, users
+from app.models.users import DoctorProfile, User
+from app.schemas.appointment import AppointmentResponse, AvailableTimeSlotResponse
+from app.schemas.user import DoctorCard
+
+DEFAULT_ROWS = 1000
+DEFAULT_REPEAT = 20
+ANCHOR = datetime(2025, 1, 1)
+
+
+@dataclass
+class Case:
+    name: str
+    path: str
+    rows: Callable[[int], list]
+    # What the service hands the router for the fetched rows.
+    build: Callable[[list], Any]
+
+
+def _time_slot_rows(count: int) -> list[dict]:
+    return [
+        {
+            "id": i,
+            "doctor_id": i % 50 + 1,
+            "start_time": ANCHOR + timedelta(hours=i),
+            "end_time": ANCHOR + timedelta(hours=i, minutes=30),
+            "created_at": ANCHOR,
+            "updated_at": ANCHOR,
+            "doctor_name": f"Doctor {i % 50 + 1}",
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def _appointment_rows(count: int) -> list[dict]:
+    return [
+        {
+            "id": i,
+            "patient_id": i + 1000,
+            "doctor_id": i % 50 + 1,
+            "available_time_slot_id": i,
+            "status": "scheduled",
+            "created_at": ANCHOR,
+            "updated_at": ANCHOR,
+            "patient_name": f"Patient {i}",
+            "doctor_name": f"Doctor {i % 50 + 1}",
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def _users(count: int) -> list[User]:
+    users = []
+    for i in range(1, count + 1):
+        user = User(
+            id=i,
+            email=f"user{i}@example.com",
+            full_name=f"User {i}",
+            role="doctor" if i % 2 else "patient",
+            created_at=ANCHOR,
+            updated_at=ANCHOR,
+        )
+        user.doctor_profile = (
+            DoctorProfile(
+                id=i,
+                user_id=i,
+                specialization="Cardiology",
+                experience_years=i % 40,
+                academic_history={"degree": "MD", "year": 2010},
+                bio="Doctor",
+                user=user,
+            )
+            if i % 2
+            else None
+        )
+        users.append(user)
+    return users
+
+
+def _doctor_card_rows(count: int) -> list[dict]:
+    return [
+        {
+            "user_id": i,
+            "full_name": f"Doctor {i}",
+            "specialization": "Cardiology",
+            "experience_years": i % 40,
+            "academic_history": {"degree": "MD", "year": 2010},
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+CASES = [
+    Case(
+        "get-all-time-slots",
+        "/appointments/get-all-time-slots",
+        _time_slot_rows,
+        lambda rows: [AvailableTimeSlotResponse.model_validate(row) for row in rows],
+    ),
+    Case(
+        "get-all-appointments",
+        "/appointments/get-all-appointments",
+        _appointment_rows,
+        lambda rows: [AppointmentResponse.model_validate(row) for row in rows],
+    ),
+    Case("get-all-users", "/users/", _users, lambda rows: rows),
+    Case(
+        "doctor-directory",
+        "/users/doctor-directory",
+        _doctor_card_rows,
+        lambda rows: [DoctorCard.model_validate(row) for row in rows],
+    ),
+]
+
+
+def _response_field(path: str):
+    # The app only resolves included routers lazily, so look in the routers.
+    for route in (*users.router.routes, *appointments.router.routes):
+        if isinstance(route, APIRoute) and route.path == path and "GET" in route.methods:
+            return route.response_field
+    raise LookupError(f"no GET route for {path}")
+
+
+def _validate(field, content):
+    value, errors = field.validate(content, {}, loc=("response",))
+    if errors:
+        raise ValueError(errors)
+    return value
+
+
+def _per_row_us(call: Callable[[], Any], rows: int, repeat: int) -> float:
+    """Best of ``repeat`` calls, the least disturbed by the rest of the machine."""
+    call()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+    return round(min(timings) / rows * 1e6, 2)
+
+
+def measure_case(case: Case, rows: int, repeat: int) -> dict:
+    field = _response_field(case.path)
+    fetched = case.rows(rows)
+    built = case.build(fetched)
+
+    def response():
+        return field.serialize_json(_validate(field, built))
+
+    def encoded_by(dumps):
+        return lambda: dumps(field.serialize(_validate(field, built), mode="json"))
+
+    result = {
+        "case": case.name,
+        "rows": rows,
+        "build_us": _per_row_us(lambda: case.build(fetched), rows, repeat),
+        "response_us": _per_row_us(response, rows, repeat),
+        "orjson_us": _per_row_us(encoded_by(orjson.dumps), rows, repeat),
+        "json_us": _per_row_us(encoded_by(lambda content: json.dumps(content).encode()), rows, repeat),
+        "bytes_per_row": round(len(response()) / rows, 1),
+    }
+    result["total_us"] = round(result["build_us"] + result["response_us"], 2)
+    return result
+
+
+def run(rows: int = DEFAULT_ROWS, repeat: int = DEFAULT_REPEAT, cases: Optional[list[Case]] = None) -> dict:
+    return {
+        "generated_at": datetime.utcnow().isoformat(),
+        "results": [measure_case(case, rows, repeat) for case in (cases or CASES)],
+    }
+
+
+def format_report(report: dict) -> str:
+    columns = ("build_us", "response_us", "total_us", "orjson_us", "json_us")
+    lines = [f"{'case':<22}" + "".join(f"{column:>13}" for column in columns)]
+    for result in report["results"]:
+        lines.append(
+            f"{result['case']:<22}" + "".join(f"{result[column]:>13}" for column in columns)
+        )
+    return "\n".join(lines)
+
+
+def compare(baseline: dict, current: dict) -> list[str]:
+    previous = {result["case"]: result for result in baseline["results"]}
+    lines = []
+    for result in current["results"]:
+        before = previous.get(result["case"])
+        if before is None:
+            continue
+        changes = []
+        for metric in ("build_us", "response_us", "total_us"):
+            change = (result[metric] - before[metric]) / before[metric] * 100 if before[metric] else 0
+            changes.append(f"{metric} {before[metric]} -> {result[metric]} ({change:+.0f}%)")
+        lines.append(f"{result['case']}: " + ", ".join(changes))
+    return lines
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.serialization", description=__doc__.split("\n")[0]
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    timing = commands.add_parser("run", help="time every case and print microseconds per row")
+    timing.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+    timing.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    timing.add_argument("--case", action="append", help="only run cases whose name contains this")
+    timing.add_argument("--output", help="also write the report as JSON")
+
+    diff = commands.add_parser("compare", help="compare two result files")
+    diff.add_argument("baseline")
+    diff.add_argument("current")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.baseline) as baseline, open(args.current) as current:
+            print("\n".join(compare(json.load(baseline), json.load(current))))
+        return
+
+    cases = [
+        case for case in CASES if not args.case or any(part in case.name for part in args.case)
+    ]
+    report = run(args.rows, args.repeat, cases)
+    print(format_report(report))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+        print(f"wrote {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+"""Time AppointmentService and UserService methods at several dataset sizes.
+
+    python -m benchmarks.services run --sizes 1000 10000 --output after.json
+    python -m benchmarks.services compare before.json after.json
+
+For every size a fresh dataset is seeded into the benchmark database
+(BENCHMARK_DATABASE_URL, or DATABASE_URL's database with a ``_bench``
+suffix), then each case is timed over a number of calls. The report holds
+p50/p95 latency, SQL statements per call and the peak Python memory a call
+allocates. The response caches are cleared before every call, so the
+numbers are those of the database path.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+from urllib.parse import urlparse
+
+import psycopg2
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from app.core.cache import cache
+from app.core.database import get_async_database_url
+from app.schemas.appointment import AvailableTimeSlotCreate
+from app.schemas.user import UpdateDoctorProfile
+from app.services.appointments import AppointmentService
+from app.services.users import UserService
+from benchmarks.dataset import Dataset, DatasetSize, seed_dataset
+
+DEFAULT_SIZES = (1000, 10000, 50000)
+DEFAULT_ITERATIONS = 50
+WARMUP_ITERATIONS = 3
+# tracemalloc slows calls down several times, so allocations are measured
+# in a separate, shorter pass.
+ALLOCATION_ITERATIONS = 5
+
+
+@dataclass
+class Case:
+    name: str
+    # Called with a session, the seeded dataset and the iteration number,
+    # which cases use to rotate through different ids.
+    call: Callable[..., Awaitable]
+
+
+def _pick(ids: list[int], i: int) -> int:
+    # A fixed stride spreads consecutive iterations over the whole table.
+    return ids[(i * 7919) % len(ids)]
+
+
+def _free_window(dataset: Dataset) -> AvailableTimeSlotCreate:
+    # Later than every seeded slot, so moving a slot there never overlaps.
+    start = dataset.anchor + timedelta(days=dataset.size.slots_per_doctor, hours=8)
+    return AvailableTimeSlotCreate(start_time=start, end_time=start + timedelta(minutes=30))
+
+
+CASES = [
+    Case(
+        "AppointmentService.get_time_slot",
+        lambda db, data, i: AppointmentService.get_time_slot(db, _pick(data.time_slot_ids, i)),
+    ),
+    Case(
+        "AppointmentService.get_all_time_slots",
+        lambda db, data, i: AppointmentService.get_all_time_slots(db, skip=100, limit=50),
+    ),
+    Case(
+        "AppointmentService.search_available_time_slots",
+        lambda db, data, i: AppointmentService.search_available_time_slots(
+            db, data.anchor + timedelta(days=1), data.anchor + timedelta(days=3)
+        ),
+    ),
+    Case(
+        "AppointmentService.get_appointment",
+        lambda db, data, i: AppointmentService.get_appointment(db, _pick(data.appointment_ids, i)),
+    ),
+    Case(
+        "AppointmentService.get_all_appointments[admin]",
+        lambda db, data, i: AppointmentService.get_all_appointments(db, 0, "admin", limit=50),
+    ),
+    Case(
+        "AppointmentService.get_all_appointments[doctor]",
+        lambda db, data, i: AppointmentService.get_all_appointments(
+            db, _pick(data.doctor_ids, i), "doctor", limit=50
+        ),
+    ),
+    Case(
+        "AppointmentService.get_all_appointments[patient]",
+        lambda db, data, i: AppointmentService.get_all_appointments(
+            db, _pick(data.patient_ids, i), "patient", limit=50
+        ),
+    ),
+    Case(
+        "AppointmentService.get_doctor_calendar",
+        lambda db, data, i: AppointmentService.get_doctor_calendar(
+            db, _pick(data.doctor_ids, i), (data.anchor - timedelta(days=3)).date()
+        ),
+    ),
+    Case(
+        "AppointmentService.get_appointment_stats",
+        lambda db, data, i: AppointmentService.get_appointment_stats(
+            db, data.anchor.date(), (data.anchor + timedelta(days=6)).date()
+        ),
+    ),
+    Case(
+        "AppointmentService.update_time_slot",
+        lambda db, data, i: AppointmentService.update_time_slot(
+            db,
+            data.time_slot_ids[-1],
+            data.doctor_ids[-1],
+            _free_window(data),
+        ),
+    ),
+    Case(
+        "UserService.get_user",
+        lambda db, data, i: UserService.get_user(db, _pick(data.doctor_ids, i)),
+    ),
+    Case(
+        "UserService.get_all_users",
+        lambda db, data, i: UserService.get_all_users(db, skip=100, limit=50),
+    ),
+    Case(
+        "UserService.get_all_users[search]",
+        lambda db, data, i: UserService.get_all_users(db, search="garcia", limit=50),
+    ),
+    Case(
+        "UserService.get_doctor_directory",
+        lambda db, data, i: UserService.get_doctor_directory(
+            db, specialization="cardiology", limit=50
+        ),
+    ),
+    Case(
+        "UserService.update_doctor_profile",
+        lambda db, data, i: UserService.update_doctor_profile(
+            db, _pick(data.doctor_ids, i), UpdateDoctorProfile(experience_years=i % 40)
+        ),
+    ),
+]
+
+
+def _percentile(values: list[float], percent: int) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+class StatementCounter:
+    """Counts the statements an engine executes while it is attached."""
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine.sync_engine
+        self.count = 0
+
+    def _count(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(self.engine, "before_cursor_execute", self._count)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self._count)
+
+
+async def _call(sessions: async_sessionmaker, case: Case, dataset: Dataset, i: int):
+    async with sessions() as db:
+        await case.call(db, dataset, i)
+
+
+async def measure_case(
+    engine: AsyncEngine, case: Case, dataset: Dataset, iterations: int
+) -> dict:
+    sessions = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    for i in range(WARMUP_ITERATIONS):
+        await cache.clear()
+        await _call(sessions, case, dataset, i)
+
+    durations, queries = [], []
+    for i in range(iterations):
+        await cache.clear()
+        with StatementCounter(engine) as counter:
+            started = time.perf_counter()
+            await _call(sessions, case, dataset, i)
+            durations.append((time.perf_counter() - started) * 1000)
+        queries.append(counter.count)
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for i in range(ALLOCATION_ITERATIONS):
+            await cache.clear()
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            await _call(sessions, case, dataset, i)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append((peak - baseline) / 1024)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "case": case.name,
+        "size": dataset.counts,
+        "iterations": iterations,
+        "p50_ms": round(_percentile(durations, 50), 3),
+        "p95_ms": round(_percentile(durations, 95), 3),
+        "mean_ms": round(statistics.fmean(durations), 3),
+        "queries": statistics.median_low(queries),
+        "peak_alloc_kib": round(statistics.median(peaks), 1),
+    }
+
+
+def benchmark_database_url() -> str:
+    url = os.environ.get("BENCHMARK_DATABASE_URL")
+    if url:
+        return url
+    database_url = os.environ["DATABASE_URL"]
+    database_name = urlparse(database_url).path[1:]
+    return database_url.replace(f"/{database_name}", f"/{database_name}_bench".replace("-", "_"))
+
+
+def ensure_database(url: str):
+    database_name = urlparse(url).path[1:]
+    connection = psycopg2.connect(url.replace(f"/{database_name}", "/postgres"))
+    connection.autocommit = True
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (database_name,))
+        if not cursor.fetchone():
+            cursor.execute(f'CREATE DATABASE "{database_name}"')
+    connection.close()
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(
+    engine: Engine,
+    async_engine: AsyncEngine,
+    sizes: list[DatasetSize],
+    iterations: int = DEFAULT_ITERATIONS,
+    cases: Optional[list[Case]] = None,
+    seed: int = 0,
+    log=print,
+) -> dict:
+    """Seed each size into ``engine``'s database and time every case on it."""
+    cases = CASES if cases is None else cases
+    with engine.connect() as connection:
+        server_version = connection.exec_driver_sql("SHOW server_version").scalar()
+
+    results = []
+    for size in sizes:
+        started = time.perf_counter()
+        dataset = seed_dataset(engine, size, seed)
+        log(f"seeded {dataset.counts} in {time.perf_counter() - started:.1f}s")
+
+        async def measure_all():
+            try:
+                return [await measure_case(async_engine, case, dataset, iterations) for case in cases]
+            finally:
+                await async_engine.dispose()
+
+        for result in asyncio.run(measure_all()):
+            log(
+                f"  {result['case']:<50} p50 {result['p50_ms']:>8.2f}ms  "
+                f"p95 {result['p95_ms']:>8.2f}ms  queries {result['queries']:>4}  "
+                f"alloc {result['peak_alloc_kib']:>8.1f}KiB"
+            )
+            results.append(result)
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "postgres": server_version,
+        "seed": seed,
+        "iterations": iterations,
+        "sizes": [size.as_dict() for size in sizes],
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict) -> list[str]:
+    """One line per case and size found in both reports, with the p50/p95 change."""
+    previous = {(r["case"], json.dumps(r["size"], sort_keys=True)): r for r in baseline["results"]}
+    lines = []
+    for result in current["results"]:
+        before = previous.get((result["case"], json.dumps(result["size"], sort_keys=True)))
+        if before is None:
+            continue
+        changes = []
+        for metric in ("p50_ms", "p95_ms", "queries", "peak_alloc_kib"):
+            if before[metric]:
+                change = (result[metric] - before[metric]) / before[metric] * 100
+                changes.append(f"{metric} {before[metric]} -> {result[metric]} ({change:+.0f}%)")
+            else:
+                changes.append(f"{metric} {before[metric]} -> {result[metric]}")
+        lines.append(
+            f"{result['case']} @ {result['size']['appointments']} appointments: " + ", ".join(changes)
+        )
+    return lines
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.services", description=__doc__.split("\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="seed the benchmark database and time the services")
+    run.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SIZES,
+        help="patients per dataset; doctors are a tenth of that",
+    )
+    run.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--case", action="append", help="only run cases whose name contains this")
+    run.add_argument("--output", default="benchmark-results.json")
+
+    diff = commands.add_parser("compare", help="compare two result files")
+    diff.add_argument("baseline")
+    diff.add_argument("current")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.baseline) as baseline, open(args.current) as current:
+            print("\n".join(compare(json.load(baseline), json.load(current))))
+        return
+
+    url = benchmark_database_url()
+    ensure_database(url)
+    engine = create_engine(url)
+    async_engine = create_async_engine(get_async_database_url(url))
+    cases = [
+        case for case in CASES if not args.case or any(part in case.name for part in args.case)
+    ]
+    report = run_benchmarks(
+        engine,
+        async_engine,
+        [DatasetSize.scaled(size) for size in args.sizes],
+        iterations=args.iterations,
+        cases=cases,
+        seed=args.seed,
+    )
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    print(f"wrote {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
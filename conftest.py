@@ -1,24 +1,33 @@
 from datetime import timedelta
+import asyncio
+import os
 import sys
 from pathlib import Path
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from urllib.parse import urlparse
 import psycopg2
 import pytest
 from copy import deepcopy
 from datetime import timedelta
 
+# Repeating a statement row by row fails the request instead of only logging.
+os.environ.setdefault("N_PLUS_ONE_RAISE", "true")
+
 from app.tests.factories import UserFactory
 from app.utils.auth import create_access_token
 
 sys.path.append(str(Path(__file__).parent.parent))
 
-from app.core.database import Base, get_db
+from app.core.database import Base, get_async_db, get_async_database_url
+from app.core.query_stats import instrument_queries
+from app.core.cache import cache
+from app.core.principal_cache import principal_cache
 from app.main import app
-import os
 
 # Create a sanitized test DB name from your original DB
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -52,35 +61,65 @@ create_test_db()
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# TestClient runs every request on a fresh event loop, and asyncpg connections
+# cannot be shared between loops, so the app side of the tests does not pool.
+async_engine = create_async_engine(
+    get_async_database_url(SQLALCHEMY_DATABASE_URL), poolclass=NullPool
+)
+instrument_queries(async_engine.sync_engine)
+TestingAsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
 
-# Fixture to provide a fresh DB for each test function
+
+# Fixture to provide a fresh DB for each test function. The app reads through
+# its own async connections, so fixture data is really committed and the
+# schema is dropped afterwards instead of rolling back a wrapping transaction.
 @pytest.fixture(scope="function")
 def db():
     Base.metadata.create_all(bind=engine)
-    connection = engine.connect()
-    transaction = connection.begin()
-    db = TestingSessionLocal(bind=connection)
+    # Ids restart with every fresh schema, so cached principals and responses
+    # from a previous test would point at the wrong rows.
+    principal_cache.clear()
+    asyncio.run(cache.clear())
+    db = TestingSessionLocal()
 
     yield db
 
-    transaction.rollback()
-    connection.close()
+    db.close()
     Base.metadata.drop_all(bind=engine)
 
 
 # Fixture to provide a test client with the overridden DB session
 @pytest.fixture(scope="function")
 def client(db):
-    def override_get_db():
-        try:
-            yield db
-        finally:
-            db.close()
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as async_db:
+            yield async_db
 
-    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     yield TestClient(app)
 
 
+@pytest.fixture
+def async_session_factory(db):
+    """Open app-side sessions directly, e.g. to call services concurrently."""
+    return TestingAsyncSessionLocal
+
+
+@pytest.fixture
+def query_counter():
+    """Collect the SQL statements the app sends through the test engine."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
 @pytest.fixture()
 def mock_authenticated_user(db):
     """Mock authenticated user with specified role for testing."""